@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+"""
+Compares computing per-group totals by scan and with storage.totals().
+
+--states States with --cities Cities each and --places Places per City
+are stored in a scratch directory, with --reviews Reviews spread over
+the Places. The average price_by_night of every City and State, and the
+review count of --lookups Places, are then computed by scanning the
+stored objects and with storage.totals(), which reads counters kept by
+the Aggregates index. The time to build the index, and the time to add
+one more Place with and without it, are printed apart.
+
+Usage:
+    python3 -m benchmarks.aggregates [--states N] [--cities N]
+        [--places N] [--reviews N] [--lookups N]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+
+def main():
+    """Prints the time per group of both ways"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--states', type=int, default=50)
+    parser.add_argument('--cities', type=int, default=20)
+    parser.add_argument('--places', type=int, default=20)
+    parser.add_argument('--reviews', type=int, default=100000)
+    parser.add_argument('--lookups', type=int, default=100)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    from models import storage
+    from models.city import City
+    from models.place import Place
+    from models.review import Review
+    from models.state import State
+
+    random.seed(0)
+    states = [State() for i in range(args.states)]
+    storage.bulk_insert(City, ({'state_id': state.id} for state in states
+                               for i in range(args.cities)))
+    cities = list(storage.all(City).values())
+    storage.bulk_insert(Place, ({'city_id': city.id,
+                                 'price_by_night': random.randrange(200)}
+                                for city in cities
+                                for i in range(args.places)))
+    places = list(storage.all(Place).values())
+    storage.bulk_insert(Review, ({'place_id': random.choice(places).id}
+                                 for i in range(args.reviews)))
+    lookups = random.sample(places, min(args.lookups, len(places)))
+
+    def scan():
+        """Averages prices and counts reviews over the stored objects"""
+        objs = storage.all(Place, view=True).values()
+        for city in cities:
+            prices = [place.price_by_night for place in objs
+                      if place.city_id == city.id]
+            sum(prices) / len(prices)
+        for state in states:
+            ids = {city.id for city in cities if city.state_id == state.id}
+            prices = [place.price_by_night for place in objs
+                      if place.city_id in ids]
+            sum(prices) / len(prices)
+        reviews = storage.all(Review, view=True).values()
+        for place in lookups:
+            len([review for review in reviews
+                 if review.place_id == place.id])
+
+    def totals():
+        """Reads the same numbers from the counters"""
+        for obj in cities + states + lookups:
+            storage.totals(obj)
+
+    def add():
+        """Returns the seconds to add one Place, on average"""
+        start = time.perf_counter()
+        for i in range(1000):
+            place = Place()
+            place.city_id = cities[i % len(cities)].id
+            place.price_by_night = i
+        return (time.perf_counter() - start) / 1000
+
+    plain = add()
+    start = time.perf_counter()
+    storage.totals(states[0])
+    build = time.perf_counter() - start
+    counted = add()
+
+    groups = len(cities) + len(states) + len(lookups)
+    print('index built in {:.3f} s for {} Places and {} Reviews'.format(
+        build, len(places), args.reviews))
+    print('new Place {:.1f} us without the index, {:.1f} us with it'.format(
+        plain * 1e6, counted * 1e6))
+    print('{:<9} {:>10} {:>14}'.format('totals', 'time s', 'us/group'))
+    for name, function in [('scan', scan), ('totals', totals)]:
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        print('{:<9} {:>10.3f} {:>14.1f}'.format(
+            name, elapsed, elapsed / groups * 1e6))
+
+
+if __name__ == '__main__':
+    main()
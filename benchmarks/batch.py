@@ -0,0 +1,51 @@
+#!/usr/bin/python3
+"""
+Measures creating and saving objects one by one versus in a batch.
+
+--objects Places are created and saved with BaseModel.save() in a scratch
+directory, first each on its own and then inside storage.batch(), which
+leaves a single save to the end of the block.
+
+Usage:
+    python3 -m benchmarks.batch [--objects N]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+
+def main():
+    """Times both ways of saving and prints one line for each"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--objects', type=int, default=2000)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    from models import storage
+    from models.place import Place
+
+    def create():
+        """Creates and saves the Places"""
+        for i in range(args.objects):
+            place = Place()
+            place.name = 'Place {}'.format(i)
+            place.save()
+
+    start = time.perf_counter()
+    create()
+    alone = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with storage.batch():
+        create()
+    batched = time.perf_counter() - start
+
+    print('{:<8} {:>10} {:>12}'.format('saves', 'time s', 'objects/s'))
+    for name, elapsed in [('each', alone), ('batch', batched)]:
+        print('{:<8} {:>10.3f} {:>12.0f}'.format(name, elapsed,
+                                                 args.objects / elapsed))
+
+
+if __name__ == '__main__':
+    main()
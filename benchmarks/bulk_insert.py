@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+"""
+Compares storing rows one object at a time with storage.bulk_insert().
+
+--rows States are stored in a scratch directory, first through new() and
+save() for each object, then with bulk_insert(). FileStorage is always
+measured; DBStorage is measured on a SQLite file with the mapped models of
+the tests when SQLAlchemy is installed. The per-object path only stores
+--slow rows, since it is quadratic on FileStorage.
+
+Usage:
+    python3 -m benchmarks.bulk_insert [--rows N] [--slow N]
+"""
+import argparse
+import contextlib
+import os
+import tempfile
+import time
+
+
+def measure(storage, cls, rows, slow):
+    """Returns the rows per second of the per-object and the bulk paths"""
+    start = time.perf_counter()
+    for i in range(slow):
+        obj = cls()
+        obj.name = 'State {}'.format(i)
+        storage.new(obj)
+        storage.save()
+    each = slow / (time.perf_counter() - start)
+    start = time.perf_counter()
+    storage.bulk_insert(cls, ({'name': 'State {}'.format(i)}
+                              for i in range(rows)))
+    return each, rows / (time.perf_counter() - start)
+
+
+def main():
+    """Prints one line per storage engine"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--slow', type=int, default=1000)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    from models import storage
+    from models.state import State
+
+    engines = [('file', storage, State, contextlib.nullcontext)]
+    try:
+        from tests.test_models.test_engine import db_models
+    except ImportError:
+        print('DBStorage skipped: needs SQLAlchemy')
+    else:
+        os.environ['HBNB_DB_URL'] = 'sqlite:///' + os.path.abspath('hbnb.db')
+        db = db_models.load()()
+        db.reload()
+        engines.append(('db', db, db_models.State, db_models.mapped))
+
+    print('{:<6} {:>12} {:>12} {:>8}'.format('engine', 'each rows/s',
+                                             'bulk rows/s', 'speedup'))
+    for name, engine, cls, models in engines:
+        with models():
+            each, bulk = measure(engine, cls, args.rows, args.slow)
+        print('{:<6} {:>12.0f} {:>12.0f} {:>7.1f}x'.format(
+            name, each, bulk, bulk / each))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+"""
+Measures repeated list queries with and without the storage cache.
+
+--rows States and Amenities are stored, then all(State), all(Amenity)
+and count(State) are each run --repeat times, on the storage itself and
+through a CachedStorage in front of it. DBStorage is measured on a SQLite
+file with the mapped models of the tests when SQLAlchemy is installed,
+FileStorage otherwise.
+
+Usage:
+    python3 -m benchmarks.cache [--rows N] [--repeat N]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+
+def main():
+    """Prints the time per query with the cache off and on"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    from models import storage
+    from models.amenity import Amenity
+    from models.engine.cache import CachedStorage
+    from models.state import State
+
+    engine = 'file'
+    try:
+        from tests.test_models.test_engine import db_models
+    except ImportError:
+        pass
+    else:
+        os.environ['HBNB_DB_URL'] = 'sqlite:///' + os.path.abspath('hbnb.db')
+        storage = db_models.load()()
+        storage.reload()
+        Amenity, State = db_models.Amenity, db_models.State
+        engine = 'db'
+    for cls in [State, Amenity]:
+        storage.bulk_insert(cls, ({'name': str(i)} for i in range(args.rows)))
+
+    queries = [('all(State)', lambda s: s.all(State)),
+               ('all(Amenity)', lambda s: s.all(Amenity)),
+               ('count(State)', lambda s: s.count(State))]
+    cache = CachedStorage(storage)
+    print('{} storage, {} rows per class'.format(engine, args.rows))
+    print('{:<14} {:>12} {:>12}'.format('query', 'off us', 'on us'))
+    for name, query in queries:
+        times = []
+        for target in [storage, cache]:
+            start = time.perf_counter()
+            for i in range(args.repeat):
+                query(target)
+            times.append((time.perf_counter() - start) / args.repeat * 1e6)
+        print('{:<14} {:>12.1f} {:>12.1f}'.format(name, *times))
+    print(cache.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+"""
+Compares finding the children of a parent by scan and with children().
+
+--states States with --cities Cities each are stored in a scratch
+directory. The Cities of every State are then found by scanning all the
+Cities for a matching state_id, and with storage.children(), which reads
+them from the foreign key index. The time to build the index is printed
+apart.
+
+Usage:
+    python3 -m benchmarks.children [--states N] [--cities N]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+
+def main():
+    """Prints the time per lookup of both ways"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--states', type=int, default=500)
+    parser.add_argument('--cities', type=int, default=20)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    from models import storage
+    from models.city import City
+    from models.state import State
+
+    states = [State() for i in range(args.states)]
+    storage.bulk_insert(City, ({'state_id': state.id, 'name': str(i)}
+                               for state in states
+                               for i in range(args.cities)))
+
+    def scan():
+        """Finds the Cities of every State by comparing state_id"""
+        for state in states:
+            [city for city in storage.all(City, view=True).values()
+             if city.state_id == state.id]
+
+    def index():
+        """Finds the Cities of every State with children()"""
+        for state in states:
+            storage.children(state, City)
+
+    start = time.perf_counter()
+    storage.children(states[0], City)
+    build = time.perf_counter() - start
+
+    print('index built in {:.3f} s for {} Cities'.format(
+        build, args.states * args.cities))
+    print('{:<9} {:>10} {:>14}'.format('lookup', 'time s', 'us/lookup'))
+    for name, function in [('scan', scan), ('children', index)]:
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        print('{:<9} {:>10.3f} {:>14.1f}'.format(
+            name, elapsed, elapsed / args.states * 1e6))
+
+
+if __name__ == '__main__':
+    main()
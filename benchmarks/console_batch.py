@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+"""
+Compares piping a command script into console.py and running it --batch.
+
+--states States are stored in a scratch directory, then a script of
+--commands commands is generated: creates, dot-syntax updates and shows
+of those States, and counts. Each way runs console.py in a subprocess on
+a fresh copy of the storage file: piped into stdin, which saves on every
+create and update, and with --batch, saving once at the end, or every
+--every commands when given. Commands per second are printed.
+
+Usage:
+    python3 -m benchmarks.console_batch [--states N] [--commands N]
+        [--every N]
+"""
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+CONSOLE = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'console.py')
+
+
+def main():
+    """Prints the commands per second of both ways"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--states', type=int, default=1000)
+    parser.add_argument('--commands', type=int, default=2000)
+    parser.add_argument('--every', type=int, default=None)
+    args = parser.parse_args()
+    if args.every is not None and args.every < 1:
+        parser.error("--every must be at least 1")
+
+    os.chdir(tempfile.mkdtemp())
+    from models import storage
+    from models.state import State
+
+    random.seed(0)
+    states = [State() for i in range(args.states)]
+    storage.save()
+    shutil.copy('file.json', 'file.json.orig')
+
+    lines = []
+    for i in range(args.commands):
+        state = random.choice(states)
+        lines.append(random.choice([
+            'create State',
+            'State.update("{}", "name", "State_{}")'.format(state.id, i),
+            'show State {}'.format(state.id),
+            'State.count()']))
+    with open('script.txt', 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    batch = ['--batch', 'script.txt']
+    if args.every:
+        batch += ['--every', str(args.every)]
+    print('{:<8} {:>10} {:>14}'.format('mode', 'time s', 'commands/s'))
+    for name, options in [('piped', []), ('batch', batch)]:
+        shutil.copy('file.json.orig', 'file.json')
+        with open('script.txt') as script:
+            start = time.perf_counter()
+            subprocess.run([sys.executable, CONSOLE] + options,
+                           stdin=script, stdout=subprocess.DEVNULL,
+                           check=True)
+            elapsed = time.perf_counter() - start
+        print('{:<8} {:>10.3f} {:>14.0f}'.format(
+            name, elapsed, args.commands / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+"""
+Compares reading every table in turn with reading them concurrently.
+
+--rows rows per table are stored in a SQLite file through the mapped
+models of the tests, then DBStorage.all() is timed with
+HBNB_MYSQL_FETCH_WORKERS set to 1 and to --workers, printing the seconds
+spent on each table. --latency adds a sleep of that many ms to every
+statement, standing in for the round trip to a MySQL server.
+
+Usage:
+    python3 -m benchmarks.db_fetch [--rows N] [--workers N] [--latency MS]
+"""
+import argparse
+import os
+import tempfile
+import time
+from unittest import mock
+
+
+def main():
+    """Prints the per-table and total time of each way of reading"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=6)
+    parser.add_argument('--latency', type=float, default=20.0)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    try:
+        from tests.test_models.test_engine.db_models import (
+            Amenity, City, Place, Review, State, User, load, mapped)
+    except ImportError:
+        print('DBStorage skipped: needs SQLAlchemy')
+        return
+    from sqlalchemy import event
+
+    DBStorage = load()
+
+    url = 'sqlite:///' + os.path.abspath('hbnb.db')
+    tables = {User: {'email': 'a@b.c', 'password': 'pwd'},
+              State: {'name': 'State'}, Amenity: {'name': 'Wifi'},
+              City: {'name': 'City', 'state_id': 's'},
+              Place: {'name': 'Place', 'city_id': 'c', 'user_id': 'u'},
+              Review: {'text': 'Nice', 'place_id': 'p', 'user_id': 'u'}}
+    print('{:<8} {}'.format('workers', ' '.join(
+        '{:>8}'.format(cls.__name__) for cls in tables)) + '  total s')
+    for workers in [1, args.workers]:
+        env = {'HBNB_DB_URL': url, 'HBNB_MYSQL_FETCH_WORKERS': str(workers)}
+        with mock.patch.dict(os.environ, env), mapped():
+            storage = DBStorage()
+        storage.reload()
+        if workers == 1:
+            for cls, row in tables.items():
+                storage.bulk_insert(cls, (row for i in range(args.rows)))
+
+        def delay(*statement):
+            """Waits as long as a round trip to the server"""
+            time.sleep(args.latency / 1000)
+
+        event.listen(storage._DBStorage__engine, 'before_cursor_execute',
+                     delay)
+        start = time.perf_counter()
+        storage.all()
+        total = time.perf_counter() - start
+        timings = storage.timings()
+        print('{:<8} {} {:>8.3f}'.format(workers, ' '.join(
+            '{:>8.3f}'.format(timings[cls.__name__]) for cls in tables),
+            total))
+        storage.close()
+
+
+if __name__ == '__main__':
+    main()
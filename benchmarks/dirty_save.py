@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+"""
+Compares a full re-serializing save with a dirty-tracking save.
+
+A store of --objects Places is saved once, then one Place is updated and
+saved --saves times. The full case drops the cached fragments before each
+save, as FileStorage did before it tracked changed objects.
+
+Usage:
+    python3 -m benchmarks.dirty_save [--objects N] [--saves N]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+
+def measure(storage, objs, saves, full):
+    """Returns the latency in ms of each single-object save"""
+    latencies = []
+    for i in range(saves):
+        objs[i % len(objs)].name = 'save {}'.format(i)
+        if full:
+            storage._FileStorage__fragments.clear()
+        start = time.perf_counter()
+        storage.save()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    """Runs the benchmark and prints one line per save strategy"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--objects', type=int, default=100000)
+    parser.add_argument('--saves', type=int, default=10)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    from models import storage
+    from models.place import Place
+
+    objs = [Place() for i in range(args.objects)]
+    storage.save()
+    print('{:<8} {:>10} {:>10}'.format('save', 'mean ms', 'max ms'))
+    for full in (True, False):
+        latencies = measure(storage, objs, args.saves, full)
+        print('{:<8} {:>10.3f} {:>10.3f}'.format(
+            'full' if full else 'dirty', statistics.mean(latencies),
+            max(latencies)))
+
+
+if __name__ == '__main__':
+    main()
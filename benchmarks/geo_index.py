@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+"""
+Compares PlaceGeoIndex queries with a linear scan over Places.
+
+Builds --places Places at random coordinates, then times random radius
+and viewport queries with the grid index and with a scan of every Place.
+
+Usage:
+    python3 -m benchmarks.geo_index [--places N] [--queries N] [--km N]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+
+def measure(func, queries):
+    """Returns the mean time in ms of func over queries"""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        func(*query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(latencies)
+
+
+def main():
+    """Runs the benchmark and prints one line per query kind"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--places', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--km', type=float, default=25)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    from models.engine.geo_index import PlaceGeoIndex, distance
+    from models.place import Place
+
+    rand = random.Random(0)
+    record = Place().to_dict()
+    places = []
+    index = PlaceGeoIndex()
+    for i in range(args.places):
+        place = Place(**dict(record, id=str(i),
+                             latitude=rand.uniform(-60, 60),
+                             longitude=rand.uniform(-180, 180)))
+        places.append(place)
+        index.add(place)
+
+    points = [(rand.uniform(-50, 50), rand.uniform(-170, 170))
+              for i in range(args.queries)]
+    radius = [(lat, lon, args.km) for lat, lon in points]
+    boxes = [(lat, lon, lat + 0.5, lon + 0.5) for lat, lon in points]
+
+    def scan_nearby(lat, lon, km):
+        """Filters every Place by distance"""
+        return [p.id for p in places
+                if distance(lat, lon, p.latitude, p.longitude) <= km]
+
+    def scan_within(south, west, north, east):
+        """Filters every Place by the box"""
+        return [p.id for p in places if south <= p.latitude <= north and
+                west <= p.longitude <= east]
+
+    print('{:<8} {:>10} {:>10}'.format('query', 'scan ms', 'index ms'))
+    print('{:<8} {:>10.2f} {:>10.3f}'.format(
+        'radius', measure(scan_nearby, radius),
+        measure(index.nearby, radius)))
+    print('{:<8} {:>10.2f} {:>10.3f}'.format(
+        'viewport', measure(scan_within, boxes),
+        measure(index.within, boxes)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+"""
+Compares FileStorage and MMapStorage on a large store.
+
+A store of --objects Places is generated for each engine in a scratch
+directory. Fresh interpreters then time `import models`, --ops show
+lookups and --ops updates (get, set an attribute, save), and report the
+peak resident set size of the whole run.
+
+Usage:
+    python3 -m benchmarks.mmap_storage [--objects N] [--ops N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GENERATE = """
+from models import storage
+from models.place import Place
+for i in range({}):
+    place = Place()
+    place.name = 'Place {{}}'.format(i)
+    place.description = 'A quiet place ' * 20
+storage.save()
+with open('ids', 'w') as f:
+    f.write('\\n'.join(obj.id for obj in storage.all().values()))
+"""
+MEASURE = """
+import random
+import resource
+import time
+start = time.perf_counter()
+from models import storage
+from models.place import Place
+loaded = time.perf_counter()
+with open('ids') as f:
+    ids = f.read().split()
+picks = random.Random(0).sample(ids, {0})
+start_show = time.perf_counter()
+for id in picks:
+    str(storage.get(Place, id))
+start_update = time.perf_counter()
+for id in picks:
+    place = storage.get(Place, id)
+    place.name = 'changed'
+    place.save()
+end = time.perf_counter()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(loaded - start, (start_update - start_show) / {0} * 1e6,
+      (end - start_update) / {0} * 1e6, rss)
+"""
+
+
+def main():
+    """Generates a store per engine and prints one line per engine"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--objects', type=int, default=100000)
+    parser.add_argument('--ops', type=int, default=200)
+    args = parser.parse_args()
+
+    print('{:<6} {:>9} {:>9} {:>10} {:>8}'.format(
+        'engine', 'load s', 'show us', 'update us', 'RSS MiB'))
+    for engine in ('file', 'mmap'):
+        os.chdir(tempfile.mkdtemp())
+        env = dict(os.environ, PYTHONPATH=ROOT, HBNB_TYPE_STORAGE=engine)
+        subprocess.run([sys.executable, '-c',
+                        GENERATE.format(args.objects)], env=env, check=True)
+        out = subprocess.run([sys.executable, '-c',
+                              MEASURE.format(args.ops)], env=env,
+                             check=True, capture_output=True, text=True)
+        load, show, update, rss = map(float, out.stdout.split())
+        print('{:<6} {:>9.3f} {:>9.1f} {:>10.1f} {:>8.1f}'.format(
+            engine, load, show, update, rss))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+"""
+Compares the memory used by Reviews in the default and compact layouts.
+
+Each layout runs in a fresh interpreter which loads --counts Reviews from
+their dict form, the way reload() does, and reports the traced memory
+they hold.
+
+Usage:
+    python3 -m benchmarks.model_layout [--counts N [N ...]]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEASURE = """
+import tracemalloc
+from models.review import Review
+record = Review().to_dict()
+record.update(place_id='p' * 36, user_id='u' * 36, text='Great stay')
+tracemalloc.start()
+reviews = [Review(**dict(record, id=str(i))) for i in range({})]
+print(tracemalloc.get_traced_memory()[0])
+"""
+
+
+def main():
+    """Prints one line per layout and object count"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--counts', type=int, nargs='+',
+                        default=[100000, 1000000])
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    print('{:<8} {:>9} {:>10} {:>10}'.format('layout', 'objects', 'MiB',
+                                             'B/object'))
+    for count in args.counts:
+        for compact in ('0', '1'):
+            env = dict(os.environ, PYTHONPATH=ROOT,
+                       HBNB_COMPACT_MODELS=compact)
+            out = subprocess.run([sys.executable, '-c', MEASURE.format(count)],
+                                 env=env, capture_output=True, text=True,
+                                 check=True).stdout
+            used = int(out)
+            print('{:<8} {:>9} {:>10.1f} {:>10.1f}'.format(
+                'compact' if compact == '1' else 'default', count,
+                used / 1024 / 1024, used / count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+"""
+Compares walking storage with keyset pages against an offset over all().
+
+--objects States are stored in a scratch directory and then visited a page
+of --limit objects at a time, first by sorting all() and slicing it at an
+offset, then with storage.page() resuming after the last id seen. The peak
+memory of iterate() is printed next to that of all().
+
+Usage:
+    python3 -m benchmarks.pagination [--objects N] [--limit N]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+
+def peak(function):
+    """Returns the seconds taken and the peak MiB allocated by function"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return elapsed, size
+
+
+def main():
+    """Prints one line for each way of walking the objects"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--objects', type=int, default=20000)
+    parser.add_argument('--limit', type=int, default=100)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    from models import storage
+    from models.state import State
+
+    storage.bulk_insert(State, ({'name': str(i)}
+                                for i in range(args.objects)))
+
+    def offset():
+        """Visits the pages by slicing the sorted all() at an offset"""
+        start = 0
+        while True:
+            objs = sorted(storage.all(State).values(),
+                          key=lambda obj: obj.id)[start:start + args.limit]
+            if len(objs) < args.limit:
+                return
+            start += args.limit
+
+    def keyset():
+        """Visits the pages by resuming after the last id"""
+        after = None
+        while True:
+            objs = storage.page(State, args.limit, after)
+            if len(objs) < args.limit:
+                return
+            after = objs[-1].id
+
+    storage.page(State, 1)
+    print('{:<8} {:>10} {:>10}'.format('walk', 'time s', 'peak MiB'))
+    for name, function in [('offset', offset), ('keyset', keyset),
+                           ('all', lambda: list(storage.all().values())),
+                           ('iterate', lambda: sum(
+                               1 for obj in storage.iterate()))]:
+        elapsed, size = peak(function)
+        print('{:<8} {:>10.3f} {:>10.2f}'.format(name, elapsed, size))
+
+
+if __name__ == '__main__':
+    main()
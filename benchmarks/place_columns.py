@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+"""
+Compares PlaceColumns queries with plain loops over Place objects.
+
+Generates --places random Places, then times a price range filter, a
+bounding box filter, a sort by price and an average price both ways.
+
+Usage:
+    python3 -m benchmarks.place_columns [--places N] [--repeat N]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+
+def measure(func, repeat):
+    """Returns the best time in ms out of repeat calls of func"""
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    """Runs the benchmark and prints one line per query"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--places', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    from models import storage
+    from models.engine import place_columns
+    from models.place import Place
+
+    rand = random.Random(0)
+    for i in range(args.places):
+        place = Place()
+        place.price_by_night = rand.randint(20, 500)
+        place.max_guest = rand.randint(1, 12)
+        place.latitude = rand.uniform(-60, 60)
+        place.longitude = rand.uniform(-180, 180)
+    places = list(storage.all(Place).values())
+    columns = place_columns.PlaceColumns()
+    storage.register(columns)
+
+    queries = [
+        ('price range',
+         lambda: [p.id for p in places if 50 <= p.price_by_night <= 100],
+         lambda: columns.filter(price_by_night=(50, 100))),
+        ('bounding box',
+         lambda: [p.id for p in places if 10 <= p.latitude <= 20 and
+                  -10 <= p.longitude <= 10],
+         lambda: columns.filter(latitude=(10, 20), longitude=(-10, 10))),
+        ('sort by price',
+         lambda: [p.id for p in sorted(places,
+                                       key=lambda p: p.price_by_night)],
+         lambda: columns.sort('price_by_night')),
+        ('mean price',
+         lambda: sum(p.price_by_night for p in places) / len(places),
+         lambda: columns.aggregate('price_by_night', 'mean')),
+    ]
+    print('numpy: {}'.format('yes' if place_columns.numpy else 'no'))
+    print('{:<14} {:>10} {:>10}'.format('query', 'loop ms', 'columns ms'))
+    for name, loop, column in queries:
+        print('{:<14} {:>10.2f} {:>10.2f}'.format(
+            name, measure(loop, args.repeat), measure(column, args.repeat)))
+
+
+if __name__ == '__main__':
+    main()
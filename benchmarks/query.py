@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+"""
+Compares filtering all() in Python with storage.query() on FileStorage.
+
+--places Places spread over --cities Cities are stored in a scratch
+directory. The cheapest Places of one City under a price are then found
+by looping over all(Place), with query() scanning the objects, and with
+query() narrowed by a ForeignKeyIndex and PlaceColumns. Every Place
+under the price is then fetched from a lazily reloaded file, as objects
+and as only() dicts, which builds none.
+
+Usage:
+    python3 -m benchmarks.query [--places N] [--cities N] [--repeat N]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+
+def main():
+    """Prints the time per query of each way"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--places', type=int, default=50000)
+    parser.add_argument('--cities', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    from models import storage
+    from models.engine.fk_index import ForeignKeyIndex
+    from models.engine.place_columns import PlaceColumns
+    from models.place import Place
+
+    storage.bulk_insert(Place, ({'name': str(i),
+                                 'city_id': 'c{}'.format(i % args.cities),
+                                 'price_by_night': i % 500}
+                                for i in range(args.places)))
+
+    def loop():
+        """Filters and sorts all() by hand"""
+        places = [place for place in storage.all(Place).values()
+                  if place.city_id == 'c1' and place.price_by_night < 100]
+        return sorted(places, key=lambda place: place.price_by_night)[:10]
+
+    query = storage.query(Place).where(city_id='c1', price_by_night__lt=100) \
+        .order_by('price_by_night').limit(10)
+
+    def timed(function):
+        """Returns the microseconds per call of function"""
+        start = time.perf_counter()
+        for i in range(args.repeat):
+            function()
+        return (time.perf_counter() - start) / args.repeat * 1e6
+
+    rows = [('all() loop', timed(loop)), ('query scan', timed(query.all))]
+    storage.register(ForeignKeyIndex())
+    storage.register(PlaceColumns())
+    rows.append(('query indexed', timed(query.all)))
+    storage.save()
+    storage._FileStorage__lazy = True
+    storage._FileStorage__objects.clear()
+    storage._FileStorage__classes.clear()
+    storage._FileStorage__indexes.clear()
+    storage.reload()
+    cheap = storage.query(Place).where(price_by_night__lt=100)
+    rows.append(('lazy only()', timed(cheap.only('id', 'name').all)))
+    built = len(storage._FileStorage__objects)
+    start = time.perf_counter()
+    cheap.all()
+    rows.append(('lazy objects', (time.perf_counter() - start) * 1e6))
+    print('{:<14} {:>12}'.format('way', 'us/query'))
+    for name, elapsed in rows:
+        print('{:<14} {:>12.1f}'.format(name, elapsed))
+    print('objects built by only(): {}'.format(built))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+"""
+Reports FileStorage save latency under each fsync policy.
+
+Every run works on a scratch directory holding a store of --objects
+objects, then updates one object and saves it --saves times, both with full
+snapshot saves and with the journal.
+
+Usage:
+    python3 -m benchmarks.save_latency [--objects N] [--saves N]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+
+def measure(storage, objs, saves):
+    """Returns the latency in ms of each of saves single-object saves"""
+    latencies = []
+    for i in range(saves):
+        obj = objs[i % len(objs)]
+        obj.name = 'save {}'.format(i)
+        start = time.perf_counter()
+        obj.save()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    """Runs the benchmark and prints one line per mode and policy"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--objects', type=int, default=10000)
+    parser.add_argument('--saves', type=int, default=50)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    from models import storage
+    from models.place import Place
+
+    objs = [Place() for i in range(args.objects)]
+    print('{:<9} {:<9} {:>10} {:>10} {:>10}'.format(
+        'mode', 'fsync', 'mean ms', 'p50 ms', 'max ms'))
+    for journal in (False, True):
+        for policy in ('never', 'interval', 'always'):
+            storage._FileStorage__journal = journal
+            storage._FileStorage__fsync = policy
+            storage.save()
+            latencies = measure(storage, objs, args.saves)
+            print('{:<9} {:<9} {:>10.3f} {:>10.3f} {:>10.3f}'.format(
+                'journal' if journal else 'snapshot', policy,
+                statistics.mean(latencies), statistics.median(latencies),
+                max(latencies)))
+        storage.compact(wait=True)
+
+
+if __name__ == '__main__':
+    main()
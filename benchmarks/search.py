@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+"""
+Compares searching Review texts with a scan and with the TextIndex.
+
+--reviews Reviews of --words words each are made from a vocabulary of
+--vocabulary words drawn with Zipf-like frequencies. Queries of one and
+two words, common and rare, are then answered by scanning every text for
+the words and with TextIndex.search(), which ranks them with BM25. The
+time to build the index, and to dump and load it, is printed apart.
+
+Usage:
+    python3 -m benchmarks.search [--reviews N] [--words N]
+        [--vocabulary N] [--queries N]
+"""
+import argparse
+import itertools
+import os
+import random
+import tempfile
+import time
+
+
+def main():
+    """Prints the time per query of both ways"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--reviews', type=int, default=100000)
+    parser.add_argument('--words', type=int, default=30)
+    parser.add_argument('--vocabulary', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=5)
+    args = parser.parse_args()
+    if args.vocabulary < 2:
+        parser.error('--vocabulary must be at least 2')
+
+    os.chdir(tempfile.mkdtemp())
+    from models.engine.text_index import TextIndex, tokens
+    from models.review import Review
+
+    random.seed(0)
+    vocabulary = ['w{}'.format(i) for i in range(args.vocabulary)]
+    weights = list(itertools.accumulate(1 / (i + 1)
+                                        for i in range(args.vocabulary)))
+    now = '2017-09-28T21:03:54.052298'
+    reviews = []
+    for i in range(args.reviews):
+        text = ' '.join(random.choices(vocabulary, cum_weights=weights,
+                                       k=args.words))
+        reviews.append(Review(id=str(i), created_at=now, updated_at=now,
+                              text=text, __class__='Review'))
+
+    start = time.perf_counter()
+    index = TextIndex()
+    for review in reviews:
+        index.add(review)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    index.dump('index.search', None)
+    dump = time.perf_counter() - start
+    start = time.perf_counter()
+    TextIndex.load('index.search', None)
+    load = time.perf_counter() - start
+
+    queries = []
+    size = args.vocabulary
+    for i in range(args.queries):
+        common = vocabulary[random.randrange(min(10, size - 1),
+                                             min(100, size))]
+        rare = vocabulary[random.randrange(min(1000, size - 1), size)]
+        queries += [[common], [rare], [common, rare]]
+
+    def scan(words):
+        """Returns the Reviews holding one of words, most matches first"""
+        matches = []
+        for review in reviews:
+            found = [word for word in tokens(review.text) if word in words]
+            if found:
+                matches.append((len(found), review))
+        matches.sort(key=lambda pair: pair[0], reverse=True)
+        return matches[:10]
+
+    results = {}
+    for name, run in [('scan', scan),
+                      ('index', lambda words: index.search(' '.join(words)))]:
+        start = time.perf_counter()
+        for words in queries:
+            run(set(words) if name == 'scan' else words)
+        results[name] = (time.perf_counter() - start) / len(queries)
+
+    print('{} reviews, {} terms'.format(len(index), args.vocabulary))
+    print('build {:.2f} s, dump {:.2f} s ({:.1f} MB), load {:.2f} s'.format(
+        build, dump, os.path.getsize('index.search') / 1e6, load))
+    for name, seconds in results.items():
+        print('{:<6} {:10.2f} ms per query'.format(name, seconds * 1e3))
+
+
+if __name__ == "__main__":
+    main()
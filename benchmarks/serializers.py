@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+"""
+Compares the save time, load time and file size of the file serializers.
+
+--objects Places are created in a scratch directory, then the store is
+converted to each available serializer. Save time is that of the
+conversion, which encodes every object; load time is that of reload(),
+which decodes the file and builds every object.
+
+Usage:
+    python3 -m benchmarks.serializers [--objects N] [--runs N]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+
+def main():
+    """Creates the store and prints one line per serializer"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--objects', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    from models import storage
+    from models.engine import serializers
+    from models.place import Place
+
+    for i in range(args.objects):
+        place = Place()
+        place.name = 'Place {}'.format(i)
+        place.city_id = place.user_id = place.id
+        place.number_rooms = i % 5
+        place.price_by_night = i % 300
+        place.latitude = i % 180 - 90.0
+        place.longitude = i % 360 - 180.0
+    state = [storage._FileStorage__objects, storage._FileStorage__classes,
+             storage._FileStorage__fragments, storage._FileStorage__dirty]
+
+    print('{:<8} {:>10} {:>10} {:>10}'.format('format', 'save s', 'load s',
+                                              'size MiB'))
+    for name in serializers.serializers:
+        saves, loads = [], []
+        for i in range(args.runs):
+            start = time.perf_counter()
+            storage.convert(name)
+            saves.append(time.perf_counter() - start)
+            for cache in state:
+                cache.clear()
+            start = time.perf_counter()
+            storage.reload()
+            loads.append(time.perf_counter() - start)
+        print('{:<8} {:>10.3f} {:>10.3f} {:>10.1f}'.format(
+            name, statistics.median(saves), statistics.median(loads),
+            os.path.getsize('file.json') / 1024 / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""
+Measures startup time and peak memory of importing models on a large store.
+
+A file.json of --objects Places is generated in a scratch directory, both
+in the line-per-record layout written by save() and as the single JSON
+document older versions wrote. `import models` is then timed in fresh
+interpreters with eager and lazy reload. Memory is the peak resident set
+size of the child process; the store is generated in a child too so that
+the parent stays small.
+
+Usage:
+    python3 -m benchmarks.startup [--objects N] [--runs N]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GENERATE = """
+import json
+from models import storage
+from models.place import Place
+for i in range({}):
+    Place(**Place().to_dict())
+storage.save()
+with open('document.json', 'w') as f:
+    json.dump({{key: obj.to_dict() for key, obj in storage.all().items()}}, f)
+"""
+
+
+def run(env, script):
+    """Returns the wall time in s and peak RSS in MiB of one child"""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-c', script], env=env)
+    rusage = os.wait4(proc.pid, 0)[2]
+    return time.perf_counter() - start, rusage.ru_maxrss / 1024
+
+
+def main():
+    """Generates the store and prints one line per layout and reload mode"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--objects', type=int, default=200000)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    run(env, GENERATE.format(args.objects))
+    shutil.copy('file.json', 'lines.json')
+
+    print('{:<9} {:<6} {:>10} {:>10}'.format('layout', 'reload', 'time s',
+                                             'RSS MiB'))
+    for layout in ('document', 'lines'):
+        shutil.copy(layout + '.json', 'file.json')
+        for lazy in ('0', '1'):
+            env['HBNB_FILE_LAZY'] = lazy
+            results = [run(env, 'import models') for i in range(args.runs)]
+            print('{:<9} {:<6} {:>10.3f} {:>10.1f}'.format(
+                layout, 'lazy' if lazy == '1' else 'eager',
+                statistics.median(r[0] for r in results),
+                statistics.median(r[1] for r in results)))
+
+
+if __name__ == '__main__':
+    main()
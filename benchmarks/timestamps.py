@@ -0,0 +1,52 @@
+#!/usr/bin/python3
+"""
+Compares the timestamp codec with strptime and isoformat.
+
+Parses and formats --count distinct timestamps with both paths.
+
+Usage:
+    python3 -m benchmarks.timestamps [--count N]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from models import timestamp
+
+
+def measure(func, values):
+    """Returns the time in s taken to call func on every value"""
+    start = time.perf_counter()
+    for value in values:
+        func(value)
+    return time.perf_counter() - start
+
+
+def main():
+    """Runs the benchmark and prints one line per operation"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--count', type=int, default=1000000)
+    args = parser.parse_args()
+
+    start = datetime(2020, 1, 1)
+    dates = [start + timedelta(seconds=i, microseconds=i)
+             for i in range(args.count)]
+    texts = [timestamp.format(date) for date in dates]
+
+    cases = [
+        ('parse', 'strptime',
+         lambda text: datetime.strptime(text, timestamp.FORMAT), texts),
+        ('parse', 'codec', timestamp.parse, texts),
+        ('format', 'isoformat', datetime.isoformat, dates),
+        ('format', 'codec', timestamp.format, dates),
+    ]
+    print('{:<7} {:<10} {:>8} {:>10}'.format('op', 'path', 'time s',
+                                             'ns/op'))
+    for op, path, func, values in cases:
+        elapsed = measure(func, values)
+        print('{:<7} {:<10} {:>8.3f} {:>10.0f}'.format(
+            op, path, elapsed, elapsed / len(values) * 1e9))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,17 @@
 #!/usr/bin/python3
 """ Console Module """
+import argparse
 import cmd
 import sys
-from models.base_model import BaseModel, Base
-from models.__init__ import storage
+from models.base_model import BaseModel
+from models import storage
 from models.user import User
 from models.place import Place
 from models.state import State
 from models.city import City
 from models.amenity import Amenity
 from models.review import Review
+from models.engine import bulk
 
 
 class HBNBCommand(cmd.Cmd):
@@ -92,6 +94,40 @@ class HBNBCommand(cmd.Cmd):
             print('(hbnb) ', end='')
         return stop
 
+    def run_script(self, lines, every=None):
+        """Runs the commands of lines, saving once every `every` commands
+
+        The whole script is parsed before anything runs; it stops at quit
+        or EOF. The commands then run inside storage.batch() blocks of
+        `every` commands, the whole script when None, so their saves write
+        the storage once per block. No prompt is printed, and a command
+        that raises prints its error instead of ending the script.
+        Returns the number of commands run.
+        """
+        commands = []
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            name, arg, line = self.parseline(self.precmd(line))
+            if name in ('quit', 'EOF'):
+                break
+            func = getattr(self, 'do_' + name, None) if name else None
+            commands.append((func, arg, line))
+
+        step = every or len(commands) or 1
+        for start in range(0, len(commands), step):
+            with storage.batch():
+                for func, arg, line in commands[start:start + step]:
+                    try:
+                        if func is None:
+                            self.default(line)
+                        else:
+                            func(arg)
+                    except Exception as e:
+                        print("** {} **".format(e))
+        return len(commands)
+
     def do_quit(self, command):
         """ Method to exit the HBNB console"""
         exit()
@@ -179,11 +215,11 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        key = c_name + "." + c_id
-        try:
-            print(storage._FileStorage__objects[key])
-        except KeyError:
+        obj = storage.get(HBNBCommand.classes[c_name], c_id)
+        if obj is None:
             print("** no instance found **")
+            return
+        print(obj)
 
     def help_show(self):
         """ Help information for the show command """
@@ -210,13 +246,12 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        key = c_name + "." + c_id
-
-        try:
-            del (storage.all()[key])
-            storage.save()
-        except KeyError:
+        obj = storage.get(HBNBCommand.classes[c_name], c_id)
+        if obj is None:
             print("** no instance found **")
+            return
+        storage.delete(obj)
+        storage.save()
 
     def help_destroy(self):
         """ Help information for the destroy command """
@@ -225,22 +260,23 @@ class HBNBCommand(cmd.Cmd):
 
     def do_all(self, args):
         """ Shows all objects, or all objects of a class"""
-        obj = storage.all()
-        print_list = []
-
+        cls = None
         if args:
             args = args.split(' ')[0]  # remove possible trailing args
             if args not in HBNBCommand.classes:
                 print("** class doesn't exist **")
                 return
-            for k, v in obj.items():
-                if k.split('.')[0] == args:
-                    print_list.append(str(v))
-        else:
-            for k, v in obj.items():
-                print_list.append(str(v))
-
-        print(print_list)
+            cls = HBNBCommand.classes[args]
+
+        # printed as the list of strings it is, one object at a time
+        separator = ''
+        print('[', end='')
+        for obj in storage.iterate(cls):
+            if cls is not None and type(obj) is not cls:
+                continue  # instances of subclasses, as BaseModel's
+            print(separator + repr(str(obj)), end='')
+            separator = ', '
+        print(']')
 
     def help_all(self):
         """ Help information for the all command """
@@ -249,16 +285,116 @@ class HBNBCommand(cmd.Cmd):
 
     def do_count(self, args):
         """Count current number of class instances"""
-        count = 0
-        for k, v in storage._FileStorage__objects.items():
-            if args == k.split('.')[0]:
-                count += 1
-        print(count)
+        args = args.split(' ')[0]  # remove possible trailing args
+        if args not in HBNBCommand.classes:
+            print(0)
+            return
+        cls = HBNBCommand.classes[args]
+        # storage counts subclasses too; only instances of cls are wanted
+        subclasses = [sub for sub in HBNBCommand.classes.values()
+                      if sub is not cls and issubclass(sub, cls)]
+        print(storage.count(cls) -
+              sum(storage.count(sub) for sub in subclasses))
 
     def help_count(self):
         """ """
         print("Usage: count <class_name>")
 
+    def do_nearby(self, args):
+        """ Shows the Places within a distance of a point """
+        try:
+            lat, lon, km = [float(arg) for arg in args.split()]
+        except ValueError:
+            print("** usage: nearby <latitude> <longitude> <km> **")
+            return
+        print([str(place) for place in storage.nearby(lat, lon, km)])
+
+    def help_nearby(self):
+        """ Help information for the nearby command """
+        print("Shows the Places within a distance of a point, "
+              "nearest first")
+        print("[Usage]: nearby <latitude> <longitude> <km>\n")
+
+    def do_within(self, args):
+        """ Shows the Places inside a bounding box """
+        try:
+            south, west, north, east = [float(arg) for arg in args.split()]
+        except ValueError:
+            print("** usage: within <south> <west> <north> <east> **")
+            return
+        print([str(place)
+               for place in storage.within(south, west, north, east)])
+
+    def help_within(self):
+        """ Help information for the within command """
+        print("Shows the Places inside a latitude/longitude box")
+        print("[Usage]: within <south> <west> <north> <east>\n")
+
+    def do_search(self, args):
+        """ Shows the Places and Reviews best matching some words """
+        args = args.split()
+        cls = None
+        if args and args[0] in HBNBCommand.classes:
+            cls = HBNBCommand.classes[args.pop(0)]
+        if not args:
+            print("** search text missing **")
+            return
+        print([str(obj) for obj in storage.search(' '.join(args), cls)])
+
+    def help_search(self):
+        """ Help information for the search command """
+        print("Shows the Places and Reviews best matching some words, "
+              "best first")
+        print("[Usage]: search [className] <words>\n")
+
+    def do_convert(self, args):
+        """ Rewrites the storage file with another serializer """
+        if not args:
+            print("** serializer name missing **")
+            return
+        try:
+            storage.convert(args.strip())
+        except ValueError as e:
+            print("** {} **".format(e))
+
+    def help_convert(self):
+        """ Help information for the convert command """
+        print("Rewrites the storage file with another serializer")
+        print("[Usage]: convert <json|pickle|marshal|msgpack>\n")
+
+    def do_import(self, args):
+        """ Stores one new object per row of a JSON file """
+        args = args.split()
+        if not args:
+            print("** class name missing **")
+            return
+        if args[0] not in HBNBCommand.classes:
+            print("** class doesn't exist **")
+            return
+        if len(args) < 2:
+            print("** file name missing **")
+            return
+        options = {}
+        if len(args) > 2:
+            try:
+                options['batch_size'] = int(args[2])
+            except ValueError:
+                print("** batch size must be a number **")
+                return
+        try:
+            count = storage.bulk_insert(HBNBCommand.classes[args[0]],
+                                        bulk.read(args[1]), **options)
+        except (OSError, ValueError, TypeError) as e:
+            print("** {} **".format(e))
+            return
+        print(count)
+
+    def help_import(self):
+        """ Help information for the import command """
+        print("Stores one new object per row of a JSON file, which holds "
+              "an array of objects or one object per line")
+        print("[Usage]: import <className> <file> [batch size]\n")
+
     def do_update(self, args):
         """ Updates a certain object with new info """
         c_name = c_id = att_name = att_val = kwargs = ''
@@ -282,11 +418,9 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        # generate key from class and id
-        key = c_name + "." + c_id
-
-        # determine if key is present
-        if key not in storage.all():
+        # determine if the instance is present
+        new_dict = storage.get(HBNBCommand.classes[c_name], c_id)
+        if new_dict is None:
             print("** no instance found **")
             return
 
@@ -319,9 +453,6 @@ class HBNBCommand(cmd.Cmd):
 
             args = [att_name, att_val]
 
-        # retrieve dictionary of current objects
-        new_dict = storage.all()[key]
-
         # iterate through attr names and values
         for i, att_name in enumerate(args):
             # block only runs on even iterations
@@ -337,8 +468,8 @@ class HBNBCommand(cmd.Cmd):
                 if att_name in HBNBCommand.types:
                     att_val = HBNBCommand.types[att_name](att_val)
 
-                # update dictionary with name, value pair
-                new_dict.__dict__.update({att_name: att_val})
+                # update instance with name, value pair
+                setattr(new_dict, att_name, att_val)
 
         new_dict.save()  # save updates to file
 
@@ -349,4 +480,19 @@ class HBNBCommand(cmd.Cmd):
 
 
 if __name__ == "__main__":
-    HBNBCommand().cmdloop()
+    parser = argparse.ArgumentParser(description="HBNB console")
+    parser.add_argument('--batch', metavar='FILE',
+                        help="run the commands of FILE (- for stdin) "
+                             "without prompts, saving once at the end")
+    parser.add_argument('--every', metavar='N', type=int,
+                        help="with --batch, save every N commands instead")
+    args = parser.parse_args()
+    if args.every is not None and args.every < 1:
+        parser.error("--every must be at least 1")
+    if args.batch is None:
+        HBNBCommand().cmdloop()
+    elif args.batch == '-':
+        HBNBCommand().run_script(sys.stdin, args.every)
+    else:
+        with open(args.batch) as f:
+            HBNBCommand().run_script(f, args.every)
@@ -1,7 +1,14 @@
 #!/usr/bin/python3
-"""This module instantiates an object of class FileStorage"""
-from models.engine.file_storage import FileStorage
+"""This module instantiates the storage engine picked by HBNB_TYPE_STORAGE"""
+from os import environ
 
-
-storage = FileStorage()
+if environ.get('HBNB_TYPE_STORAGE') == 'mmap':
+    from models.engine.mmap_storage import MMapStorage
+    storage = MMapStorage()
+else:
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage()
+if environ.get('HBNB_CACHE') == '1':
+    from models.engine.cache import CachedStorage
+    storage = CachedStorage(storage)
 storage.reload()
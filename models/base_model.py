@@ -2,12 +2,50 @@
 """This module defines a base class for all models in our hbnb clone"""
 import uuid
 from datetime import datetime
+from os import environ
+import models
+from models import timestamp
 
+COMPACT = environ.get('HBNB_COMPACT_MODELS') == '1'
 
-class BaseModel:
+
+class ModelLayout(type):
+    """Metaclass giving models a __slots__ layout in compact mode
+
+    When HBNB_COMPACT_MODELS is set to 1, the public class-level fields
+    of a model (Place.name, Review.text, ...) become slots and their values
+    are kept in _defaults, served until the field is assigned. Otherwise
+    classes are created unchanged.
+    """
+    def __new__(mcs, name, bases, namespace):
+        """Moves the field defaults of the class body into __slots__"""
+        if not COMPACT:
+            return super().__new__(mcs, name, bases, namespace)
+        defaults = {}
+        for base in reversed(bases):
+            defaults.update(getattr(base, '_defaults', {}))
+        fields = [key for key, value in namespace.items()
+                  if not key.startswith('_') and not callable(value) and
+                  not isinstance(value, property)]
+        for key in fields:
+            defaults[key] = namespace.pop(key)
+        namespace.setdefault('__slots__', tuple(fields))
+        namespace['_defaults'] = defaults
+        cls = super().__new__(mcs, name, bases, namespace)
+        cls._fields = getattr(cls, '_fields', ()) + tuple(
+            key for key in namespace['__slots__'] if key != '_extra')
+        return cls
+
+
+class BaseModel(metaclass=ModelLayout):
     """A base class for all hbnb models"""
+    if COMPACT:
+        __slots__ = ('id', 'created_at', 'updated_at', '_extra')
+
     def __init__(self, *args, **kwargs):
         """Instatntiates a new model"""
+        if COMPACT:
+            object.__setattr__(self, '_extra', None)
         if not kwargs:
             from models import storage
             self.id = str(uuid.uuid4())
@@ -15,17 +53,71 @@ class BaseModel:
             self.updated_at = datetime.now()
             storage.new(self)
         else:
-            kwargs['updated_at'] = datetime.strptime(kwargs['updated_at'],
-                                                     '%Y-%m-%dT%H:%M:%S.%f')
-            kwargs['created_at'] = datetime.strptime(kwargs['created_at'],
-                                                     '%Y-%m-%dT%H:%M:%S.%f')
+            kwargs['updated_at'] = timestamp.parse(kwargs['updated_at'])
+            kwargs['created_at'] = timestamp.parse(kwargs['created_at'])
             del kwargs['__class__']
-            self.__dict__.update(kwargs)
+            if COMPACT:
+                for key, value in kwargs.items():
+                    self.__set(key, value)
+            else:
+                self.__dict__.update(kwargs)
+
+    def __setattr__(self, name, value):
+        """Sets an attribute and tells storage the instance changed"""
+        if COMPACT:
+            stored = getattr(self, 'id', None) is not None
+        else:
+            # Not getattr: the id of a mapped class is a descriptor that
+            # fails while SQLAlchemy is still setting up the instance
+            stored = self.__dict__.get('id') is not None
+        if stored:
+            models.storage.remember(self)
+        if COMPACT:
+            self.__set(name, value)
+        else:
+            super().__setattr__(name, value)
+        if stored:
+            models.storage.touch(self)
+
+    if COMPACT:
+        def __getattr__(self, name):
+            """Returns attributes kept outside the slots or field defaults"""
+            extra = object.__getattribute__(self, '_extra')
+            if extra is not None and name in extra:
+                return extra[name]
+            try:
+                return type(self)._defaults[name]
+            except KeyError:
+                raise AttributeError("'{}' object has no attribute '{}'"
+                                     .format(type(self).__name__, name))
+
+    def __set(self, name, value):
+        """Stores a field in its slot, or any other attribute in _extra"""
+        if name in self._fields:
+            object.__setattr__(self, name, value)
+            return
+        if self._extra is None:
+            object.__setattr__(self, '_extra', {})
+        self._extra[name] = value
+
+    def __attributes(self):
+        """Returns the attributes set on the instance as a dict"""
+        if not COMPACT:
+            return self.__dict__
+        attributes = {}
+        for name in self._fields:
+            try:
+                attributes[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        if self._extra:
+            attributes.update(self._extra)
+        return attributes
 
     def __str__(self):
         """Returns a string representation of the instance"""
         cls = (str(type(self)).split('.')[-1]).split('\'')[0]
-        return '[{}] ({}) {}'.format(cls, self.id, self.__dict__)
+        return '[{}] ({}) {}'.format(cls, self.id, self.__attributes())
 
     def save(self):
         """Updates updated_at with current time when instance is changed"""
@@ -36,9 +128,9 @@ class BaseModel:
     def to_dict(self):
         """Convert instance into dict format"""
         dictionary = {}
-        dictionary.update(self.__dict__)
+        dictionary.update(self.__attributes())
         dictionary.update({'__class__':
                           (str(type(self)).split('.')[-1]).split('\'')[0]})
-        dictionary['created_at'] = self.created_at.isoformat()
-        dictionary['updated_at'] = self.updated_at.isoformat()
+        dictionary['created_at'] = timestamp.format(self.created_at)
+        dictionary['updated_at'] = timestamp.format(self.updated_at)
         return dictionary
@@ -1,9 +1,16 @@
 #!/usr/bin/python3
 """ City Module for HBNB project """
+import models
 from models.base_model import BaseModel
+from models.place import Place
 
 
 class City(BaseModel):
     """ The city class, contains state ID and name """
     state_id = ""
     name = ""
+
+    @property
+    def places(self):
+        """ The Places of the City """
+        return models.storage.children(self, Place)
@@ -0,0 +1,145 @@
+#!/usr/bin/python3
+"""This module defines counters kept up to date per Place, City and State"""
+
+
+class Aggregates:
+    """Counts Reviews per Place, and Places and their prices per City and
+    State
+
+    Attach it with storage.register() to keep it in sync with the stored
+    objects. Every new, changed or deleted City, Place and Review only
+    updates the counters of the groups it leaves and joins, so totals()
+    answers without a scan. A Place counts for the State of its City once
+    that City is stored; moving a City moves its totals along.
+    """
+
+    def __init__(self):
+        """Creates empty counters"""
+        from models.city import City
+        from models.place import Place
+        from models.review import Review
+
+        self.classes = (City, Place, Review)
+        self.__cities = {}
+        self.__places = {}
+        self.__reviews = {}
+        self.__review_counts = {}
+        self.__city_totals = {}
+        self.__state_totals = {}
+
+    def __len__(self):
+        """Returns the number of counted objects"""
+        return len(self.__cities) + len(self.__places) + len(self.__reviews)
+
+    def add(self, obj):
+        """Counts obj, or moves it to the groups it now belongs to"""
+        name = type(obj).__name__
+        if name == 'Review':
+            self.__add_review(obj)
+        elif name == 'Place':
+            self.__add_place(obj)
+        elif name == 'City':
+            self.__add_city(obj)
+
+    def remove(self, obj):
+        """Drops obj from the counters"""
+        name = type(obj).__name__
+        if name == 'Review' and obj.id in self.__reviews:
+            self.__count_review(self.__reviews.pop(obj.id), -1)
+        elif name == 'Place':
+            old = self.__places.pop(obj.id, None)
+            if old is not None:
+                self.__count_place(old, -1)
+        elif name == 'City' and obj.id in self.__cities:
+            self.__count_city(obj.id, -1)
+            del self.__cities[obj.id]
+
+    def totals(self, name, id):
+        """Returns the counters of the object of class name with id
+
+        A Place has its number of reviews; a City or a State its number
+        of places and the average price_by_night of those with a price,
+        None when none has one.
+        """
+        if name == 'Place':
+            return {'reviews': self.__review_counts.get(id, 0)}
+        if name == 'City':
+            totals = self.__city_totals.get(id)
+        elif name == 'State':
+            totals = self.__state_totals.get(id)
+        else:
+            raise ValueError("no totals are kept for {}".format(name))
+        if totals is None:
+            return {'places': 0, 'average_price': None}
+        places, priced, price = totals
+        return {'places': places,
+                'average_price': price / priced if priced else None}
+
+    def __add_review(self, obj):
+        """Counts a Review for its Place"""
+        place_id = getattr(obj, 'place_id', None)
+        if obj.id in self.__reviews:
+            if self.__reviews[obj.id] == place_id:
+                return
+            self.__count_review(self.__reviews[obj.id], -1)
+        self.__reviews[obj.id] = place_id
+        self.__count_review(place_id, 1)
+
+    def __add_place(self, obj):
+        """Counts a Place and its price for its City and State"""
+        price = getattr(obj, 'price_by_night', None)
+        if isinstance(price, bool) or not isinstance(price, (int, float)):
+            price = None
+        new = (getattr(obj, 'city_id', None), price)
+        old = self.__places.get(obj.id)
+        if old == new:
+            return
+        if old is not None:
+            self.__count_place(old, -1)
+        self.__places[obj.id] = new
+        self.__count_place(new, 1)
+
+    def __add_city(self, obj):
+        """Follows the State of a City"""
+        state_id = getattr(obj, 'state_id', None)
+        if obj.id in self.__cities:
+            if self.__cities[obj.id] == state_id:
+                return
+            self.__count_city(obj.id, -1)
+        self.__cities[obj.id] = state_id
+        self.__count_city(obj.id, 1)
+
+    def __count_review(self, place_id, sign):
+        """Adds sign to the reviews of place_id"""
+        count = self.__review_counts.get(place_id, 0) + sign
+        if count:
+            self.__review_counts[place_id] = count
+        else:
+            self.__review_counts.pop(place_id, None)
+
+    def __count_place(self, place, sign):
+        """Adds sign times the (city_id, price) place to its groups"""
+        city_id, price = place
+        delta = (sign, 0 if price is None else sign,
+                 0 if price is None else sign * price)
+        self.__change(self.__city_totals, city_id, delta)
+        if city_id in self.__cities:
+            self.__change(self.__state_totals, self.__cities[city_id], delta)
+
+    def __count_city(self, city_id, sign):
+        """Adds sign times the totals of a City to those of its State"""
+        totals = self.__city_totals.get(city_id)
+        if totals is not None:
+            self.__change(self.__state_totals, self.__cities[city_id],
+                          [sign * value for value in totals])
+
+    @staticmethod
+    def __change(groups, key, delta):
+        """Adds the (places, priced, price) delta to groups[key]"""
+        totals = groups.get(key)
+        if totals is None:
+            totals = groups[key] = [0, 0, 0]
+        for i, value in enumerate(delta):
+            totals[i] += value
+        if not totals[0]:
+            del groups[key]
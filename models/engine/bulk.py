@@ -0,0 +1,46 @@
+#!/usr/bin/python3
+"""This module prepares rows for the bulk_insert() of the storage engines"""
+import json
+import uuid
+from datetime import datetime
+from models import timestamp
+
+
+def read(path):
+    """Yields the rows of a JSON file
+
+    The file holds either a JSON array of objects, or one object per line
+    (JSON Lines), which is read one line at a time.
+    """
+    with open(path, 'r') as f:
+        first = f.readline()
+        if first.lstrip().startswith('['):
+            f.seek(0)
+            yield from json.load(f)
+            return
+        if first.strip():
+            yield json.loads(first)
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def records(cls, rows):
+    """Yields rows completed into the to_dict() form of instances of cls
+
+    Rows missing an id or dates get new ones, as a new instance would. A
+    row naming another class raises ValueError.
+    """
+    name = cls.__name__
+    for row in rows:
+        record = dict(row)
+        if record.setdefault('__class__', name) != name:
+            raise ValueError("row of class {} in an import of {}".format(
+                record['__class__'], name))
+        if 'id' not in record:
+            record['id'] = str(uuid.uuid4())
+        if 'created_at' not in record or 'updated_at' not in record:
+            now = timestamp.format(datetime.now())
+            record.setdefault('created_at', now)
+            record.setdefault('updated_at', now)
+        yield record
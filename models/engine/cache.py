@@ -0,0 +1,224 @@
+#!/usr/bin/python3
+"""This module defines a read-through cache in front of a storage engine"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from os import environ
+from types import MappingProxyType
+
+
+class CachedStorage:
+    """Keeps the results of all(), get() and count() of a storage
+
+    Results expire after the TTL of their class, ttls mapping class names
+    to seconds and ttl applying to the others. The least recently used
+    results are evicted past max_entries results or, when max_bytes is
+    set, past about max_bytes of objects. new(), touch(), delete(),
+    bulk_insert() and save() drop the results involving the classes they
+    change; every other call goes to the storage unchanged.
+
+    Cached objects are shared by every caller. When the storage has a
+    detach() method, as DBStorage does, they are detached from the
+    session of the thread that read them first, and results that
+    detach() refuses, such as objects with unsaved changes, are returned
+    without being cached.
+    """
+
+    def __init__(self, storage, ttl=None, ttls=None, max_entries=None,
+                 max_bytes=None):
+        """Puts a cache in front of storage
+
+        Settings left to None are read from HBNB_CACHE_TTL,
+        HBNB_CACHE_TTLS (as State=3600,Amenity=3600), HBNB_CACHE_ENTRIES
+        and HBNB_CACHE_BYTES.
+        """
+        if ttls is None:
+            ttls = {}
+            for item in environ.get('HBNB_CACHE_TTLS', '').split(','):
+                if item.strip():
+                    name, seconds = item.split('=')
+                    ttls[name.strip()] = float(seconds)
+        self.__storage = storage
+        self.__ttl = float(environ.get('HBNB_CACHE_TTL', '60')) \
+            if ttl is None else ttl
+        self.__ttls = ttls
+        self.__max_entries = int(environ.get('HBNB_CACHE_ENTRIES', '1024')) \
+            if max_entries is None else max_entries
+        self.__max_bytes = int(environ.get('HBNB_CACHE_BYTES', '0')) \
+            if max_bytes is None else max_bytes
+        self.__lock = threading.RLock()
+        self.__entries = OrderedDict()
+        self.__by_class = {}
+        self.__bytes = 0
+        self.__changed = set()
+        self.__generation = 0
+        self.__counts = dict.fromkeys(['hits', 'misses', 'expired',
+                                       'evicted', 'invalidated'], 0)
+
+    def __getattr__(self, name):
+        """Passes the calls the cache does not handle to the storage"""
+        return getattr(self.__storage, name)
+
+    def all(self, cls=None, view=False):
+        """Returns the stored objects, optionally of a class, cached"""
+        objs = self.__cached(('all', cls), cls,
+                             lambda: self.__storage.all(cls))
+        return MappingProxyType(objs) if view else dict(objs)
+
+    def get(self, cls, id):
+        """Returns the object of cls with the given id, cached if found"""
+        return self.__cached(('get', cls, id), cls,
+                             lambda: self.__storage.get(cls, id))
+
+    def count(self, cls=None):
+        """Returns the number of stored objects, cached"""
+        return self.__cached(('count', cls), cls,
+                             lambda: self.__storage.count(cls))
+
+    def new(self, obj):
+        """Stores obj and drops the results involving its class"""
+        self.__storage.new(obj)
+        self.__change(type(obj))
+
+    def touch(self, obj):
+        """Marks obj as changed and drops the results involving its class"""
+        self.__storage.touch(obj)
+        self.__change(type(obj))
+
+    def delete(self, obj=None):
+        """Deletes obj and drops the results involving its class"""
+        self.__storage.delete(obj)
+        if obj is not None:
+            self.__change(type(obj))
+
+    def bulk_insert(self, cls, rows, *args, **kwargs):
+        """Inserts rows and drops the results involving cls"""
+        try:
+            return self.__storage.bulk_insert(cls, rows, *args, **kwargs)
+        finally:
+            self.__change(cls)
+
+    def save(self):
+        """Saves and drops the results of the classes changed since the
+        last save, which may have been read again in between
+        """
+        self.__storage.save()
+        with self.__lock:
+            changed, self.__changed = self.__changed, set()
+            for cls in changed:
+                self.__invalidate(cls)
+
+    @contextmanager
+    def batch(self):
+        """Runs a batch() of the storage, emptying the cache on rollback"""
+        try:
+            with self.__storage.batch():
+                yield self
+        except BaseException:
+            self.clear()
+            raise
+
+    def reload(self):
+        """Reloads the storage and empties the cache"""
+        self.__storage.reload()
+        self.clear()
+
+    def clear(self):
+        """Drops every cached result"""
+        with self.__lock:
+            self.__entries.clear()
+            self.__by_class.clear()
+            self.__bytes = 0
+            self.__generation += 1
+
+    def stats(self):
+        """Returns the counters of the cache with its current size"""
+        with self.__lock:
+            stats = dict(self.__counts)
+            stats['entries'] = len(self.__entries)
+            stats['bytes'] = self.__bytes
+        return stats
+
+    def __cached(self, key, cls, load):
+        """Returns the cached result of key, or loads and caches it
+
+        The storage is read outside the lock; a result read while the
+        cache was invalidated may be stale, and is not kept.
+        """
+        now = time.monotonic()
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self.__entries.move_to_end(key)
+                    self.__counts['hits'] += 1
+                    return entry[1]
+                self.__drop(key)
+                self.__counts['expired'] += 1
+            self.__counts['misses'] += 1
+            generation = self.__generation
+        value = load()
+        if value is None or not self.__detach(value):
+            return value
+        with self.__lock:
+            if generation != self.__generation:
+                return value
+            if key in self.__entries:
+                self.__drop(key)
+            name = cls.__name__ if cls is not None else None
+            ttl = self.__ttls.get(name, self.__ttl)
+            size = self.__size(value) if self.__max_bytes else 0
+            self.__entries[key] = (now + ttl, value, size, name)
+            self.__by_class.setdefault(name, set()).add(key)
+            self.__bytes += size
+            while len(self.__entries) > self.__max_entries or \
+                    (self.__max_bytes and self.__bytes > self.__max_bytes
+                     and len(self.__entries) > 1):
+                self.__drop(next(iter(self.__entries)))
+                self.__counts['evicted'] += 1
+            return value
+
+    def __detach(self, value):
+        """Tells whether value can be cached, detaching its objects"""
+        detach = getattr(self.__storage, 'detach', None)
+        if detach is None or isinstance(value, int):
+            return True
+        return detach(list(value.values()) if isinstance(value, dict)
+                      else [value])
+
+    def __drop(self, key):
+        """Removes the result of key"""
+        expires, value, size, name = self.__entries.pop(key)
+        self.__bytes -= size
+        keys = self.__by_class[name]
+        keys.discard(key)
+        if not keys:
+            del self.__by_class[name]
+
+    def __change(self, cls):
+        """Drops the results involving cls until the next save"""
+        with self.__lock:
+            self.__changed.add(cls)
+            self.__invalidate(cls)
+
+    def __invalidate(self, cls):
+        """Drops the results of cls, of its bases and of every class"""
+        with self.__lock:
+            self.__generation += 1
+            for name in [None] + [base.__name__ for base in cls.__mro__]:
+                for key in list(self.__by_class.get(name, ())):
+                    self.__drop(key)
+                    self.__counts['invalidated'] += 1
+
+    @staticmethod
+    def __size(value):
+        """Returns about how many bytes value and its objects take"""
+        objs = value.values() if isinstance(value, dict) else [value]
+        size = sys.getsizeof(value) if isinstance(value, dict) else 0
+        for obj in objs:
+            size += sys.getsizeof(obj)
+            for val in getattr(obj, '__dict__', {}).values():
+                size += sys.getsizeof(val)
+        return size
@@ -11,9 +11,20 @@ from models.amenity import Amenity
 from models.place import Place
 from models.review import Review
 
-from sqlalchemy import create_engine
+from models import timestamp
+from models.engine import bulk, relations
+from models.engine.query import OPERATORS, Query
+from models.engine.pool_metrics import PoolMetrics
+
+from sqlalchemy import create_engine, event, insert, inspect
 from sqlalchemy.orm import sessionmaker, scoped_session
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import heapq
+import itertools
 from os import environ
+import time
+from types import MappingProxyType
 
 
 class DBStorage:
@@ -21,6 +32,7 @@ class DBStorage:
 
     __engine = None
     __session = None
+    __indexes = []
 
     def __init__(self):
         """Initialize the DBStorage instance."""
@@ -30,16 +42,36 @@ class DBStorage:
         sql_db = environ.get('HBNB_MYSQL_DB', 'hbnb_dev')
         sql_env = environ.get('HBNB_ENV', 'development')
 
-        self.__engine = create_engine(
-                f'mysql+mysqldb://{sql_user}:{sql_pwd}@{sql_host}/{sql_db}',
-                pool_pre_ping=True
-        )
+        sql_url = environ.get(
+                'HBNB_DB_URL',
+                f'mysql+mysqldb://{sql_user}:{sql_pwd}@{sql_host}/{sql_db}')
+
+        pool = {'pool_pre_ping':
+                environ.get('HBNB_MYSQL_POOL_PRE_PING', '1') == '1'}
+        for name in ['pool_size', 'max_overflow', 'pool_timeout',
+                     'pool_recycle']:
+            value = environ.get('HBNB_MYSQL_' + name.upper())
+            if value is not None:
+                pool[name] = int(value)
+
+        self.__workers = int(environ.get('HBNB_MYSQL_FETCH_WORKERS', '1'))
+        self.__timings = {}
+        self.__engine = create_engine(sql_url, **pool)
+        self.__metrics = PoolMetrics(self.__engine,
+                                     pool.get('max_overflow', 10))
 
         if sql_env == "test":
             Base.metadata.drop_all(bind=self.__engine)
 
-    def all(self, cls=None):
-        """Retrieve a dictionary of models currently in storage."""
+    def all(self, cls=None, view=False):
+        """Retrieve a dictionary of models currently in storage.
+
+        With view=True the result is returned as a read-only mapping.
+        Without a class, the tables are read concurrently when
+        HBNB_MYSQL_FETCH_WORKERS is above 1 and the session holds no
+        uncommitted changes. The time spent on each table is kept for
+        timings().
+        """
         session = self.__session
 
         if not cls:
@@ -47,39 +79,438 @@ class DBStorage:
         else:
             tables = [cls]
 
+        if len(tables) > 1 and self.__workers > 1 and not (
+                session.info.get('flushed') or self.__batches or
+                session.new or session.dirty or session.deleted):
+            results = self.__fetch_all(tables)
+        else:
+            results = [self.__fetch_table(session, table)
+                       for table in tables]
+
         obj_dict = {}
-        for table in tables:
-            query_result = session.query(table).all()
+        for table, (query_result, elapsed) in zip(tables, results):
+            self.__timings[table.__name__] = elapsed
 
             for row in query_result:
                 key = f"{type(row).__name__}.{row.id}"
                 obj_dict[key] = row
 
+        if view:
+            return MappingProxyType(obj_dict)
         return obj_dict
 
+    def timings(self):
+        """Return the seconds the last all() spent reading each table."""
+        return dict(self.__timings)
+
+    def pool_metrics(self):
+        """Return the counters and current state of the connection pool."""
+        return self.__metrics.snapshot()
+
+    def count(self, cls=None):
+        """Count the rows in storage, optionally filtered by class."""
+        tables = [cls] if cls else [User, State, City, Amenity, Place, Review]
+        return sum(self.__session.query(table).count() for table in tables)
+
+    def get(self, cls, id):
+        """Retrieve one object by class and id, or None if not found."""
+        return self.__session.get(cls, id)
+
     def new(self, obj):
         """Add a new object to the current database session."""
         self.__session.add(obj)
+        self.__notify('add', obj)
+
+    def touch(self, obj):
+        """Mark obj as changed; the session already tracks this itself.
+
+        A detached obj, such as one kept by a cache after its session was
+        closed, is added to the session of this thread to be saved. The
+        indexes only hear of objects stored in that session, not of ones
+        that were never added, like FileStorage.touch().
+        """
+        state = inspect(obj)
+        if state.detached:
+            self.__session.add(obj)
+        if (state.pending or state.persistent) and obj in self.__session:
+            self.__notify('add', obj)
+
+    def detach(self, objs):
+        """Detach objs from the session of this thread to share them.
+
+        Return False and leave every obj attached when one of them is
+        new, deleted, changed or expired, as detaching it would lose its
+        changes or leave attributes that can no longer be loaded.
+        """
+        session = self.__session
+        states = [inspect(obj) for obj in objs]
+        if any(state.pending or state.deleted or state.modified or
+               state.expired_attributes for state in states):
+            return False
+        for obj in objs:
+            if obj in session:
+                session.expunge(obj)
+        return True
+
+    def remember(self, obj):
+        """Do nothing; the session keeps what a rollback needs itself."""
+
+    @contextmanager
+    def batch(self):
+        """Commit once when the outermost block exits, roll back on error.
+
+        save() calls made in the block are left to that commit. Nested
+        blocks run in a savepoint, so an inner block that raises only
+        undoes its own changes.
+        """
+        savepoint = self.__session.begin_nested() if self.__batches \
+            else None
+        self.__batches.append([])
+        try:
+            yield self
+        except BaseException:
+            changed = self.__batches.pop()
+            if savepoint is None:
+                self.__session.rollback()
+            else:
+                savepoint.rollback()
+            self.__renotify(changed)
+            raise
+        changed = self.__batches.pop()
+        if savepoint is None:
+            self.__session.commit()
+        else:
+            savepoint.commit()
+            self.__batches[-1].extend(changed)
+
+    def bulk_insert(self, cls, rows, batch_size=1000):
+        """Insert a row of cls for every dict of rows, bypassing the ORM.
+
+        rows are dicts in the form of to_dict(); missing ids and dates are
+        filled in and keys that are not columns are ignored. Rows go out
+        in multi-row INSERTs of batch_size rows, each committed on its own
+        unless inside batch(). Returns the number of rows inserted.
+        """
+        table = cls.__table__
+        columns = set(table.columns.keys())
+        dates = {'created_at', 'updated_at'} & columns
+        indexed = [index for index in self.__indexes
+                   if issubclass(cls, index.classes)]
+        records = bulk.records(cls, rows)
+        count = 0
+        while True:
+            chunk = list(itertools.islice(records, batch_size))
+            if not chunk:
+                return count
+            values = []
+            for record in chunk:
+                row = {key: val for key, val in record.items()
+                       if key in columns}
+                for key in dates:
+                    row[key] = timestamp.parse(row[key])
+                values.append(row)
+            self.__session.execute(insert(table), values)
+            if not self.__batches:
+                self.__session.commit()
+            if indexed:
+                for record in chunk:
+                    self.__notify('add', cls(**record))
+            count += len(chunk)
+            if batch_size is None or len(chunk) < batch_size:
+                return count
+
+    def page(self, cls=None, limit=100, after=None):
+        """Return up to limit objects ordered by id, after the id after.
+
+        Passing the id of the last object of a page as after returns the
+        next one (keyset pagination). Each table is queried with WHERE id
+        > after ORDER BY id LIMIT limit, served by its primary key.
+        """
+        tables = [cls] if cls else [User, State, City, Amenity, Place, Review]
+        rows = []
+        for table in tables:
+            query = self.__session.query(table)
+            if after is not None:
+                query = query.filter(table.id > after)
+            rows.extend(query.order_by(table.id).limit(limit))
+        rows.sort(key=lambda row: row.id)
+        return rows[:limit]
+
+    def iterate(self, cls=None, batch_size=1000):
+        """Yield the objects in storage, optionally filtered by class.
+
+        Objects come in id order, like page(). The rows of one class are
+        streamed from a server-side cursor batch_size at a time with
+        yield_per(), so memory does not grow with the table size. Without
+        a class, the tables are read one keyset page at a time and merged
+        by id, since a connection holds one streaming cursor at a time.
+        """
+        if cls:
+            query = self.__session.query(cls).order_by(cls.id)
+            yield from query.execution_options(
+                stream_results=True).yield_per(batch_size)
+            return
+        tables = [User, State, City, Amenity, Place, Review]
+        yield from heapq.merge(*(self.__pages(table, batch_size)
+                                 for table in tables),
+                               key=lambda row: row.id)
+
+    def __pages(self, cls, batch_size):
+        """Yield the objects of cls in id order, a page at a time"""
+        after = None
+        while True:
+            rows = self.page(cls, batch_size, after)
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            after = rows[-1].id
+
+    def query(self, cls):
+        """Return a Query on the rows of cls, run as one SELECT.
+
+        Conditions become the WHERE clause, order_by() the ORDER BY,
+        limit() the LIMIT, and only() selects just those columns.
+        """
+        return Query(cls, self.__query)
+
+    def search(self, text, cls=None, limit=10):
+        """Return the Places and Reviews best matching text, best first.
+
+        The TextIndex answering it is built from the rows on first use.
+        """
+        from models.engine.text_index import TextIndex
+
+        index = self.__index_of(TextIndex)
+        names = None if cls is None else [
+            model.__name__ for model in [Place, Review]
+            if issubclass(model, cls)]
+        classes = {'Place': Place, 'Review': Review}
+        return [self.get(classes[key.split('.')[0]], key.split('.', 1)[1])
+                for key, score in index.search(text, names, limit)]
+
+    def totals(self, parent):
+        """Return the counters kept for parent.
+
+        A Place has its number of reviews, a City or a State its number
+        of places and their average price_by_night. The Aggregates index
+        behind them reads the rows once, then follows the changes made
+        through this storage.
+
+        The counters live in the memory of this process. They take in
+        changes as they are made, before they are committed, and none
+        made by other processes, so with several processes on one
+        database they are only right up to the last rebuild_totals().
+        """
+        from models.engine.aggregates import Aggregates
+
+        index = self.__index_of(Aggregates)
+        return index.totals(type(parent).__name__, parent.id)
+
+    def rebuild_totals(self):
+        """Count the rows behind totals() again, including changes made
+        by other processes."""
+        from models.engine.aggregates import Aggregates
+
+        self.__indexes[:] = [index for index in self.__indexes
+                             if type(index) is not Aggregates]
+        self.register(Aggregates())
+
+    def children(self, parent, cls):
+        """Return the objects of cls linked to parent, in one query."""
+        return self.related([parent], cls)[parent.id]
+
+    def related(self, parents, cls):
+        """Return the objects of cls linked to each of parents.
+
+        parents are instances of one class. The result maps the id of
+        every parent to a list of objects, loaded with one IN query per
+        500 parents, as selectinload() does, rather than one per parent.
+        """
+        parents = list(parents)
+        result = {parent.id: [] for parent in parents}
+        if not parents:
+            return result
+        kind, field = relations.link(type(parents[0]), cls)
+        if kind == 'ids':
+            wanted = {parent.id: list(getattr(parent, field))
+                      for parent in parents}
+            ids = {id for ids in wanted.values() for id in ids}
+            found = {row.id: row for row in self.__fetch_in(cls.id, ids)}
+            for parent_id, ids in wanted.items():
+                result[parent_id] = [found[id] for id in ids if id in found]
+        else:
+            for row in self.__fetch_in(getattr(cls, field), result):
+                result[getattr(row, field)].append(row)
+        return result
+
+    def register(self, index):
+        """Attach an index that follows the objects going through storage.
+
+        index has a classes tuple and add(obj) and remove(obj) methods.
+        It is first fed every stored instance of its classes.
+        """
+        self.__indexes.append(index)
+        for cls in index.classes:
+            for obj in self.all(cls).values():
+                index.add(obj)
+
+    def nearby(self, lat, lon, km):
+        """Return the Places within km of a point, nearest first."""
+        from models.engine.geo_index import PlaceGeoIndex
+
+        index = self.__index_of(PlaceGeoIndex)
+        return self.__fetch(Place, index.nearby(lat, lon, km))
+
+    def within(self, south, west, north, east):
+        """Return the Places inside a latitude/longitude bounding box."""
+        from models.engine.geo_index import PlaceGeoIndex
+
+        index = self.__index_of(PlaceGeoIndex)
+        return self.__fetch(Place, index.within(south, west, north, east))
 
     def save(self):
-        """Commit all changes of the current database session."""
-        self.__session.commit()
+        """Commit all changes of the current database session.
+
+        Inside a batch() block the commit is left to the end of the block.
+        """
+        if not self.__batches:
+            self.__session.commit()
 
     def delete(self, obj=None):
         """Delete an object from the current database session if not None."""
         if obj:
             self.__session.delete(obj)
+            self.__notify('remove', obj)
 
     def reload(self):
         """
         Create all tables in the database and creates current database session.
+
+        Every thread gets a session of its own, created on first use and
+        discarded by close().
         """
         Base.metadata.create_all(self.__engine)
         session_factory = sessionmaker(bind=self.__engine,
                                        expire_on_commit=False)
-        Session = scoped_session(session_factory)
-        self.__session = Session()
+        event.listen(session_factory, 'after_flush', self.__on_flush)
+        event.listen(session_factory, 'after_commit', self.__on_end)
+        event.listen(session_factory, 'after_rollback', self.__on_end)
+        self.__factory = session_factory
+        self.__session = scoped_session(session_factory)
+
+    def __fetch_all(self, tables):
+        """Read tables on parallel connections into the current session.
+
+        Each table is read by a worker with a session of its own. The
+        rows are then merged into the current session without another
+        query, so they are the instances its own queries return.
+        """
+        def fetch(table):
+            """Read table in a short-lived session of this thread."""
+            with self.__factory() as session:
+                rows, elapsed = self.__fetch_table(session, table)
+                session.expunge_all()
+            return rows, elapsed
+
+        workers = min(self.__workers, len(tables))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(fetch, tables))
+        merge = self.__session.merge
+        return [([merge(row, load=False) for row in rows], elapsed)
+                for rows, elapsed in results]
+
+    @staticmethod
+    def __fetch_table(session, table):
+        """Return the rows of table and the seconds taken to read them."""
+        start = time.perf_counter()
+        rows = session.query(table).all()
+        return rows, time.perf_counter() - start
+
+    @property
+    def __batches(self):
+        """The open batch() blocks of the session of this thread."""
+        return self.__session.info.setdefault('batches', [])
+
+    @staticmethod
+    def __on_flush(session, context):
+        """Note that session holds changes other connections cannot see."""
+        session.info['flushed'] = True
+
+    @staticmethod
+    def __on_end(session):
+        """Note that the flushed changes of session were committed or not."""
+        session.info['flushed'] = False
+
+    def __index_of(self, kind):
+        """Return the registered index of type kind, registering one."""
+        for index in self.__indexes:
+            if type(index) is kind:
+                return index
+        index = kind()
+        self.register(index)
+        return index
+
+    def __fetch(self, cls, ids):
+        """Load the rows of cls with the given ids in one query, in order."""
+        if not ids:
+            return []
+        rows = self.__session.query(cls).filter(cls.id.in_(ids)).all()
+        by_id = {row.id: row for row in rows}
+        return [by_id[id] for id in ids if id in by_id]
+
+    def __query(self, query):
+        """Compile query into a single SELECT and return its results."""
+        cls = query.cls
+        if query.fields is not None:
+            rows = self.__session.query(
+                *[getattr(cls, field) for field in query.fields])
+        else:
+            rows = self.__session.query(cls)
+        for field, op, value in query.filters:
+            column = getattr(cls, field)
+            if op == 'in':
+                rows = rows.filter(column.in_(value))
+            else:
+                rows = rows.filter(OPERATORS[op](column, value))
+        for field, reverse in query.order:
+            column = getattr(cls, field)
+            rows = rows.order_by(column.desc() if reverse else column)
+        if query.size is not None:
+            rows = rows.limit(query.size)
+        if query.fields is not None:
+            return [dict(zip(query.fields, row)) for row in rows]
+        return rows.all()
+
+    def __fetch_in(self, column, values, size=500):
+        """Load the rows whose column is in values, size values a query."""
+        values = list(values)
+        rows = []
+        for start in range(0, len(values), size):
+            chunk = values[start:start + size]
+            rows.extend(self.__session.query(column.class_)
+                        .filter(column.in_(chunk)))
+        return rows
+
+    def __renotify(self, objs):
+        """Tell indexes the state objs are left in after a rollback."""
+        for obj in {id(obj): obj for obj in objs}.values():
+            event = 'add' if inspect(obj).persistent else 'remove'
+            for index in self.__indexes:
+                if isinstance(obj, index.classes):
+                    getattr(index, event)(obj)
+
+    def __notify(self, event, obj):
+        """Pass obj to the add or remove method of interested indexes."""
+        if self.__batches:
+            self.__batches[-1].append(obj)
+        for index in self.__indexes:
+            if isinstance(obj, index.classes):
+                getattr(index, event)(obj)
 
     def close(self):
-        """Close the current session."""
-        self.__session.close()
+        """Close and discard the session of this thread.
+
+        The next call from the thread starts a new session, so calling
+        close() at the end of each request gives every request its own.
+        """
+        self.__session.remove()
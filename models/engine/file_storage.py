@@ -1,37 +1,457 @@
 #!/usr/bin/python3
 """This module defines a class to manage file storage for hbnb clone"""
+import itertools
 import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from os import environ
+from types import MappingProxyType
+from models.engine import bulk, relations, serializers
+from models.engine.query import Query
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+CONTAINERS = frozenset([list, dict, set])
 
 
 class FileStorage:
-    """This class manages storage of hbnb models in JSON format"""
+    """This class manages storage of hbnb models in JSON format
+
+    By default every save rewrites the whole file. When HBNB_FILE_JOURNAL
+    is set to 1, saves only append the changed objects to a journal next
+    to the file; reload replays it over the last snapshot and it is folded
+    back into the snapshot in the background once it grows past
+    HBNB_FILE_JOURNAL_MAX bytes.
+
+    Files are always written to a temporary file renamed into place, so a
+    crash never leaves a truncated file behind. HBNB_FILE_FSYNC picks when
+    writes are flushed to disk: "always", "never" (the default) or
+    "interval", which flushes at most every HBNB_FILE_FSYNC_MS milliseconds.
+
+    Objects report their changes through touch(), and the encoded form of
+    unchanged objects is kept between saves so that only changed objects
+    are serialized again. Objects holding lists or dicts, which can change
+    in place without touch(), are compared with their saved state instead.
+
+    HBNB_FILE_SERIALIZER picks how the file is encoded: "json" (the
+    default), or one of the binary serializers "pickle", "marshal" and,
+    when it is installed, "msgpack". reload() reads any of them, and
+    convert() rewrites the file with another one.
+
+    With HBNB_FILE_LAZY set to 1, reload only keeps the loaded records and
+    builds a model instance the first time it is reached through all() or
+    get().
+
+    Indexes attached with register() are told about every object that is
+    added, changed or removed.
+
+    Threads share the stored objects under a lock, and processes sharing
+    the file take an advisory lock on file.json.lock around every read and
+    write of it. Before rewriting the file, save() merges in the records
+    other processes saved since this one last read or wrote it; refresh()
+    does the same on demand.
+
+    Inside a batch() block, saves are deferred to the end of the block and
+    its changes are undone if it raises.
+    """
     __file_path = 'file.json'
     __objects = {}
+    __classes = {}
+    __dirty = set()
+    __fragments = {}
+    __containers = {}
+    __raw = {}
+    __types = {}
+    __indexes = []
+    __legacy = False
+    __decoder = json.JSONDecoder()
+    __compactor = None
+    __synced_at = 0.0
+    __unsynced = set()
+    __sync_timer = None
+    __lock = threading.RLock()
+    __seen = None
+    __undo = []
+
+    def __init__(self):
+        """Reads the storage options from the environment"""
+        self.__journal = environ.get('HBNB_FILE_JOURNAL') == '1'
+        self.__journal_max = int(environ.get('HBNB_FILE_JOURNAL_MAX',
+                                             1024 * 1024))
+        self.__lazy = environ.get('HBNB_FILE_LAZY') == '1'
+        self.__fsync = environ.get('HBNB_FILE_FSYNC', 'never')
+        self.__fsync_ms = int(environ.get('HBNB_FILE_FSYNC_MS', 1000))
+        if self.__fsync not in ('always', 'interval', 'never'):
+            raise ValueError("HBNB_FILE_FSYNC must be always, interval "
+                             "or never")
+        self.__serializer = serializers.get(
+            environ.get('HBNB_FILE_SERIALIZER', 'json'))
+
+    def all(self, cls=None, view=False):
+        """returns a dictionary of objects, optionally filetered by a class.
 
-    def all(self, cls=None):
-        """returns a dictionary of objects, optionally filetered by a class."""
-        if cls is None:
-            return self.__objects
-        return {
-            key: obj for key, obj in self.__objects.items()
-            if isinstance(obj, cls)
-        }
+        Without cls, the dictionary of every stored object is returned
+        itself, not a copy: add and delete objects with new() and delete()
+        rather than through it, and copy it before iterating while other
+        threads change the storage. Objects are also kept in per-class
+        buckets, so filtering by class only touches the matching objects
+        and returns a copy of them. With view=True a read-only view is
+        returned instead; it follows later changes when cls has no stored
+        subclasses, and is not safe to iterate while other threads change
+        the storage either.
+        """
+        with self.__lock:
+            if self.__raw:
+                self.__hydrate(cls)
+            if cls is None:
+                objs = self.__objects
+            else:
+                buckets = self.__buckets(cls)
+                if view and not buckets:
+                    buckets = [self.__classes.setdefault(cls, {})]
+                if len(buckets) == 1:
+                    objs = buckets[0] if view else dict(buckets[0])
+                else:
+                    objs = {}
+                    for bucket in buckets:
+                        objs.update(bucket)
+            if view:
+                return MappingProxyType(objs)
+            return objs
+
+    def count(self, cls=None):
+        """Returns the number of objects in storage, optionally by class"""
+        with self.__lock:
+            raw = sum(len(bucket) for name, bucket in self.__raw.items()
+                      if cls is None or issubclass(self.__types[name], cls))
+            if cls is None:
+                return len(self.__objects) + raw
+            return sum(len(bucket) for bucket in self.__buckets(cls)) + raw
+
+    def get(self, cls, id):
+        """Returns the object of class cls with the given id, or None"""
+        key = cls.__name__ + '.' + id
+        with self.__lock:
+            obj = self.__objects.get(key)
+            if obj is None and key in self.__raw.get(cls.__name__, ()):
+                obj = self.__build(key, self.__raw[cls.__name__].pop(key))
+            return obj
 
     def new(self, obj):
         """Adds new object to storage dictionary"""
-        self.all().update({obj.to_dict()['__class__'] + '.' + obj.id: obj})
+        key = type(obj).__name__ + '.' + obj.id
+        with self.__lock:
+            if self.__undo:
+                self.__capture(key)
+            if self.__raw:
+                self.__raw.get(type(obj).__name__, {}).pop(key, None)
+            self.__add(key, obj)
+            self.__dirty.add(key)
+            self.__notify('add', obj)
+
+    def touch(self, obj):
+        """Marks obj as changed since the last save if it is stored
+
+        BaseModel calls this on every attribute assignment. The lock is
+        taken even without indexes, as save() goes through the changed
+        keys and then forgets them.
+        """
+        key = type(obj).__name__ + '.' + obj.id
+        with self.__lock:
+            if key in self.__objects:
+                self.__dirty.add(key)
+                self.__notify('add', obj)
+
+    def remember(self, obj):
+        """Keeps the state of obj before a batch changes it
+
+        BaseModel calls this before every attribute assignment, so that a
+        failed batch() can put the object back as it was.
+        """
+        if not self.__undo:
+            return
+        key = type(obj).__name__ + '.' + obj.id
+        with self.__lock:
+            if self.__undo:
+                self.__capture(key)
+
+    @contextmanager
+    def batch(self):
+        """Defers saving to the end of the block, undoing it on error
+
+        save() calls made in the block, including those of BaseModel.save()
+        and delete(), are replaced by a single save() when the outermost
+        block exits. If a block raises, the objects it added, changed or
+        deleted are put back as they were when it started; changed objects
+        are replaced by new instances built from that state. Other threads
+        wait for the block to finish before using the storage.
+        """
+        with self.__lock:
+            self.__undo.append(({}, set(self.__dirty)))
+            try:
+                yield self
+            except BaseException:
+                self.__rollback(*self.__undo.pop())
+                raise
+            changes = self.__undo.pop()[0]
+            if self.__undo:
+                for key, record in changes.items():
+                    self.__undo[-1][0].setdefault(key, record)
+                return
+            self.save()
+
+    def bulk_insert(self, cls, rows, batch_size=None):
+        """Stores a new instance of cls for every row and saves them
+
+        rows are dicts in the form of to_dict(); missing ids and dates are
+        filled in. The instances are saved once at the end or, with a
+        batch_size, after every batch_size rows. A chunk that fails is
+        rolled back. Returns the number of rows stored.
+        """
+        records = bulk.records(cls, rows)
+        count = 0
+        while True:
+            size = 0
+            with self.batch():
+                for record in itertools.islice(records, batch_size):
+                    self.new(cls(**record))
+                    size += 1
+            count += size
+            if batch_size is None or size < batch_size:
+                return count
+
+    def page(self, cls=None, limit=100, after=None):
+        """Returns up to limit objects ordered by id, after the id after
+
+        Passing the id of the last object of a page as after returns the
+        next one (keyset pagination). cls also matches its subclasses.
+        """
+        from models.base_model import BaseModel
+        from models.engine.id_index import IdIndex
+
+        with self.__lock:
+            index = self.__index_of(IdIndex, (cls or BaseModel,))
+            names = [name for name, model in self.__types.items()
+                     if cls is None or issubclass(model, cls)]
+            return [self.get(self.__types[name], id)
+                    for name, id in index.page(names, limit, after)]
+
+    def iterate(self, cls=None, batch_size=1000):
+        """Yields the stored objects, optionally of a class, ordered by id
+
+        Objects are fetched one page of batch_size at a time, so the
+        storage may change during the iteration.
+        """
+        after = None
+        while True:
+            objs = self.page(cls, batch_size, after)
+            yield from objs
+            if len(objs) < batch_size:
+                return
+            after = objs[-1].id
+
+    def query(self, cls):
+        """Returns a Query on the stored objects of cls
+
+        A registered ForeignKeyIndex narrows equality conditions on the
+        *_id fields of the class, and a registered PlaceColumns the numeric
+        conditions on Places. Records still held as loaded in lazy mode
+        are matched and projected without building their objects.
+        """
+        return Query(cls, self.__query)
+
+    def search(self, text, cls=None, limit=10):
+        """Returns the Places and Reviews best matching text, best first
+
+        cls restricts the results to Places or to Reviews. The TextIndex
+        answering it is written to file.json.search by the save after it
+        is built, and read back by reload() while the Places and Reviews
+        saved are unchanged, so it is only rebuilt when it is missing or
+        stale. Saves that leave their text alone only update the small
+        file.json.search.stamp, in every process.
+        """
+        with self.__lock:
+            index = self.__text_index()
+            names = None if cls is None else [
+                name for name, model in self.__types.items()
+                if issubclass(model, cls)]
+            return [self.get(self.__types[key.split('.')[0]],
+                             key.split('.', 1)[1])
+                    for key, score in index.search(text, names, limit)]
+
+    def totals(self, parent):
+        """Returns the counters kept for parent
+
+        A Place has its number of reviews, a City or a State its number
+        of places and their average price_by_night. They are read from
+        an Aggregates index, updated by every new, changed and deleted
+        City, Place and Review, so no objects are scanned.
+        """
+        from models.engine.aggregates import Aggregates
+
+        with self.__lock:
+            index = self.__index_of(Aggregates)
+            return index.totals(type(parent).__name__, parent.id)
+
+    def rebuild_totals(self):
+        """Counts the objects behind totals() again from scratch"""
+        from models.engine.aggregates import Aggregates
+
+        with self.__lock:
+            self.__indexes[:] = [index for index in self.__indexes
+                                 if type(index) is not Aggregates]
+            self.register(Aggregates())
+
+    def children(self, parent, cls):
+        """Returns the objects of cls linked to parent
+
+        A City is a child of the State its state_id names, a Review of
+        its Place and of its User, and so on. They are found in the
+        foreign key index, which follows every new, changed, deleted and
+        reloaded object.
+        """
+        return self.related([parent], cls)[parent.id]
+
+    def related(self, parents, cls):
+        """Returns the objects of cls linked to each of parents
+
+        The result maps the id of every parent to a list of objects, found
+        through the foreign key index, or the id list of the parent for
+        Place.amenity_ids, without scanning the stored objects.
+        """
+        from models.engine.fk_index import ForeignKeyIndex
+
+        result = {}
+        with self.__lock:
+            index = self.__index_of(ForeignKeyIndex, (cls,))
+            for parent in parents:
+                kind, field = relations.link(type(parent), cls)
+                if kind == 'ids':
+                    ids = getattr(parent, field)
+                else:
+                    ids = index.children(cls.__name__, field, parent.id)
+                objs = (self.get(cls, id) for id in ids)
+                result[parent.id] = [obj for obj in objs if obj is not None]
+        return result
+
+    def register(self, index):
+        """Attaches an index that follows the stored objects
+
+        index has a classes tuple and add(obj) and remove(obj) methods.
+        It is first fed every stored instance of its classes, then every
+        one that is added, changed or deleted.
+        """
+        with self.__lock:
+            self.__indexes.append(index)
+            self.__feed(index)
+
+    def nearby(self, lat, lon, km):
+        """Returns the Places within km of a point, nearest first"""
+        from models.engine.geo_index import PlaceGeoIndex
+        from models.place import Place
+
+        with self.__lock:
+            index = self.__index_of(PlaceGeoIndex)
+            return [self.get(Place, id)
+                    for id in index.nearby(lat, lon, km)]
+
+    def within(self, south, west, north, east):
+        """Returns the Places inside a latitude/longitude bounding box"""
+        from models.engine.geo_index import PlaceGeoIndex
+        from models.place import Place
+
+        with self.__lock:
+            index = self.__index_of(PlaceGeoIndex)
+            return [self.get(Place, id)
+                    for id in index.within(south, west, north, east)]
 
     def save(self):
-        """Saves storage dictionary to file"""
-        with open(FileStorage.__file_path, 'w') as f:
-            temp = {}
-            temp.update(FileStorage.__objects)
-            for key, val in temp.items():
-                temp[key] = val.to_dict()
-            json.dump(temp, f)
+        """Saves storage dictionary to file
+
+        The file is written out one record at a time: one per line of a
+        JSON object, or one per frame for the binary serializers. Inside
+        a batch() block, the save is left to the end of the block.
+        """
+        if self.__undo:
+            with self.__lock:
+                if self.__undo:
+                    return
+        with self.__lock, self.__flock():
+            self.__mutated()
+            with self.__restamping(self.__searchable()):
+                if self.__journal:
+                    self.__append()
+                else:
+                    self.__refresh()
+                    self.__snapshot()
+            self.__persist()
+
+    def refresh(self):
+        """Merges the records other processes saved since the last read
+
+        Objects changed since the last save are kept as they are; every
+        other object is replaced by, or removed like, its saved record.
+        """
+        with self.__lock, self.__flock(exclusive=False):
+            self.__refresh()
+
+    def convert(self, name):
+        """Rewrites the file with the serializer called name
+
+        Later saves keep using it. Raises ValueError for an unknown name.
+        """
+        serializer = serializers.get(name)
+        if self.__compactor is not None:
+            self.__compactor.join()
+        with self.__lock, self.__flock():
+            self.__refresh()
+            for bucket in self.__raw.values():
+                for key, record in bucket.items():
+                    bucket[key] = self.__decode(record)
+            self.__fragments.clear()
+            self.__serializer = serializer
+            FileStorage.__legacy = True
+            self.__snapshot()
+
+    def __snapshot(self):
+        """Writes every stored object to the file and drops the journal"""
+        if not self.__dirty and not self.__legacy and \
+                os.path.exists(FileStorage.__file_path):
+            return
+        for key in self.__dirty:
+            self.__fragments.pop(key, None)
+        self.__write(FileStorage.__file_path,
+                     self.__document(self.__stored_fragments()))
+        self.__dirty.clear()
+        FileStorage.__legacy = False
+        for path in self.__journals():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        FileStorage.__seen = self.__stamp()
 
     def reload(self):
-        """Loads storage dictionary from file"""
+        """Loads storage dictionary from file, then replays the journal
+
+        Records are read one at a time. The format of the file is detected
+        from its first line; files written in another format than the
+        configured one, or as a single JSON document by older versions, are
+        rewritten in the configured format by the next save(). In
+        lazy mode the records are kept as read and turned into model
+        instances on first access.
+        """
+        with self.__lock, self.__flock(exclusive=False):
+            self.__reload()
+
+    def __reload(self):
+        """Loads the file and the journal over the stored objects"""
         from models.base_model import BaseModel
         from models.user import User
         from models.place import Place
@@ -45,18 +465,665 @@ class FileStorage:
                     'State': State, 'City': City, 'Amenity': Amenity,
                     'Review': Review
                   }
+        FileStorage.__types = classes
+        changes = {}
+        for path in self.__journals():
+            changes.update(self.__replay(path))
+        chunk = []
         try:
-            temp = {}
-            with open(FileStorage.__file_path, 'r') as f:
-                temp = json.load(f)
-                for key, val in temp.items():
-                    self.all()[key] = classes[val['__class__']](**val)
+            for key, record in self.__records(FileStorage.__file_path):
+                if key in changes:
+                    continue
+                if self.__lazy or not isinstance(record, str):
+                    self.__load(key, record)
+                    continue
+                chunk.append(record)
+                if len(chunk) == 1000:
+                    self.__build_chunk(chunk)
+                    chunk = []
         except FileNotFoundError:
             pass
+        self.__build_chunk(chunk)
+        for key, record in changes.items():
+            if record is None:
+                self.__remove(key)
+            else:
+                self.__load(key, record)
+        for index in self.__indexes:
+            self.__feed(index)
+        FileStorage.__seen = self.__stamp()
+        if os.path.exists(FileStorage.__file_path + '.search'):
+            self.__text_index()
 
     def delete(self, obj=None):
         """Deletes obj from __objects if it’s inside."""
         if obj is not None:
             key = f"{obj.__class__.__name__}.{obj.id}"
-            self.__objects.pop(key, None)
-            self.save()
+            with self.__lock:
+                if self.__undo:
+                    self.__capture(key)
+                self.__remove(key)
+                self.__dirty.add(key)
+                self.save()
+
+    def compact(self, wait=False):
+        """Folds the journal into the snapshot file in the background
+
+        The live journal is first renamed aside so that saves keep
+        appending to a fresh one while the old one is merged.
+        """
+        with self.__lock, self.__flock():
+            self.__freeze()
+        if wait and self.__compactor is not None:
+            self.__compactor.join()
+
+    def __freeze(self):
+        """Renames the journal aside and starts merging it"""
+        log, frozen = self.__journals()[::-1]
+        running = self.__compactor is not None and \
+            self.__compactor.is_alive()
+        if not running and os.path.exists(log) and \
+                not os.path.exists(frozen):
+            fresh = self.__stamp() == self.__seen
+            with self.__restamping():
+                os.replace(log, frozen)
+            if fresh:
+                FileStorage.__seen = self.__stamp()
+            FileStorage.__compactor = threading.Thread(
+                target=self.__merge, args=(frozen,))
+            FileStorage.__compactor.start()
+
+    def __append(self):
+        """Appends one journal record per changed object"""
+        if not self.__dirty:
+            return
+        lines = []
+        for key in self.__dirty:
+            self.__fragments.pop(key, None)
+            obj = self.__objects.get(key)
+            record = {'key': key, 'obj': obj.to_dict() if obj else None}
+            if obj is not None:
+                self.__watch(key, obj, record['obj'])
+            lines.append(json.dumps(record) + '\n')
+        log = self.__journals()[1]
+        fresh = self.__stamp() == self.__seen
+        with open(log, 'a') as f:
+            f.write(''.join(lines))
+            f.flush()
+            self.__sync(f.fileno(), log)
+            size = f.tell()
+        if fresh:
+            FileStorage.__seen = self.__stamp()
+        self.__dirty.clear()
+        if size > self.__journal_max:
+            self.__freeze()
+
+    def __merge(self, frozen):
+        """Writes the snapshot with the frozen journal applied to it"""
+        with self.__flock():
+            if os.path.exists(frozen):
+                with self.__restamping():
+                    self.__fold(frozen)
+
+    def __fold(self, frozen):
+        """Rewrites the snapshot with the records of a journal applied"""
+        changes = dict(self.__replay(frozen))
+
+        def merged():
+            """Yields the fragments of the merged snapshot"""
+            try:
+                for key, record in self.__records(FileStorage.__file_path):
+                    if key not in changes:
+                        yield self.__encode(key, record)
+            except FileNotFoundError:
+                pass
+            for key, record in changes.items():
+                if record is not None:
+                    yield self.__encode(key, record)
+
+        self.__write(FileStorage.__file_path, self.__document(merged()))
+        os.remove(frozen)
+
+    def __capture(self, key):
+        """Keeps the current record of key for the innermost batch"""
+        changes = self.__undo[-1][0]
+        if key in changes:
+            return
+        obj = self.__objects.get(key)
+        if obj is None:
+            record = self.__raw.get(key.split('.')[0], {}).get(key)
+        elif key not in self.__dirty and key in self.__fragments:
+            record = self.__fragments[key]
+        else:
+            record = obj.to_dict()
+        changes[key] = record
+
+    def __rollback(self, changes, dirty):
+        """Puts back the records kept by a batch and its dirty keys"""
+        for key, record in changes.items():
+            self.__remove(key)
+            if record is not None:
+                self.__notify('add', self.__build(key, record))
+        self.__dirty.clear()
+        self.__dirty.update(dirty)
+
+    def __refresh(self):
+        """Merges the saved records if another process changed the file
+
+        A missing file is not taken as the deletion of every object.
+        """
+        stamp = self.__stamp()
+        if stamp == self.__seen:
+            return
+        saved = {}
+        missing = False
+        try:
+            for key, record in self.__records(FileStorage.__file_path):
+                saved[key] = record
+        except FileNotFoundError:
+            missing = True
+        for path in self.__journals():
+            saved.update(self.__replay(path))
+        stored = list(self.__objects)
+        for bucket in self.__raw.values():
+            stored.extend(bucket)
+        for key in stored:
+            if key in self.__dirty or \
+                    (missing and key not in saved):
+                continue
+            if saved.get(key) is None:
+                self.__remove(key)
+        for key, record in saved.items():
+            if record is None or key in self.__dirty:
+                continue
+            name = key.split('.')[0]
+            raw = self.__raw.get(name, {})
+            if raw.get(key) == record or \
+                    self.__fragments.get(key) == record:
+                continue
+            obj = self.__objects.get(key)
+            if obj is not None and key not in self.__fragments and \
+                    self.__decode(record) == obj.to_dict():
+                if isinstance(record, (str, bytes)):
+                    self.__fragments[key] = record
+                continue
+            if obj is None and self.__lazy and not any(
+                    issubclass(self.__types[name], index.classes)
+                    for index in self.__indexes):
+                self.__load(key, record)
+                continue
+            raw.pop(key, None)
+            self.__notify('add', self.__build(key, record))
+        FileStorage.__seen = stamp
+
+    def __stamp(self):
+        """Returns what tells the current version of the files apart"""
+        stamp = []
+        for path in [FileStorage.__file_path] + self.__journals():
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                stamp.append(None)
+                continue
+            stamp.append((st.st_ino, st.st_size, st.st_mtime_ns,
+                          st.st_ctime_ns))
+        return tuple(stamp)
+
+    @contextmanager
+    def __flock(self, exclusive=True):
+        """Holds the advisory lock every process takes on the file
+
+        The lock is taken on a file of its own, since the file itself is
+        replaced on every save. Systems without fcntl get no lock.
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(FileStorage.__file_path + '.lock', 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def __records(self, path):
+        """Yields (key, record) for every record of a snapshot file
+
+        Records come as their line of text or binary frame when the file is
+        in the configured format, and as dicts otherwise. Files holding a
+        single JSON document are loaded whole. A file missing its closing
+        brace is loaded whole too, so that it raises ValueError.
+        """
+        with open(path, 'rb') as f:
+            serializer = serializers.detect(f)
+            if serializer.binary:
+                same = serializer.name == self.__serializer.name
+                if not same:
+                    FileStorage.__legacy = True
+                for key, frame in serializer.frames(f):
+                    yield key, frame if same else serializer.unframe(frame)
+                return
+        text = not self.__serializer.binary
+        if not text:
+            FileStorage.__legacy = True
+        with open(path, 'r') as f:
+            if f.readline().strip() == '{':
+                for line in f:
+                    line = line.rstrip('\n')
+                    if line == '}':
+                        return
+                    if line.endswith(','):
+                        line = line[:-1]
+                    if not (line.startswith('"') and line.endswith('}')):
+                        break
+                    key = line[1:line.find('": ')]
+                    if '\\' in key:
+                        key = self.__decoder.raw_decode(line)[0]
+                    yield key, line if text else self.__decode(line)
+            f.seek(0)
+            FileStorage.__legacy = True
+            yield from json.load(f).items()
+
+    def __decode(self, record):
+        """Returns the dict of a record read by __records"""
+        if isinstance(record, dict):
+            return record
+        if isinstance(record, bytes):
+            return self.__serializer.unframe(record)
+        for val in json.loads('{' + record + '}').values():
+            return val
+
+    def __encode(self, key, record):
+        """Returns the line or frame of a record, as written in the file"""
+        if self.__serializer.binary:
+            if isinstance(record, bytes):
+                return record
+            return self.__serializer.frame(key, self.__decode(record))
+        if isinstance(record, str):
+            return record
+        return json.dumps(key) + ': ' + json.dumps(self.__decode(record))
+
+    def __document(self, fragments):
+        """Yields the chunks of a snapshot holding fragments
+
+        JSON fragments go one per line of a single object, binary frames
+        follow the header naming their serializer.
+        """
+        if self.__serializer.binary:
+            yield self.__serializer.header()
+            yield from fragments
+            return
+        separator = '\n'
+        yield '{'
+        for fragment in fragments:
+            yield separator
+            yield fragment
+            separator = ',\n'
+        yield '\n}\n'
+
+    def __stored_fragments(self):
+        """Yields the line of every stored object, encoding changed ones"""
+        fragments = self.__fragments
+        for key, val in FileStorage.__objects.items():
+            fragment = fragments.get(key)
+            if fragment is None:
+                record = val.to_dict()
+                self.__watch(key, val, record)
+                fragment = self.__encode(key, record)
+                fragments[key] = fragment
+            yield fragment
+        for bucket in self.__raw.values():
+            for key, record in bucket.items():
+                yield self.__encode(key, record)
+
+    def __load(self, key, record):
+        """Builds the object of a record read from file, or keeps it raw"""
+        if self.__lazy:
+            self.__remove(key)
+            name = key.split('.')[0]
+            bucket = self.__raw.get(name)
+            if bucket is None:
+                bucket = self.__raw[name] = {}
+            bucket[key] = record
+            return
+        self.__build(key, record)
+
+    def __build_chunk(self, lines):
+        """Builds the objects of record lines, decoding them in one go"""
+        vals = json.loads('{' + ','.join(lines) + '}')
+        if len(vals) != len(lines):
+            for line in lines:
+                self.__build(line[1:line.find('": ')], line)
+            return
+        types = self.__types
+        fragments = self.__fragments
+        for (key, val), line in zip(vals.items(), lines):
+            obj = types[val['__class__']](**val)
+            self.__add(key, obj)
+            self.__watch(key, obj, val)
+            fragments[key] = line
+
+    def __build(self, key, record):
+        """Stores and returns the model instance of a record read from file
+
+        The line or frame of the record is kept as its encoded form, since
+        the new instance has not changed since it was written.
+        """
+        val = self.__decode(record)
+        obj = self.__types[val['__class__']](**val)
+        self.__add(key, obj)
+        self.__watch(key, obj, val)
+        if isinstance(record, (str, bytes)):
+            self.__fragments[key] = record
+        else:
+            self.__fragments.pop(key, None)
+        return obj
+
+    def __write(self, path, chunks):
+        """Writes chunks to a temporary file and renames it over path"""
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            mode = 'wb' if self.__serializer.binary else 'w'
+            with open(tmp_path, mode) as f:
+                f.writelines(chunks)
+                f.flush()
+                synced = self.__sync(f.fileno(), path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if synced:
+            self.__sync_dir(path)
+
+    def __sync(self, fd, path):
+        """Flushes fd to disk as the fsync policy allows
+
+        Returns True if it was flushed now. Under the interval policy a
+        skipped flush is scheduled for the end of the current interval.
+        """
+        if self.__fsync == 'never':
+            return False
+        now = time.monotonic()
+        wait = FileStorage.__synced_at + self.__fsync_ms / 1000 - now
+        if self.__fsync == 'interval' and wait > 0:
+            self.__unsynced.add(path)
+            if self.__sync_timer is None:
+                FileStorage.__sync_timer = threading.Timer(wait, self.__flush)
+                FileStorage.__sync_timer.daemon = True
+                FileStorage.__sync_timer.start()
+            return False
+        os.fsync(fd)
+        FileStorage.__synced_at = now
+        return True
+
+    def __flush(self):
+        """Flushes the files written since the last interval fsync"""
+        FileStorage.__sync_timer = None
+        FileStorage.__synced_at = time.monotonic()
+        while self.__unsynced:
+            path = self.__unsynced.pop()
+            try:
+                with open(path, 'rb') as f:
+                    os.fsync(f.fileno())
+            except FileNotFoundError:
+                continue
+            self.__sync_dir(path)
+
+    @staticmethod
+    def __sync_dir(path):
+        """Flushes the directory entry of path, making a rename durable"""
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def __replay(path):
+        """Yields (key, dict or None) for every record of a journal file
+
+        A torn last line, left by a crash in the middle of an append, is
+        ignored.
+        """
+        try:
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    yield record['key'], record['obj']
+        except FileNotFoundError:
+            return
+
+    def __journals(self):
+        """Returns the paths of the frozen and live journals, oldest first"""
+        log = FileStorage.__file_path + '.log'
+        return [log + '.1', log]
+
+    def __add(self, key, obj):
+        """Puts obj in __objects and in the bucket of its class"""
+        self.__objects[key] = obj
+        bucket = self.__classes.get(type(obj))
+        if bucket is None:
+            bucket = self.__classes[type(obj)] = {}
+        bucket[key] = obj
+
+    def __remove(self, key):
+        """Drops key from __objects, its class bucket and the caches"""
+        obj = self.__objects.pop(key, None)
+        if obj is not None:
+            self.__classes[type(obj)].pop(key, None)
+            self.__notify('remove', obj)
+        if self.__raw:
+            self.__raw.get(key.split('.')[0], {}).pop(key, None)
+        self.__fragments.pop(key, None)
+        self.__containers.pop(key, None)
+
+    def __watch(self, key, obj, record):
+        """Keeps the saved state of obj if record holds lists or dicts"""
+        if not CONTAINERS.isdisjoint(map(type, record.values())):
+            self.__containers[key] = self.__state(obj)
+        elif self.__containers:
+            self.__containers.pop(key, None)
+
+    def __mutated(self):
+        """Marks changed the objects whose lists or dicts changed in place"""
+        for key, state in self.__containers.items():
+            obj = self.__objects.get(key)
+            if key not in self.__dirty and obj is not None and \
+                    self.__state(obj) != state:
+                self.__dirty.add(key)
+
+    @staticmethod
+    def __state(obj):
+        """Returns the state of obj to compare with a later one"""
+        return json.dumps(obj.to_dict(), sort_keys=True, default=str)
+
+    def __hydrate(self, cls=None):
+        """Builds the instances of cls still held as loaded records"""
+        for name in list(self.__raw):
+            model = self.__types[name]
+            if cls is None or issubclass(model, cls):
+                for key, record in self.__raw.pop(name).items():
+                    self.__build(key, record)
+
+    def __query(self, query):
+        """Runs query over the stored objects and records"""
+        with self.__lock:
+            ids = self.__indexed(query)
+            if ids is None:
+                sources = self.__sources(query.cls)
+            else:
+                keys = (query.cls.__name__ + '.' + id for id in ids)
+                sources = (source for source in map(self.__source, keys)
+                           if source is not None)
+            results = query.select(sources)
+            if query.fields is not None:
+                return [query.project(source) for source in results]
+            return [self.get(self.__types[source['__class__']],
+                             source['id'])
+                    if isinstance(source, dict) else source
+                    for source in results]
+
+    def __indexed(self, query):
+        """Returns the ids the registered indexes narrow query to, or None
+
+        The ids may include objects not matching every condition; the
+        query checks them all again. The foreign key index is preferred,
+        as it finds the ids of a parent without going through every row.
+        It only knows the fields of relations.keys(), and the int columns
+        of PlaceColumns hold int(value), so bounds on those are widened to
+        whole numbers to keep the Places whose fraction was dropped.
+        """
+        from models.engine.fk_index import ForeignKeyIndex
+        from models.engine.place_columns import PlaceColumns
+
+        names = [name for name, model in self.__types.items()
+                 if issubclass(model, query.cls)]
+        if names != [query.cls.__name__]:
+            return None
+        found = []
+        for index in self.__indexes:
+            if type(index) is ForeignKeyIndex and \
+                    issubclass(query.cls, index.classes):
+                keys = relations.keys(query.cls)
+                for field, op, value in query.filters:
+                    if op == 'eq' and field in keys:
+                        found.append(index.children(names[0], field, value))
+        for index in self.__indexes:
+            if found:
+                break
+            if type(index) is PlaceColumns and query.cls in index.classes:
+                bounds = {}
+                for field, op, value in query.filters:
+                    if field not in index.fields or \
+                            not isinstance(value, (int, float)) or \
+                            isinstance(value, bool) or op in ('ne', 'in') \
+                            or not math.isfinite(value):
+                        continue
+                    low, high = bounds.get(field, (None, None))
+                    if op in ('eq', 'gt', 'ge'):
+                        low = value
+                    if op in ('eq', 'lt', 'le'):
+                        high = value
+                    if index.fields[field] == 'q':
+                        low = None if low is None else math.floor(low)
+                        high = None if high is None else math.ceil(high)
+                    bounds[field] = (low, high)
+                if bounds:
+                    found.append(index.filter(**bounds))
+        if not found:
+            return None
+        ids = found[0]
+        for more in found[1:]:
+            more = set(more)
+            ids = [id for id in ids if id in more]
+        return ids
+
+    def __sources(self, cls):
+        """Yields the objects of cls, then the dicts of its loaded records"""
+        for bucket in self.__buckets(cls):
+            yield from bucket.values()
+        for name, records in self.__raw.items():
+            if issubclass(self.__types[name], cls):
+                lines = []
+                for record in records.values():
+                    if not isinstance(record, str):
+                        yield self.__decode(record)
+                        continue
+                    lines.append(record)
+                    if len(lines) == 1000:
+                        yield from json.loads('{' + ','.join(lines) +
+                                              '}').values()
+                        lines = []
+                if lines:
+                    yield from json.loads('{' + ','.join(lines) +
+                                          '}').values()
+
+    def __source(self, key):
+        """Returns the object of key, or the dict of its loaded record"""
+        obj = self.__objects.get(key)
+        if obj is None:
+            record = self.__raw.get(key.split('.')[0], {}).get(key)
+            if record is not None:
+                return self.__decode(record)
+        return obj
+
+    def __text_index(self):
+        """Returns the TextIndex, read from file or built if not attached"""
+        from models.engine.text_index import TextIndex
+
+        for index in self.__indexes:
+            if type(index) is TextIndex:
+                return index
+        index = TextIndex.load(FileStorage.__file_path + '.search',
+                               self.__stamp())
+        if index is None:
+            return self.__index_of(TextIndex)
+        self.__indexes.append(index)
+        return index
+
+    def __persist(self):
+        """Writes the TextIndex next to the file if it was built since"""
+        from models.engine.text_index import TextIndex
+
+        for index in self.__indexes:
+            if type(index) is TextIndex and not index.written:
+                index.dump(FileStorage.__file_path + '.search',
+                           self.__stamp())
+
+    @contextmanager
+    def __restamping(self, searchable=False):
+        """Keeps the written TextIndex valid over the writes of the block
+
+        Unless searchable tells the writes change the indexed text, the
+        written index still matches the file after them, so its stamp is
+        moved to the new version of the file.
+        """
+        from models.engine.text_index import TextIndex
+
+        path = FileStorage.__file_path + '.search'
+        if searchable or not os.path.exists(path + '.stamp'):
+            yield
+            return
+        stamp = self.__stamp()
+        yield
+        TextIndex.restamp(path, stamp, self.__stamp())
+
+    def __searchable(self):
+        """Tells whether a changed object has text the TextIndex keeps"""
+        from models.engine.text_index import TextIndex
+
+        return any(key.split('.')[0] in TextIndex.fields
+                   for key in self.__dirty)
+
+    def __index_of(self, kind, classes=None):
+        """Returns the registered index of type kind, registering one
+
+        With classes, an index covering them is enough, and the one
+        registered only covers them: in lazy mode, feeding an index of
+        every class would build every held record.
+        """
+        for index in self.__indexes:
+            if type(index) is kind and (classes is None or all(
+                    issubclass(cls, index.classes) for cls in classes)):
+                return index
+        index = kind() if classes is None else kind(classes)
+        self.register(index)
+        return index
+
+    def __notify(self, event, obj):
+        """Passes obj to the add or remove method of interested indexes"""
+        for index in self.__indexes:
+            if isinstance(obj, index.classes):
+                getattr(index, event)(obj)
+
+    def __feed(self, index):
+        """Adds every stored instance of the classes of index to it"""
+        for cls in index.classes:
+            for obj in self.all(cls, view=True).values():
+                index.add(obj)
+
+    def __buckets(self, cls):
+        """Returns the buckets holding instances of cls or its subclasses"""
+        return [bucket for bucket_cls, bucket in self.__classes.items()
+                if issubclass(bucket_cls, cls)]
@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+"""This module defines an index from parent ids to their children"""
+from models.engine import relations
+
+
+class ForeignKeyIndex:
+    """Maps the ids held in the foreign key fields back to their objects
+
+    Attach it with storage.register() to keep it in sync with the stored
+    objects. Every field ending in _id (City.state_id, Review.place_id,
+    ...) is indexed, so the children of a parent are found without a
+    scan. Changing a field moves the object to its new parent.
+    """
+
+    def __init__(self, classes=None):
+        """Creates an empty index of a classes tuple, or of every class"""
+        from models.base_model import BaseModel
+
+        self.classes = classes or (BaseModel,)
+        self.__fields = {}
+        self.__children = {}
+        self.__links = {}
+
+    def __len__(self):
+        """Returns the number of objects in the index"""
+        return len(self.__links)
+
+    def add(self, obj):
+        """Inserts obj, or moves it if its foreign keys changed"""
+        cls = type(obj)
+        fields = self.__fields.get(cls)
+        if fields is None:
+            fields = self.__fields[cls] = relations.keys(cls)
+        if not fields:
+            return
+        key = (cls.__name__, obj.id)
+        links = tuple((field, getattr(obj, field, None)) for field in fields)
+        old = self.__links.get(key)
+        if old == links:
+            return
+        if old is not None:
+            self.remove(obj)
+        self.__links[key] = links
+        for field, parent in links:
+            self.__children.setdefault((cls.__name__, field), {}) \
+                .setdefault(parent, {})[obj.id] = None
+
+    def remove(self, obj):
+        """Drops obj from the index"""
+        name = type(obj).__name__
+        for field, parent in self.__links.pop((name, obj.id), ()):
+            by_parent = self.__children[(name, field)]
+            children = by_parent[parent]
+            del children[obj.id]
+            if not children:
+                del by_parent[parent]
+
+    def children(self, name, field, parent):
+        """Returns the ids of the objects of class name with field parent"""
+        return list(self.__children.get((name, field), {}).get(parent, ()))
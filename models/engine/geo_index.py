@@ -0,0 +1,123 @@
+#!/usr/bin/python3
+"""This module defines a grid index over Place coordinates"""
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def distance(lat1, lon1, lat2, lon2):
+    """Returns the great-circle distance in km between two points"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class PlaceGeoIndex:
+    """Buckets Places in a latitude/longitude grid
+
+    Attach it with storage.register() to keep it in sync with the stored
+    Places. A query only looks at the cells overlapping its area. Places
+    whose coordinates are not numbers are left out.
+    """
+
+    def __init__(self, cell_deg=0.5):
+        """Creates an empty index with square cells of cell_deg degrees"""
+        from models.place import Place
+
+        self.classes = (Place,)
+        self.cell_deg = cell_deg
+        self.__cols = int(math.ceil(360 / cell_deg))
+        self.__rows = int(math.ceil(180 / cell_deg))
+        self.__cells = {}
+        self.__places = {}
+
+    def __len__(self):
+        """Returns the number of Places in the index"""
+        return len(self.__places)
+
+    def add(self, obj):
+        """Inserts obj, or moves it if its coordinates changed"""
+        try:
+            point = (float(obj.latitude), float(obj.longitude))
+        except (TypeError, ValueError):
+            point = None
+        if point is None or not -90 <= point[0] <= 90 or \
+                not -180 <= point[1] <= 180:
+            self.remove(obj)
+            return
+        cell = self.__cell(*point)
+        if obj.id in self.__places and self.__places[obj.id][0] != cell:
+            self.remove(obj)
+        self.__cells.setdefault(cell, {})[obj.id] = point
+        self.__places[obj.id] = (cell, point)
+
+    def remove(self, obj):
+        """Drops obj from the index"""
+        old = self.__places.pop(obj.id, None)
+        if old is not None:
+            cell = self.__cells[old[0]]
+            del cell[obj.id]
+            if not cell:
+                del self.__cells[old[0]]
+
+    def within(self, south, west, north, east):
+        """Returns the ids of the Places inside a bounding box
+
+        The box crosses the antimeridian when west is greater than east.
+        """
+        if west > east:
+            return self.within(south, west, north, 180) + \
+                self.within(south, -180, north, east)
+        ids = []
+        for cell in self.__cover(south, west, north, east):
+            for id, (lat, lon) in self.__cells.get(cell, {}).items():
+                if south <= lat <= north and west <= lon <= east:
+                    ids.append(id)
+        return ids
+
+    def nearby(self, lat, lon, km):
+        """Returns the ids of the Places within km of a point
+
+        The closest Places come first.
+        """
+        dlat = math.degrees(km / EARTH_RADIUS_KM)
+        south, north = max(-90, lat - dlat), min(90, lat + dlat)
+        cos = math.cos(math.radians(max(abs(south), abs(north))))
+        if north == 90 or south == -90 or cos <= 0 or \
+                dlat / cos >= 180:
+            west, east = -180, 180
+        else:
+            west, east = lon - dlat / cos, lon + dlat / cos
+            if west < -180:
+                west += 360
+            if east > 180:
+                east -= 360
+        found = []
+        for id in self.within(south, west, north, east):
+            point = self.__places[id][1]
+            dist = distance(lat, lon, point[0], point[1])
+            if dist <= km:
+                found.append((dist, id))
+        found.sort()
+        return [id for dist, id in found]
+
+    def __cell(self, lat, lon):
+        """Returns the grid cell holding a point"""
+        row = min(int((lat + 90) // self.cell_deg), self.__rows - 1)
+        col = min(int((lon + 180) // self.cell_deg), self.__cols - 1)
+        return row, col
+
+    def __cover(self, south, west, north, east):
+        """Returns the grid cells overlapping a box that does not wrap
+
+        Large boxes are matched against the non-empty cells instead of
+        enumerating every cell they cover.
+        """
+        bottom, left = self.__cell(max(-90, south), max(-180, west))
+        top, right = self.__cell(min(90, north), min(180, east))
+        if (top - bottom + 1) * (right - left + 1) > len(self.__cells):
+            return [(row, col) for row, col in self.__cells
+                    if bottom <= row <= top and left <= col <= right]
+        return [(row, col) for row in range(bottom, top + 1)
+                for col in range(left, right + 1)]
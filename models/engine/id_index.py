@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+"""This module defines an index keeping the stored ids in order"""
+import bisect
+import heapq
+
+
+class IdIndex:
+    """Keeps the ids of the stored objects of every class sorted
+
+    Attach it with storage.register() to keep it in sync with the stored
+    objects. Adding and removing objects is O(1); the sorted lists catch
+    up on the next page() call, by merging in the new ids or, after a
+    removal, by sorting the ids again.
+    """
+
+    def __init__(self, classes=None):
+        """Creates an empty index of a classes tuple, or of every class"""
+        from models.base_model import BaseModel
+
+        self.classes = classes or (BaseModel,)
+        self.__known = {}
+        self.__sorted = {}
+        self.__fresh = {}
+        self.__stale = {}
+
+    def __len__(self):
+        """Returns the number of ids in the index"""
+        return sum(len(ids) for ids in self.__known.values())
+
+    def add(self, obj):
+        """Inserts the id of obj if it is new"""
+        name = type(obj).__name__
+        known = self.__known.get(name)
+        if known is None:
+            known = self.__known[name] = set()
+            self.__sorted[name] = []
+            self.__fresh[name] = []
+            self.__stale[name] = 0
+        if obj.id not in known:
+            known.add(obj.id)
+            self.__fresh[name].append(obj.id)
+
+    def remove(self, obj):
+        """Drops the id of obj"""
+        name = type(obj).__name__
+        known = self.__known.get(name)
+        if known is not None and obj.id in known:
+            known.remove(obj.id)
+            self.__stale[name] += 1
+
+    def page(self, names, limit, after=None):
+        """Returns up to limit (name, id) pairs of the classes in names
+
+        Pairs come ordered by id, starting after the id after.
+        """
+        pages = []
+        for name in names:
+            if name not in self.__known:
+                continue
+            ids = self.__tidy(name)
+            start = 0 if after is None else bisect.bisect_right(ids, after)
+            pages.append([(id, name) for id in ids[start:start + limit]])
+        return [(name, id) for id, name in heapq.merge(*pages)][:limit]
+
+    def __tidy(self, name):
+        """Returns the sorted ids of name with the new and removed merged"""
+        ids = self.__sorted[name]
+        if self.__stale[name]:
+            ids = sorted(self.__known[name])
+        elif self.__fresh[name]:
+            ids = ids + self.__fresh[name]
+            ids.sort()
+        else:
+            return ids
+        self.__sorted[name] = ids
+        self.__fresh[name] = []
+        self.__stale[name] = 0
+        return ids
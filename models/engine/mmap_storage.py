@@ -0,0 +1,584 @@
+#!/usr/bin/python3
+"""This module defines a storage engine over a memory-mapped record file"""
+import itertools
+import mmap
+import os
+import threading
+from contextlib import contextmanager
+from os import environ
+from types import MappingProxyType
+from models.engine import bulk, relations, serializers
+from models.engine.query import Query
+from models.engine.serializers import SIZES
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class MMapStorage:
+    """This class manages storage of hbnb models in a memory-mapped file
+
+    The file starts with the header of the binary FileStorage files and
+    holds one frame per saved version of an object; a frame with an empty
+    payload marks a deletion. Saves only append frames. Memory holds the
+    offset of the latest frame of each key, so get() reads and decodes a
+    single record and the records themselves stay in the page cache.
+
+    Instances are built on every access. Objects passed to new(), or
+    changed after being read, are held until the next save(). Once stale
+    frames take more room than live ones, save() compacts the file.
+
+    New files are encoded with the serializer named by
+    HBNB_FILE_SERIALIZER; existing files keep the one they were written
+    with until convert() is called.
+
+    Inside a batch() block, saves are deferred to the end of the block and
+    its changes are undone if it raises.
+
+    Saves hold a lock between threads and an advisory lock on
+    file.db.lock between processes, and place their frames at the end of
+    the file as it is then, which other processes may have grown.
+    """
+    __file_path = 'file.db'
+    __offsets = {}
+    __pending = {}
+    __deleted = set()
+    __types = {}
+    __indexes = []
+    __undo = []
+    __lock = threading.RLock()
+
+    def __init__(self):
+        """Reads the storage options from the environment"""
+        self.__serializer = serializers.get(
+            environ.get('HBNB_FILE_SERIALIZER', 'json'))
+        self.__map = None
+        self.__size = 0
+        self.__live = 0
+
+    def all(self, cls=None, view=False):
+        """Returns a dictionary of objects, optionally filtered by a class
+
+        Every matching record is read and built. With view=True the result
+        is returned as a read-only mapping.
+        """
+        objs = {}
+        for name, offsets in self.__offsets.items():
+            if cls is None or issubclass(self.__types[name], cls):
+                for key, offset in offsets.items():
+                    objs[key] = self.__read(offset)
+        for key, obj in self.__pending.items():
+            if cls is None or isinstance(obj, cls):
+                objs[key] = obj
+        if view:
+            return MappingProxyType(objs)
+        return objs
+
+    def count(self, cls=None):
+        """Returns the number of objects in storage, optionally by class"""
+        total = sum(len(offsets) for name, offsets in self.__offsets.items()
+                    if cls is None or issubclass(self.__types[name], cls))
+        for key, obj in self.__pending.items():
+            if (cls is None or isinstance(obj, cls)) and \
+                    key not in self.__offsets.get(type(obj).__name__, ()):
+                total += 1
+        return total
+
+    def get(self, cls, id):
+        """Returns the object of class cls with the given id, or None"""
+        key = cls.__name__ + '.' + id
+        obj = self.__pending.get(key)
+        if obj is None:
+            offset = self.__offsets.get(cls.__name__, {}).get(key)
+            if offset is not None:
+                obj = self.__read(offset)
+        return obj
+
+    def new(self, obj):
+        """Holds obj until the next save"""
+        key = type(obj).__name__ + '.' + obj.id
+        with self.__lock:
+            self.__pending[key] = obj
+            self.__deleted.discard(key)
+            self.__notify('add', obj)
+
+    def touch(self, obj):
+        """Holds obj until the next save if it is stored"""
+        key = type(obj).__name__ + '.' + obj.id
+        with self.__lock:
+            if key in self.__pending or \
+                    key in self.__offsets.get(type(obj).__name__, ()):
+                self.__pending[key] = obj
+                self.__notify('add', obj)
+
+    def delete(self, obj=None):
+        """Forgets obj; the deletion is written by the next save"""
+        if obj is None:
+            return
+        name = type(obj).__name__
+        key = name + '.' + obj.id
+        with self.__lock:
+            self.__pending.pop(key, None)
+            offset = self.__offsets.get(name, {}).pop(key, None)
+            if offset is not None:
+                self.__live -= self.__frame_size(offset)
+                self.__deleted.add(key)
+                if self.__undo:
+                    self.__undo[-1][2].setdefault(key, offset)
+            self.__notify('remove', obj)
+
+    def remember(self, obj):
+        """Keeps the state of a held obj before a batch changes it"""
+        if not self.__undo:
+            return
+        key = type(obj).__name__ + '.' + obj.id
+        images = self.__undo[-1][3]
+        if key not in images:
+            held = self.__pending.get(key)
+            images[key] = held.to_dict() if held is not None else None
+
+    @contextmanager
+    def batch(self):
+        """Defers saving to the end of the block, undoing it on error
+
+        save() calls made in the block are replaced by a single save()
+        when the outermost block exits. If a block raises, the objects it
+        added, changed or deleted are put back as they were when it
+        started.
+        """
+        self.__undo.append((dict(self.__pending), set(self.__deleted),
+                            {}, {}))
+        try:
+            yield self
+        except BaseException:
+            self.__rollback(*self.__undo.pop())
+            raise
+        level = self.__undo.pop()
+        if self.__undo:
+            for inner, outer in zip(level[2:], self.__undo[-1][2:]):
+                for key, val in inner.items():
+                    outer.setdefault(key, val)
+            return
+        self.save()
+
+    def bulk_insert(self, cls, rows, batch_size=None):
+        """Stores a new instance of cls for every row and saves them
+
+        rows are dicts in the form of to_dict(); missing ids and dates are
+        filled in. The instances are saved once at the end or, with a
+        batch_size, after every batch_size rows. A chunk that fails is
+        rolled back. Returns the number of rows stored.
+        """
+        records = bulk.records(cls, rows)
+        count = 0
+        while True:
+            size = 0
+            with self.batch():
+                for record in itertools.islice(records, batch_size):
+                    self.new(cls(**record))
+                    size += 1
+            count += size
+            if batch_size is None or size < batch_size:
+                return count
+
+    def page(self, cls=None, limit=100, after=None):
+        """Returns up to limit objects ordered by id, after the id after
+
+        Passing the id of the last object of a page as after returns the
+        next one (keyset pagination). cls also matches its subclasses.
+        """
+        from models.base_model import BaseModel
+        from models.engine.id_index import IdIndex
+
+        index = self.__index_of(IdIndex, (cls or BaseModel,))
+        names = [name for name, model in self.__types.items()
+                 if cls is None or issubclass(model, cls)]
+        return [self.get(self.__types[name], id)
+                for name, id in index.page(names, limit, after)]
+
+    def iterate(self, cls=None, batch_size=1000):
+        """Yields the stored objects, optionally of a class, ordered by id
+
+        Objects are fetched one page of batch_size at a time, so the
+        storage may change during the iteration.
+        """
+        after = None
+        while True:
+            objs = self.page(cls, batch_size, after)
+            yield from objs
+            if len(objs) < batch_size:
+                return
+            after = objs[-1].id
+
+    def query(self, cls):
+        """Returns a Query on the stored objects of cls
+
+        Saved records are matched and projected from their frames, and
+        only those returned as objects are built.
+        """
+        return Query(cls, self.__query)
+
+    def search(self, text, cls=None, limit=10):
+        """Returns the Places and Reviews best matching text, best first
+
+        cls restricts the results to Places or to Reviews. The TextIndex
+        answering it is built on first use.
+        """
+        from models.engine.text_index import TextIndex
+
+        index = self.__index_of(TextIndex)
+        names = None if cls is None else [
+            name for name, model in self.__types.items()
+            if issubclass(model, cls)]
+        return [self.get(self.__types[key.split('.')[0]],
+                         key.split('.', 1)[1])
+                for key, score in index.search(text, names, limit)]
+
+    def totals(self, parent):
+        """Returns the counters kept for parent
+
+        A Place has its number of reviews, a City or a State its number
+        of places and their average price_by_night. They are read from
+        an Aggregates index, updated by every new, changed and deleted
+        City, Place and Review, so no objects are scanned.
+        """
+        from models.engine.aggregates import Aggregates
+
+        index = self.__index_of(Aggregates)
+        return index.totals(type(parent).__name__, parent.id)
+
+    def rebuild_totals(self):
+        """Counts the objects behind totals() again from scratch"""
+        from models.engine.aggregates import Aggregates
+
+        self.__indexes[:] = [index for index in self.__indexes
+                             if type(index) is not Aggregates]
+        self.register(Aggregates())
+
+    def children(self, parent, cls):
+        """Returns the objects of cls linked to parent
+
+        A City is a child of the State its state_id names, a Review of
+        its Place and of its User, and so on. They are found in the
+        foreign key index, which follows every new, changed, deleted and
+        reloaded object.
+        """
+        return self.related([parent], cls)[parent.id]
+
+    def related(self, parents, cls):
+        """Returns the objects of cls linked to each of parents
+
+        The result maps the id of every parent to a list of objects, found
+        through the foreign key index, or the id list of the parent for
+        Place.amenity_ids, without scanning the stored objects.
+        """
+        from models.engine.fk_index import ForeignKeyIndex
+
+        result = {}
+        index = self.__index_of(ForeignKeyIndex, (cls,))
+        for parent in parents:
+            kind, field = relations.link(type(parent), cls)
+            if kind == 'ids':
+                ids = getattr(parent, field)
+            else:
+                ids = index.children(cls.__name__, field, parent.id)
+            objs = (self.get(cls, id) for id in ids)
+            result[parent.id] = [obj for obj in objs if obj is not None]
+        return result
+
+    def register(self, index):
+        """Attaches an index that follows the stored objects
+
+        index has a classes tuple and add(obj) and remove(obj) methods.
+        It is first fed every stored instance of its classes, then every
+        one that is added, changed or deleted.
+        """
+        self.__indexes.append(index)
+        self.__feed(index)
+
+    def nearby(self, lat, lon, km):
+        """Returns the Places within km of a point, nearest first"""
+        from models.engine.geo_index import PlaceGeoIndex
+        from models.place import Place
+
+        index = self.__index_of(PlaceGeoIndex)
+        return [self.get(Place, id) for id in index.nearby(lat, lon, km)]
+
+    def within(self, south, west, north, east):
+        """Returns the Places inside a latitude/longitude bounding box"""
+        from models.engine.geo_index import PlaceGeoIndex
+        from models.place import Place
+
+        index = self.__index_of(PlaceGeoIndex)
+        return [self.get(Place, id)
+                for id in index.within(south, west, north, east)]
+
+    def save(self):
+        """Appends a frame for every held object and deletion
+
+        Inside a batch() block, the save is left to the end of the block.
+        """
+        if self.__undo or not self.__pending and not self.__deleted:
+            return
+        with self.__lock, self.__flock():
+            self.__save()
+            start = len(self.__serializer.header())
+            if self.__size - start - self.__live > max(self.__live, 1 << 20):
+                self.__rewrite(self.__serializer)
+
+    def compact(self):
+        """Rewrites the file with only the latest frame of each object"""
+        with self.__lock, self.__flock():
+            self.__save()
+            self.__rewrite(self.__serializer)
+
+    def convert(self, name):
+        """Rewrites the file with the serializer called name
+
+        Raises ValueError for an unknown name.
+        """
+        serializer = serializers.get(name)
+        with self.__lock, self.__flock():
+            self.__save()
+            self.__rewrite(serializer)
+
+    def reload(self):
+        """Maps the file and indexes the latest frame of every key
+
+        Only the sizes and keys of the frames are read. A frame torn by a
+        crash in the middle of a save is cut off the end of the file; the
+        lock of the saves keeps it from cutting off one being written.
+        """
+        from models.base_model import BaseModel
+        from models.user import User
+        from models.place import Place
+        from models.state import State
+        from models.city import City
+        from models.amenity import Amenity
+        from models.review import Review
+
+        classes = {
+                    'BaseModel': BaseModel, 'User': User, 'Place': Place,
+                    'State': State, 'City': City, 'Amenity': Amenity,
+                    'Review': Review
+                  }
+        MMapStorage.__types = classes
+        with self.__lock, self.__flock():
+            self.__reload()
+        for index in self.__indexes:
+            self.__feed(index)
+
+    def __reload(self):
+        """Indexes the frames of the file, cutting off a torn one"""
+        self.__offsets.clear()
+        self.__pending.clear()
+        self.__deleted.clear()
+        if not os.path.exists(self.__file_path):
+            with open(self.__file_path, 'wb') as f:
+                f.write(self.__serializer.header())
+        with open(self.__file_path, 'rb') as f:
+            serializer = serializers.detect(f)
+            start = f.tell()
+        if not start:
+            raise ValueError("{} is not a record file".format(
+                self.__file_path))
+        self.__serializer = serializer
+        self.__remap()
+        data, offset, self.__live = self.__map, start, 0
+        while offset + SIZES.size <= self.__size:
+            key_size, size = SIZES.unpack_from(data, offset)
+            end = offset + SIZES.size + key_size + size
+            if end > self.__size:
+                break
+            key = data[offset + SIZES.size:
+                       offset + SIZES.size + key_size].decode()
+            offsets = self.__offsets.setdefault(key.split('.')[0], {})
+            old = offsets.pop(key, None)
+            if old is not None:
+                self.__live -= self.__frame_size(old)
+            if size:
+                offsets[key] = offset
+                self.__live += end - offset
+            offset = end
+        if offset < self.__size:
+            os.truncate(self.__file_path, offset)
+            self.__remap()
+
+    def close(self):
+        """Unmaps the file"""
+        if self.__map is not None:
+            self.__map.close()
+            self.__map = None
+
+    def __save(self):
+        """Appends the frames of the held objects and deletions"""
+        if self.__undo or not self.__pending and not self.__deleted:
+            return
+        chunks = []
+        frames = []
+        for key, obj in self.__pending.items():
+            frame = self.__serializer.frame(key, obj.to_dict())
+            chunks.append(frame)
+            frames.append((key, len(frame)))
+        for key in self.__deleted:
+            chunks.append(self.__tombstone(key))
+        with open(self.__file_path, 'ab') as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.writelines(chunks)
+        self.__remap()
+        for key, size in frames:
+            offsets = self.__offsets.setdefault(key.split('.')[0], {})
+            old = offsets.get(key)
+            if old is not None:
+                self.__live -= self.__frame_size(old)
+            offsets[key] = offset
+            self.__live += size
+            offset += size
+        self.__pending.clear()
+        self.__deleted.clear()
+
+    @contextmanager
+    def __flock(self):
+        """Holds the advisory lock every process takes on the file
+
+        The lock is taken on a file of its own, since compaction replaces
+        the file itself. Systems without fcntl get no lock.
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(self.__file_path + '.lock', 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def __rollback(self, pending, deleted, removed, images):
+        """Puts back the held objects, deletions and offsets of a batch"""
+        held = dict(self.__pending)
+        self.__pending.clear()
+        self.__pending.update(pending)
+        self.__deleted.clear()
+        self.__deleted.update(deleted)
+        for key, offset in removed.items():
+            self.__offsets.setdefault(key.split('.')[0], {})[key] = offset
+            self.__live += self.__frame_size(offset)
+        for key, val in images.items():
+            if val is not None and key in self.__pending:
+                self.__pending[key] = self.__types[val['__class__']](**val)
+        for key in set(held) | set(pending) | set(removed) | set(images):
+            name, id = key.split('.', 1)
+            obj = self.get(self.__types[name], id)
+            if obj is not None:
+                self.__notify('add', obj)
+            elif key in held:
+                self.__notify('remove', held[key])
+
+    def __query(self, query):
+        """Runs query over the held objects and the saved records"""
+        results = query.select(self.__sources(query.cls))
+        if query.fields is not None:
+            return [query.project(source) for source in results]
+        return [self.__types[source['__class__']](**source)
+                if isinstance(source, dict) else source
+                for source in results]
+
+    def __sources(self, cls):
+        """Yields the held objects of cls, then the dicts of its records"""
+        for obj in self.__pending.values():
+            if isinstance(obj, cls):
+                yield obj
+        for name, offsets in self.__offsets.items():
+            if issubclass(self.__types[name], cls):
+                for key, offset in offsets.items():
+                    if key not in self.__pending:
+                        yield self.__record(offset)
+
+    def __read(self, offset):
+        """Builds the model instance of the frame at offset"""
+        val = self.__record(offset)
+        return self.__types[val['__class__']](**val)
+
+    def __record(self, offset):
+        """Returns the dict of the frame at offset"""
+        key_size, size = SIZES.unpack_from(self.__map, offset)
+        start = offset + SIZES.size + key_size
+        return self.__serializer.loads(self.__map[start:start + size])
+
+    def __frame_size(self, offset):
+        """Returns the size of the frame at offset"""
+        key_size, size = SIZES.unpack_from(self.__map, offset)
+        return SIZES.size + key_size + size
+
+    @staticmethod
+    def __tombstone(key):
+        """Returns the frame marking key as deleted"""
+        key = key.encode()
+        return SIZES.pack(len(key), 0) + key
+
+    def __rewrite(self, serializer):
+        """Writes the live frames to a new file encoded with serializer
+
+        Frames are copied as they are when the serializer does not change.
+        """
+        path = self.__file_path
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        moved = {}
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(serializer.header())
+                offset = f.tell()
+                for offsets in self.__offsets.values():
+                    for key, old in offsets.items():
+                        frame = self.__map[old:old + self.__frame_size(old)]
+                        if serializer.name != self.__serializer.name:
+                            frame = serializer.frame(
+                                key, self.__serializer.unframe(frame))
+                        f.write(frame)
+                        moved[key] = offset, len(frame)
+                        offset += len(frame)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.__serializer = serializer
+        self.__remap()
+        self.__live = 0
+        for key, (offset, size) in moved.items():
+            self.__offsets[key.split('.')[0]][key] = offset
+            self.__live += size
+
+    def __remap(self):
+        """Maps the whole file again, after it changed size"""
+        self.close()
+        with open(self.__file_path, 'rb') as f:
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__size = len(self.__map)
+
+    def __index_of(self, kind, classes=None):
+        """Returns the registered index of type kind, registering one
+
+        With classes, an index covering them is enough, and the one
+        registered only covers them, so feeding it only decodes their
+        records.
+        """
+        for index in self.__indexes:
+            if type(index) is kind and (classes is None or all(
+                    issubclass(cls, index.classes) for cls in classes)):
+                return index
+        index = kind() if classes is None else kind(classes)
+        self.register(index)
+        return index
+
+    def __notify(self, event, obj):
+        """Passes obj to the add or remove method of interested indexes"""
+        for index in self.__indexes:
+            if isinstance(obj, index.classes):
+                getattr(index, event)(obj)
+
+    def __feed(self, index):
+        """Adds every stored instance of the classes of index to it"""
+        for cls in index.classes:
+            for obj in self.all(cls).values():
+                index.add(obj)
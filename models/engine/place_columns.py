@@ -0,0 +1,181 @@
+#!/usr/bin/python3
+"""This module defines a columnar store for the numeric fields of Places"""
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class PlaceColumns:
+    """Keeps the numeric fields of every Place in typed arrays
+
+    Attach it with storage.register(PlaceColumns()) to keep it in sync
+    with the stored Places. Queries work on whole columns, with NumPy when
+    it is installed and plain loops otherwise, and return Place ids.
+    """
+    fields = {
+              'number_rooms': 'q', 'number_bathrooms': 'q',
+              'max_guest': 'q', 'price_by_night': 'q',
+              'latitude': 'd', 'longitude': 'd'
+             }
+    aggregates = ('count', 'sum', 'min', 'max', 'mean')
+
+    def __init__(self):
+        """Creates an empty store"""
+        from models.place import Place
+
+        self.classes = (Place,)
+        self.ids = []
+        self.columns = {field: array(code)
+                        for field, code in self.fields.items()}
+        self.__rows = {}
+
+    def __len__(self):
+        """Returns the number of Places in the store"""
+        return len(self.ids)
+
+    def add(self, obj):
+        """Inserts obj, or refreshes its values if it is already stored"""
+        row = self.__rows.get(obj.id)
+        if row is None:
+            self.__rows[obj.id] = len(self.ids)
+            self.ids.append(obj.id)
+            for field, column in self.columns.items():
+                column.append(self.__value(obj, field))
+        else:
+            for field, column in self.columns.items():
+                column[row] = self.__value(obj, field)
+
+    def remove(self, obj):
+        """Drops obj by moving the last row into its place"""
+        row = self.__rows.pop(obj.id, None)
+        if row is None:
+            return
+        last = len(self.ids) - 1
+        if row != last:
+            self.ids[row] = self.ids[last]
+            self.__rows[self.ids[row]] = row
+            for column in self.columns.values():
+                column[row] = column[last]
+        self.ids.pop()
+        for column in self.columns.values():
+            column.pop()
+
+    def filter(self, **conditions):
+        """Returns the ids of the Places matching every condition
+
+        Each condition is either a value the field must equal or a
+        (low, high) tuple of inclusive bounds, where None leaves that side
+        open: filter(price_by_night=(None, 100), max_guest=(4, None)).
+        """
+        for field in conditions:
+            self.__check(field)
+        if numpy is not None:
+            mask = numpy.ones(len(self.ids), dtype=bool)
+            for field, cond in conditions.items():
+                column = self.__vector(field)
+                if isinstance(cond, tuple):
+                    if cond[0] is not None:
+                        mask &= column >= cond[0]
+                    if cond[1] is not None:
+                        mask &= column <= cond[1]
+                else:
+                    mask &= column == cond
+            rows = numpy.flatnonzero(mask).tolist()
+            return [self.ids[row] for row in rows]
+        rows = None
+        for field, cond in conditions.items():
+            column = self.columns[field]
+            if rows is None:
+                pairs = enumerate(column)
+            else:
+                pairs = [(row, column[row]) for row in rows]
+            if isinstance(cond, tuple):
+                low, high = cond
+                rows = [row for row, value in pairs
+                        if (low is None or value >= low) and
+                        (high is None or value <= high)]
+            else:
+                rows = [row for row, value in pairs if value == cond]
+        if rows is None:
+            return list(self.ids)
+        return [self.ids[row] for row in rows]
+
+    def sort(self, field, ids=None, reverse=False):
+        """Returns ids, or every stored id, ordered by field"""
+        self.__check(field)
+        rows = self.__select(ids)
+        if numpy is not None:
+            column = self.__vector(field)
+            if rows is None:
+                order = numpy.argsort(column, kind='stable')
+            else:
+                rows = numpy.asarray(rows, dtype=numpy.intp)
+                order = rows[numpy.argsort(column[rows], kind='stable')]
+            if reverse:
+                order = order[::-1]
+            return [self.ids[row] for row in order.tolist()]
+        if rows is None:
+            rows = range(len(self.ids))
+        column = self.columns[field]
+        rows = sorted(rows, key=column.__getitem__, reverse=reverse)
+        return [self.ids[row] for row in rows]
+
+    def aggregate(self, field, func='mean', ids=None):
+        """Returns the count, sum, min, max or mean of field over ids
+
+        Every stored Place is used when ids is None. min, max and mean of
+        no Places are None.
+        """
+        self.__check(field)
+        if func not in self.aggregates:
+            raise ValueError("func must be one of {}".format(
+                ', '.join(self.aggregates)))
+        rows = self.__select(ids)
+        count = len(self.ids) if rows is None else len(rows)
+        if func == 'count':
+            return count
+        if not count:
+            return 0 if func == 'sum' else None
+        if numpy is not None:
+            values = self.__vector(field)
+            if rows is not None:
+                values = values[numpy.asarray(rows, dtype=numpy.intp)]
+            return getattr(values, func)().item()
+        column = self.columns[field]
+        if rows is None:
+            values = column
+        else:
+            values = [column[row] for row in rows]
+        if func == 'mean':
+            return sum(values) / len(values)
+        return {'sum': sum, 'min': min, 'max': max}[func](values)
+
+    def __select(self, ids):
+        """Returns the rows of ids, or None for every row"""
+        if ids is None:
+            return None
+        return [self.__rows[id] for id in ids]
+
+    def __vector(self, field):
+        """Returns a NumPy view over the column of field, without a copy"""
+        column = self.columns[field]
+        dtype = numpy.int64 if column.typecode == 'q' else numpy.float64
+        return numpy.frombuffer(column, dtype=dtype)
+
+    def __check(self, field):
+        """Raises KeyError if field is not a stored column"""
+        if field not in self.columns:
+            raise KeyError("{} is not a numeric Place field".format(field))
+
+    def __value(self, obj, field):
+        """Returns the field of obj converted to its column type"""
+        value = getattr(obj, field, None)
+        try:
+            if self.fields[field] == 'q':
+                return int(value)
+            return float(value)
+        except (TypeError, ValueError):
+            return 0 if self.fields[field] == 'q' else float('nan')
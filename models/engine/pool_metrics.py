@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+"""This module counts what happens to the connections of an engine"""
+import threading
+import time
+from sqlalchemy import event
+
+
+class PoolMetrics:
+    """Follows the connection pool of a SQLAlchemy engine
+
+    Pool events count new connections, checkouts, checkins and
+    invalidated connections. Checkouts are also timed, and those that
+    found every connection in use, the pool overflow included, are
+    counted as waits. The counters go on over engine.dispose(), which
+    replaces the pool.
+    """
+
+    def __init__(self, engine, max_overflow=0):
+        """Starts following the pool of engine
+
+        max_overflow is the overflow the pool was created with.
+        """
+        self.__engine = engine
+        self.__max_overflow = max_overflow
+        self.__lock = threading.Lock()
+        self.__counts = dict.fromkeys(['connects', 'checkouts', 'checkins',
+                                       'invalidated', 'waits'], 0)
+        self.__seconds = 0.0
+        self.__peak = 0
+        event.listen(engine, 'connect', self.__on_connect)
+        event.listen(engine, 'checkout', self.__on_checkout)
+        event.listen(engine, 'checkin', self.__on_checkin)
+        event.listen(engine, 'invalidate', self.__on_invalidate)
+        event.listen(engine, 'engine_disposed', self.__on_dispose)
+        self.__time(engine.pool)
+
+    def snapshot(self):
+        """Returns the counters and the current state of the pool
+
+        checkout_seconds is the total time spent getting connections,
+        waits and pre-ping round trips included.
+        """
+        pool = self.__engine.pool
+        with self.__lock:
+            metrics = dict(self.__counts)
+            metrics['checkout_seconds'] = self.__seconds
+            metrics['peak_checked_out'] = self.__peak
+        for name in ['size', 'checkedin', 'checkedout', 'overflow']:
+            if hasattr(pool, name):
+                metrics[name] = getattr(pool, name)()
+        return metrics
+
+    def __full(self):
+        """Tells whether a checkout has to wait for a checkin"""
+        pool = self.__engine.pool
+        if not hasattr(pool, 'overflow'):
+            return False
+        return pool.checkedin() == 0 and \
+            pool.overflow() >= self.__max_overflow
+
+    def __time(self, pool):
+        """Wraps the connect method of pool to time every checkout
+
+        There is no pool event before a checkout, so its start is taken
+        from the call itself.
+        """
+        connect = pool.connect
+
+        def timed():
+            """Checks out a connection, timing how long it takes"""
+            full = self.__full()
+            start = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                with self.__lock:
+                    self.__seconds += time.perf_counter() - start
+                    self.__counts['waits'] += full
+
+        pool.connect = timed
+
+    def __count(self, name):
+        """Adds one to the counter name"""
+        with self.__lock:
+            self.__counts[name] += 1
+
+    def __on_connect(self, dbapi_connection, record):
+        """Counts a new connection to the database"""
+        self.__count('connects')
+
+    def __on_checkout(self, dbapi_connection, record, proxy):
+        """Counts a connection handed out and the peak in use"""
+        with self.__lock:
+            self.__counts['checkouts'] += 1
+            self.__peak = max(self.__peak, self.__counts['checkouts'] -
+                              self.__counts['checkins'])
+
+    def __on_checkin(self, dbapi_connection, record):
+        """Counts a connection given back"""
+        self.__count('checkins')
+
+    def __on_invalidate(self, dbapi_connection, record, exception):
+        """Counts a connection dropped, as after a failed pre-ping"""
+        self.__count('invalidated')
+
+    def __on_dispose(self, engine):
+        """Times the checkouts of the pool that replaced the disposed one
+
+        The listeners above are pool events, which the new pool keeps.
+        """
+        self.__time(engine.pool)
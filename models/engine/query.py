@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+"""This module defines the queries returned by storage.query()"""
+import copy
+import itertools
+import operator
+from models import timestamp
+
+OPERATORS = {
+             'eq': operator.eq, 'ne': operator.ne, 'lt': operator.lt,
+             'le': operator.le, 'gt': operator.gt, 'ge': operator.ge,
+             'in': lambda value, options: value in options
+            }
+
+
+class Query:
+    """Describes which objects of a class to fetch, in which order
+
+    Every method but all(), first() and count() returns a new Query:
+    storage.query(Place).where(price_by_night__lt=100, city_id=id)
+    .order_by('-price_by_night').limit(20).only('id', 'name').all().
+    A condition is field=value, or field__op=value with op one of eq,
+    ne, lt, le, gt, ge and in. The storage engine that made the query
+    runs it, and returns dicts of the fields given to only(), or objects.
+    """
+
+    def __init__(self, cls, run):
+        """Creates a query on every object of cls, run by run(query)"""
+        self.cls = cls
+        self.filters = ()
+        self.order = ()
+        self.size = None
+        self.fields = None
+        self.__run = run
+
+    def where(self, **conditions):
+        """Returns the query also requiring every condition"""
+        filters = []
+        for name, value in conditions.items():
+            field, _, op = name.partition('__')
+            op = op or 'eq'
+            if op not in OPERATORS:
+                raise ValueError("unknown operator {} in {}".format(op, name))
+            filters.append((field, op, value))
+        return self.__copy(filters=self.filters + tuple(filters))
+
+    def order_by(self, *fields):
+        """Returns the query sorted by fields, descending for a -field"""
+        order = tuple((field.lstrip('-'), field.startswith('-'))
+                      for field in fields)
+        return self.__copy(order=self.order + order)
+
+    def limit(self, size):
+        """Returns the query stopping after size objects"""
+        return self.__copy(size=size)
+
+    def only(self, *fields):
+        """Returns the query fetching dicts of fields instead of objects"""
+        return self.__copy(fields=fields)
+
+    def all(self):
+        """Runs the query and returns the list of its results"""
+        return self.__run(self)
+
+    def first(self):
+        """Runs the query and returns its first result, or None"""
+        results = self.limit(1).all()
+        return results[0] if results else None
+
+    def count(self):
+        """Runs the query and returns the number of results"""
+        return len(self.all())
+
+    def __iter__(self):
+        """Runs the query and iterates over its results"""
+        return iter(self.all())
+
+    def value(self, source, field):
+        """Returns field of source, an object or the dict of a record
+
+        Records missing a field get the default of the class, and their
+        dates are parsed as they would be in an object.
+        """
+        if not isinstance(source, dict):
+            return getattr(source, field, None)
+        if field not in source:
+            defaults = getattr(self.cls, '_defaults', None)
+            if defaults is not None:
+                return defaults.get(field)
+            return getattr(self.cls, field, None)
+        value = source[field]
+        if field in ('created_at', 'updated_at') and isinstance(value, str):
+            return timestamp.parse(value)
+        return value
+
+    def select(self, sources):
+        """Returns the sources matching the query, sorted and limited
+
+        sources are objects or record dicts, filtered one condition at a
+        time. Without an order, they are only consumed 1000 at a time
+        until the limit is reached.
+        """
+        step = 1000 if self.size is not None and not self.order else None
+        sources = iter(sources)
+        matched = []
+        while True:
+            chunk = list(itertools.islice(sources, step))
+            done = step is None or len(chunk) < step
+            for field, op, target in self.filters:
+                chunk = self.__filter(chunk, field, OPERATORS[op], target)
+            matched.extend(chunk)
+            if done or len(matched) >= self.size:
+                break
+        for field, reverse in reversed(self.order):
+            matched.sort(key=lambda source: self.__key(source, field),
+                         reverse=reverse)
+        return matched[:self.size]
+
+    def project(self, source):
+        """Returns the dict of the fields given to only() of source"""
+        return {field: self.value(source, field) for field in self.fields}
+
+    def __filter(self, sources, field, test, target):
+        """Returns the sources whose field passes test against target"""
+        value = self.value
+        try:
+            return [source for source in sources
+                    if test(value(source, field) if type(source) is dict
+                            else getattr(source, field, None), target)]
+        except TypeError:
+            return [source for source in sources
+                    if self.__passes(source, field, test, target)]
+
+    def __passes(self, source, field, test, target):
+        """Tells whether field of source passes test, False if it cannot
+        be compared with target"""
+        try:
+            return test(self.value(source, field), target)
+        except TypeError:
+            return False
+
+    def __key(self, source, field):
+        """Returns the sort key of field in source, missing values last"""
+        value = self.value(source, field)
+        return (value is None, value if value is not None else 0)
+
+    def __copy(self, **changes):
+        """Returns a copy of the query with changed attributes"""
+        query = copy.copy(self)
+        for name, value in changes.items():
+            setattr(query, name, value)
+        return query
@@ -0,0 +1,26 @@
+#!/usr/bin/python3
+"""This module finds how the objects of two model classes are linked"""
+
+
+def link(parent, cls):
+    """Returns how objects of cls belong to objects of the class parent
+
+    ('ids', field) when parent.field lists the ids of the cls objects, as
+    Place.amenity_ids does, and ('key', field) when the cls objects hold
+    the id of their parent in field, as City.state_id does. Raises
+    ValueError when the classes are not linked.
+    """
+    many = cls.__name__.lower() + '_ids'
+    if hasattr(parent, many):
+        return 'ids', many
+    key = parent.__name__.lower() + '_id'
+    if hasattr(cls, key):
+        return 'key', key
+    raise ValueError("{} objects are not linked to {} objects".format(
+        cls.__name__, parent.__name__))
+
+
+def keys(cls):
+    """Returns the names of the fields of cls holding the id of a parent"""
+    return tuple(sorted(name for name in dir(cls)
+                        if name.endswith('_id') and not name.startswith('_')))
@@ -0,0 +1,144 @@
+#!/usr/bin/python3
+"""This module defines the record encodings FileStorage can write"""
+import json
+import marshal
+import pickle
+import struct
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MAGIC = b'HBNB'
+SIZES = struct.Struct('<II')
+
+
+class Serializer:
+    """Encodes the records of a binary snapshot file
+
+    A binary file starts with a "HBNB <name>" header line naming its
+    serializer, followed by one frame per record: the sizes of the key and
+    of the payload, the key in UTF-8, then the encoded record.
+    """
+    name = None
+    binary = True
+
+    def header(self):
+        """Returns the first line of a file written with this serializer"""
+        return MAGIC + b' ' + self.name.encode() + b'\n'
+
+    def frame(self, key, val):
+        """Returns the frame holding the record val stored under key"""
+        key = key.encode()
+        payload = self.dumps(val)
+        return SIZES.pack(len(key), len(payload)) + key + payload
+
+    def unframe(self, frame):
+        """Returns the record held in a frame"""
+        size = SIZES.unpack_from(frame)[0]
+        return self.loads(frame[SIZES.size + size:])
+
+    @staticmethod
+    def frames(f):
+        """Yields (key, frame) for every frame left in the binary file f
+
+        A frame cut short raises ValueError.
+        """
+        while True:
+            sizes = f.read(SIZES.size)
+            if not sizes:
+                return
+            if len(sizes) < SIZES.size:
+                raise ValueError("truncated record")
+            key_size, size = SIZES.unpack(sizes)
+            body = f.read(key_size + size)
+            if len(body) < key_size + size:
+                raise ValueError("truncated record")
+            yield body[:key_size].decode(), sizes + body
+
+
+class JSONSerializer(Serializer):
+    """The text layout of file.json, one JSON record per line"""
+    name = 'json'
+    binary = False
+
+    @staticmethod
+    def dumps(val):
+        """Returns val encoded as JSON"""
+        return json.dumps(val).encode()
+
+    loads = staticmethod(json.loads)
+
+
+class PickleSerializer(Serializer):
+    """Binary records encoded with pickle, the fastest to read and write"""
+    name = 'pickle'
+
+    @staticmethod
+    def dumps(val):
+        """Returns val pickled with the highest protocol"""
+        return pickle.dumps(val, pickle.HIGHEST_PROTOCOL)
+
+    loads = staticmethod(pickle.loads)
+
+
+class MarshalSerializer(Serializer):
+    """Binary records encoded with marshal, the smallest of the stdlib
+
+    The marshal format may change between Python versions; convert the
+    file to json before upgrading Python.
+    """
+    name = 'marshal'
+    dumps = staticmethod(marshal.dumps)
+    loads = staticmethod(marshal.loads)
+
+
+class MsgpackSerializer(Serializer):
+    """Compact binary records readable outside of Python"""
+    name = 'msgpack'
+
+    @staticmethod
+    def dumps(val):
+        """Returns val packed with msgpack"""
+        return msgpack.packb(val)
+
+    @staticmethod
+    def loads(data):
+        """Returns the value packed in data"""
+        return msgpack.unpackb(data)
+
+
+serializers = {
+               'json': JSONSerializer, 'pickle': PickleSerializer,
+               'marshal': MarshalSerializer
+              }
+if msgpack is not None:
+    serializers['msgpack'] = MsgpackSerializer
+
+
+def get(name):
+    """Returns the serializer called name
+
+    Raises ValueError if there is none, or its module is not installed.
+    """
+    if name not in serializers:
+        raise ValueError("serializer must be one of {}".format(
+            ', '.join(serializers)))
+    return serializers[name]()
+
+
+def detect(f):
+    """Returns the serializer of the file f, read from its first line
+
+    f is opened in binary mode. It is left after the header of binary
+    files, and rewound for json files.
+    """
+    if f.read(len(MAGIC)) != MAGIC:
+        f.seek(0)
+        return JSONSerializer()
+    name = f.readline()[1:].rstrip(b'\n').decode()
+    if name not in serializers:
+        raise ValueError("{} is written with {}, which is not "
+                         "available".format(f.name, name))
+    return serializers[name]()
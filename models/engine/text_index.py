@@ -0,0 +1,177 @@
+#!/usr/bin/python3
+"""This module defines a full-text index over Places and Reviews"""
+import hashlib
+import heapq
+import math
+import os
+import pickle
+import re
+
+TOKEN = re.compile(r'\w+')
+STOPWORDS = frozenset(['a', 'an', 'and', 'are', 'as', 'at', 'be', 'but',
+                       'by', 'for', 'if', 'in', 'into', 'is', 'it', 'no',
+                       'not', 'of', 'on', 'or', 'such', 'that', 'the',
+                       'their', 'then', 'there', 'these', 'they', 'this',
+                       'to', 'was', 'will', 'with'])
+
+
+def digest(text):
+    """Returns a short digest of text, the same in every process"""
+    return hashlib.blake2b(text.encode(), digest_size=8).digest()
+
+
+def tokens(text):
+    """Returns the lowercase words of text, without stopwords"""
+    return [word for word in TOKEN.findall(text.lower())
+            if word not in STOPWORDS]
+
+
+class TextIndex:
+    """Inverted index ranking Places and Reviews with BM25
+
+    Attach it with storage.register() to keep it in sync with the stored
+    objects. Place.name and Place.description, and Review.text, are split
+    into words; search() returns the keys of the best matches of a text.
+
+    dump() writes the index with a small stamp file next to it, naming
+    the version of the storage file it matches. A storage file that
+    changes without changing the indexed text moves the stamp along with
+    restamp() instead of writing the whole index again.
+    """
+    fields = {'Place': ('name', 'description'), 'Review': ('text',)}
+    version = 1
+
+    def __init__(self, k1=1.2, b=0.75):
+        """Creates an empty index with the BM25 parameters k1 and b"""
+        from models.place import Place
+        from models.review import Review
+
+        self.classes = (Place, Review)
+        self.k1 = k1
+        self.b = b
+        self.written = False
+        self.__postings = {}
+        self.__docs = {}
+        self.__length = 0
+
+    def __len__(self):
+        """Returns the number of indexed objects"""
+        return len(self.__docs)
+
+    def add(self, obj):
+        """Indexes the text of obj, or indexes it again if it changed"""
+        key = type(obj).__name__ + '.' + obj.id
+        fields = self.fields.get(type(obj).__name__, ())
+        text = ' '.join(str(getattr(obj, field, '') or '')
+                        for field in fields)
+        old = self.__docs.get(key)
+        sign = digest(text)
+        if old is not None and old[0] == sign:
+            return
+        if old is not None:
+            self.remove(obj)
+        words = tokens(text)
+        counts = {}
+        for word in words:
+            counts[word] = counts.get(word, 0) + 1
+        for word, count in counts.items():
+            self.__postings.setdefault(word, {})[key] = count
+        self.__docs[key] = (sign, len(words), tuple(counts))
+        self.__length += len(words)
+
+    def remove(self, obj):
+        """Drops obj from the index"""
+        key = type(obj).__name__ + '.' + obj.id
+        old = self.__docs.pop(key, None)
+        if old is None:
+            return
+        for word in old[2]:
+            docs = self.__postings[word]
+            del docs[key]
+            if not docs:
+                del self.__postings[word]
+        self.__length -= old[1]
+
+    def search(self, text, names=None, limit=10):
+        """Returns the (key, score) pairs best matching text, best first
+
+        names restricts the results to objects of those class names.
+        """
+        if not self.__docs:
+            return []
+        total = len(self.__docs)
+        average = self.__length / total or 1
+        k1, b = self.k1, self.b
+        scores = {}
+        for word in set(tokens(text)):
+            docs = self.__postings.get(word)
+            if not docs:
+                continue
+            idf = math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for key, count in docs.items():
+                size = self.__docs[key][1]
+                scores[key] = scores.get(key, 0) + idf * count * (k1 + 1) / \
+                    (count + k1 * (1 - b + b * size / average))
+        if names is not None:
+            prefixes = tuple(name + '.' for name in names)
+            scores = {key: score for key, score in scores.items()
+                      if key.startswith(prefixes)}
+        return heapq.nlargest(limit, scores.items(), key=lambda pair:
+                              pair[1])
+
+    def dump(self, path, stamp):
+        """Writes the index to path, with the stamp of the storage file"""
+        generation = os.urandom(8)
+        write(path, (self.version, generation, self.k1, self.b,
+                     self.__postings, self.__docs, self.__length))
+        write(path + '.stamp', (self.version, generation, stamp))
+        self.written = True
+
+    @classmethod
+    def load(cls, path, stamp):
+        """Returns the index written to path, or None
+
+        None is also returned when the index was written for another
+        version of the storage file than stamp.
+        """
+        mark = read(path + '.stamp')
+        if mark is None or mark != (cls.version, mark[1], stamp):
+            return None
+        state = read(path)
+        if state is None or state[:2] != mark[:2]:
+            return None
+        index = cls(state[2], state[3])
+        index.__postings, index.__docs, index.__length = state[4:]
+        index.written = True
+        return index
+
+    @staticmethod
+    def restamp(path, old, new):
+        """Moves the stamp of the index at path from old to new
+
+        Nothing is written unless the index matched the old version of the
+        storage file. Returns whether it did.
+        """
+        mark = read(path + '.stamp')
+        if mark is None or mark[2] != old:
+            return False
+        if old != new:
+            write(path + '.stamp', mark[:2] + (new,))
+        return True
+
+
+def read(path):
+    """Returns the object pickled in path, or None if it cannot be read"""
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def write(path, state):
+    """Pickles state to path, replacing it in one step"""
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
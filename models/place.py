@@ -1,6 +1,9 @@
 #!/usr/bin/python3
 """ Place Module for HBNB project """
+import models
+from models.amenity import Amenity
 from models.base_model import BaseModel
+from models.review import Review
 
 
 class Place(BaseModel):
@@ -16,3 +19,13 @@ class Place(BaseModel):
     latitude = 0.0
     longitude = 0.0
     amenity_ids = []
+
+    @property
+    def reviews(self):
+        """ The Reviews of the Place """
+        return models.storage.children(self, Review)
+
+    @property
+    def amenities(self):
+        """ The Amenities listed in amenity_ids """
+        return models.storage.children(self, Amenity)
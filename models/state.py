@@ -1,8 +1,15 @@
 #!/usr/bin/python3
 """ State Module for HBNB project """
+import models
 from models.base_model import BaseModel
+from models.city import City
 
 
 class State(BaseModel):
     """ State class """
     name = ""
+
+    @property
+    def cities(self):
+        """ The Cities of the State """
+        return models.storage.children(self, City)
@@ -0,0 +1,29 @@
+#!/usr/bin/python3
+"""This module converts model timestamps to and from their stored form
+
+Timestamps are stored as ISO 8601 strings with a fixed layout,
+'%Y-%m-%dT%H:%M:%S.%f'. Parsing goes through datetime.fromisoformat, which
+is much faster than datetime.strptime and also accepts timestamps written
+without microseconds.
+"""
+from datetime import datetime
+
+FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+
+def parse(value):
+    """Returns the datetime stored in value
+
+    value may already be a datetime, in which case it is returned as is.
+    """
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, FORMAT)
+
+
+def format(value):
+    """Returns the stored form of the datetime value"""
+    return value.isoformat(timespec='microseconds')
@@ -0,0 +1,131 @@
+#!/usr/bin/python3
+""" Module for testing the batch mode of the console """
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+from console import HBNBCommand
+from models.engine.file_storage import FileStorage
+from models.state import State
+from models import storage
+
+
+class test_consoleBatch(unittest.TestCase):
+    """ Class to test HBNBCommand.run_script() """
+
+    def setUp(self):
+        """ Empties the storage """
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage._FileStorage__indexes.clear()
+
+    def tearDown(self):
+        """ Removes the storage file """
+        for path in ['file.json', 'file.json.lock']:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def run_script(self, lines, every=None):
+        """ Runs lines, returning the count of writes and the output """
+        with mock.patch.object(FileStorage, '_FileStorage__write',
+                               autospec=True,
+                               side_effect=FileStorage._FileStorage__write
+                               ) as write, \
+                redirect_stdout(io.StringIO()) as out:
+            count = HBNBCommand().run_script(lines, every)
+        return count, write.call_count, out.getvalue().splitlines()
+
+    def test_saves_once(self):
+        """ Every command runs, and the storage is written once """
+        state = State()
+        storage.save()
+        lines = ['create State', 'create City', '',
+                 '# a comment',
+                 'State.update("{}", "name", "Ohio")'.format(state.id),
+                 'State.count()', 'destroy State {}'.format(state.id)]
+        count, writes, out = self.run_script(lines)
+        self.assertEqual((count, writes), (5, 1))
+        self.assertEqual(out[2], '2')
+        self.assertEqual(len(storage.all()), 2)
+        storage.reload()
+        self.assertEqual(len(storage.all()), 2)
+
+    def test_every(self):
+        """ every N saves once per N commands """
+        count, writes, out = self.run_script(['create State'] * 5, 2)
+        self.assertEqual((count, writes), (5, 3))
+
+    def test_errors_and_quit(self):
+        """ Errors are printed, and quit ends the script """
+        count, writes, out = self.run_script([
+            'bogus', 'create City name', 'quit', 'create State'])
+        self.assertEqual(count, 2)
+        self.assertEqual(out[0], '*** Unknown syntax: bogus')
+        self.assertTrue(out[1].startswith('** '))
+        self.assertEqual(storage.all(State), {})
+
+    def test_every_below_one(self):
+        """ --every below 1 is refused before anything runs """
+        import subprocess
+        import sys
+        for every in ['0', '-2']:
+            result = subprocess.run(
+                [sys.executable, 'console.py', '--batch', '-',
+                 '--every', every], input='create State\n',
+                capture_output=True, text=True)
+            self.assertEqual(result.returncode, 2)
+            self.assertIn('--every must be at least 1', result.stderr)
+            self.assertEqual(result.stdout, '')
+
+
+class test_consoleClasses(unittest.TestCase):
+    """ Class to test that all and count match the exact class """
+
+    def setUp(self):
+        """ Stores one BaseModel and one State """
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage._FileStorage__indexes.clear()
+        from models.base_model import BaseModel
+        self.base = BaseModel()
+        self.base.save()
+        self.state = State()
+        self.state.save()
+
+    def tearDown(self):
+        """ Detaches indexes and removes the storage file """
+        storage._FileStorage__indexes.clear()
+        for path in ['file.json', 'file.json.lock']:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def onecmd(self, line):
+        """ Returns what the console prints for line """
+        console = HBNBCommand()
+        with redirect_stdout(io.StringIO()) as out:
+            console.onecmd(console.precmd(line))
+        return out.getvalue().strip()
+
+    def test_count(self):
+        """ count BaseModel leaves out the State """
+        self.assertEqual(self.onecmd('count BaseModel'), '1')
+        self.assertEqual(self.onecmd('BaseModel.count()'), '1')
+        self.assertEqual(self.onecmd('count State'), '1')
+
+    def test_all(self):
+        """ all BaseModel leaves out the State """
+        shown = self.onecmd('all BaseModel')
+        self.assertIn(self.base.id, shown)
+        self.assertNotIn(self.state.id, shown)
+        shown = self.onecmd('all')
+        self.assertIn(self.base.id, shown)
+        self.assertIn(self.state.id, shown)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -22,10 +22,11 @@ class test_basemodel(unittest.TestCase):
         pass
 
     def tearDown(self):
-        try:
-            os.remove('file.json')
-        except:
-            pass
+        for path in ['file.json', 'file.json.lock']:
+            try:
+                os.remove(path)
+            except:
+                pass
 
     def test_default(self):
         """ """
@@ -80,6 +81,15 @@ class test_basemodel(unittest.TestCase):
         with self.assertRaises(KeyError):
             new = self.value(**n)
 
+    def test_kwargs_no_microseconds(self):
+        """ Timestamps written without microseconds are loaded """
+        i = self.value()
+        copy = i.to_dict()
+        copy['created_at'] = '2020-02-18T14:21:12'
+        new = self.value(**copy)
+        self.assertEqual(new.created_at,
+                         datetime.datetime(2020, 2, 18, 14, 21, 12))
+
     def test_id(self):
         """ """
         new = self.value()
@@ -97,3 +107,40 @@ class test_basemodel(unittest.TestCase):
         n = new.to_dict()
         new = BaseModel(**n)
         self.assertFalse(new.created_at == new.updated_at)
+
+
+class test_compact_layout(unittest.TestCase):
+    """ Runs models in a child process with HBNB_COMPACT_MODELS=1 """
+
+    script = """
+from models.place import Place
+from models.base_model import BaseModel
+place = Place()
+assert not hasattr(place, '__dict__')
+assert place.name == '' and place.amenity_ids == []
+place.name = 'Loft'
+place.guest_note = 'quiet'
+copy = place.to_dict()
+assert copy['name'] == 'Loft' and copy['guest_note'] == 'quiet'
+assert 'description' not in copy
+loaded = Place(**copy)
+assert loaded.to_dict() == copy
+assert "'name': 'Loft'" in str(loaded)
+try:
+    place.missing
+    raise SystemExit('missing attribute found')
+except AttributeError:
+    pass
+"""
+
+    def test_compact_models(self):
+        """ Compact models keep to_dict, __str__ and attribute semantics """
+        import subprocess
+        import sys
+        env = dict(os.environ, HBNB_COMPACT_MODELS='1')
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))))
+        env['PYTHONPATH'] = root
+        result = subprocess.run([sys.executable, '-c', self.script],
+                                env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+"""
+SQLAlchemy-mapped models for the DBStorage tests and benchmarks
+
+The models of this tree are not mapped to tables, so DBStorage cannot
+be imported as it is. This module maps a subclass of every model to a
+table of the same shape as the MySQL schema. load() imports DBStorage
+with them in place of the plain models, and mapped() keeps them there
+for the indexes that import the models when they are built. Importing
+it raises ImportError when SQLAlchemy is not installed.
+"""
+import importlib
+import sys
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+from sqlalchemy import Column, DateTime, Float, Integer, String
+from sqlalchemy.orm import DeclarativeMeta, declarative_base
+from models import amenity, base_model, city, place, review, state, user
+
+
+class MappedLayout(base_model.ModelLayout, DeclarativeMeta):
+    """Metaclass of the models that are both models and mapped classes"""
+
+
+Base = declarative_base(metaclass=MappedLayout)
+
+
+class Mapped:
+    """Columns every table has"""
+    id = Column(String(60), primary_key=True)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+
+class User(Mapped, user.User, Base):
+    """User mapped to users"""
+    __tablename__ = 'users'
+    email = Column(String(128))
+    password = Column(String(128))
+    first_name = Column(String(128))
+    last_name = Column(String(128))
+
+
+class State(Mapped, state.State, Base):
+    """State mapped to states"""
+    __tablename__ = 'states'
+    name = Column(String(128))
+
+
+class City(Mapped, city.City, Base):
+    """City mapped to cities"""
+    __tablename__ = 'cities'
+    name = Column(String(128))
+    state_id = Column(String(60))
+
+
+class Amenity(Mapped, amenity.Amenity, Base):
+    """Amenity mapped to amenities"""
+    __tablename__ = 'amenities'
+    name = Column(String(128))
+
+
+class Place(Mapped, place.Place, Base):
+    """Place mapped to places"""
+    __tablename__ = 'places'
+    city_id = Column(String(60))
+    user_id = Column(String(60))
+    name = Column(String(128))
+    description = Column(String(1024))
+    number_rooms = Column(Integer)
+    number_bathrooms = Column(Integer)
+    max_guest = Column(Integer)
+    price_by_night = Column(Integer)
+    latitude = Column(Float)
+    longitude = Column(Float)
+
+
+class Review(Mapped, review.Review, Base):
+    """Review mapped to reviews"""
+    __tablename__ = 'reviews'
+    place_id = Column(String(60))
+    user_id = Column(String(60))
+    text = Column(String(1024))
+
+
+@contextmanager
+def mapped():
+    """Puts the mapped models in place of the plain ones inside the block"""
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.object(base_model, 'Base', Base,
+                                              create=True))
+        for module, cls in [(user, User), (state, State), (city, City),
+                            (amenity, Amenity), (place, Place),
+                            (review, Review)]:
+            stack.enter_context(mock.patch.object(module, cls.__name__, cls))
+        yield
+
+
+def load():
+    """Returns the DBStorage class of a fresh import using these models"""
+    with mapped():
+        sys.modules.pop('models.engine.db_storage', None)
+        try:
+            return importlib.import_module(
+                'models.engine.db_storage').DBStorage
+        finally:
+            sys.modules.pop('models.engine.db_storage', None)
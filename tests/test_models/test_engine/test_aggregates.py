@@ -0,0 +1,143 @@
+#!/usr/bin/python3
+""" Module for testing the aggregates index and storage.totals() """
+import unittest
+from models.engine.aggregates import Aggregates
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models import storage
+import os
+
+
+class test_aggregates(unittest.TestCase):
+    """ Class to test Aggregates and storage.totals() """
+
+    def setUp(self):
+        """ Stores a State with two Cities of Places with Reviews """
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage._FileStorage__indexes.clear()
+        self.state = State()
+        self.cities = [City(), City()]
+        self.places = []
+        for i, city in enumerate(self.cities):
+            city.state_id = self.state.id
+            for price in [100, 200 + i * 100]:
+                place = Place()
+                place.city_id = city.id
+                place.price_by_night = price
+                self.places.append(place)
+        for i in range(3):
+            review = Review()
+            review.place_id = self.places[0].id
+
+    def tearDown(self):
+        """ Detaches indexes and removes the storage file """
+        storage._FileStorage__indexes.clear()
+        for path in ['file.json', 'file.json.lock']:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def test_totals(self):
+        """ Places, prices and reviews are counted per group """
+        self.assertEqual(storage.totals(self.places[0]), {'reviews': 3})
+        self.assertEqual(storage.totals(self.places[1]), {'reviews': 0})
+        self.assertEqual(storage.totals(self.cities[1]),
+                         {'places': 2, 'average_price': 200})
+        self.assertEqual(storage.totals(self.state),
+                         {'places': 4, 'average_price': 175})
+        self.assertEqual(storage.totals(State()),
+                         {'places': 0, 'average_price': None})
+        with self.assertRaises(ValueError):
+            storage.totals(Review())
+
+    def test_incremental(self):
+        """ New, changed and deleted objects move the counters """
+        storage.totals(self.state)
+        place = Place()
+        place.city_id = self.cities[0].id
+        place.price_by_night = 300
+        self.assertEqual(storage.totals(self.cities[0]),
+                         {'places': 3, 'average_price': 200})
+        place.price_by_night = None
+        self.assertEqual(storage.totals(self.cities[0]),
+                         {'places': 3, 'average_price': 150})
+        storage.delete(place)
+        review = Review()
+        review.place_id = self.places[1].id
+        self.assertEqual(storage.totals(self.places[1]), {'reviews': 1})
+        review.place_id = self.places[0].id
+        self.assertEqual(storage.totals(self.places[0]), {'reviews': 4})
+        self.assertEqual(storage.totals(self.places[1]), {'reviews': 0})
+        self.assertEqual(storage.totals(self.state),
+                         {'places': 4, 'average_price': 175})
+
+    def test_city_moves(self):
+        """ A City moved or deleted takes its Places along """
+        other = State()
+        storage.totals(self.state)
+        self.cities[0].state_id = other.id
+        self.assertEqual(storage.totals(self.state),
+                         {'places': 2, 'average_price': 200})
+        self.assertEqual(storage.totals(other),
+                         {'places': 2, 'average_price': 150})
+        storage.delete(self.cities[0])
+        self.assertEqual(storage.totals(other)['places'], 0)
+        self.assertEqual(storage.totals(self.cities[0])['places'], 2)
+
+    def test_order(self):
+        """ Places counted before their City join its State later """
+        index = Aggregates()
+        city = City()
+        city.state_id = self.state.id
+        for place in self.places:
+            index.add(place)
+        place = Place()
+        place.city_id = city.id
+        place.price_by_night = 50
+        index.add(place)
+        self.assertEqual(index.totals('State', self.state.id)['places'], 0)
+        index.add(city)
+        for obj in self.cities:
+            index.add(obj)
+        self.assertEqual(index.totals('State', self.state.id),
+                         {'places': 5, 'average_price': 150})
+        self.assertEqual(len(index), 8)
+
+    def test_rebuild(self):
+        """ rebuild_totals() counts changes the index did not see """
+        storage.totals(self.state)
+        object.__setattr__(self.places[0], 'price_by_night', 500)
+        self.assertEqual(storage.totals(self.cities[0])['average_price'],
+                         150)
+        storage.rebuild_totals()
+        self.assertEqual(storage.totals(self.cities[0])['average_price'],
+                         350)
+        self.assertEqual(len([index for index in
+                              storage._FileStorage__indexes
+                              if type(index) is Aggregates]), 1)
+        storage.rebuild_totals()
+        self.assertEqual(len([index for index in
+                              storage._FileStorage__indexes
+                              if type(index) is Aggregates]), 1)
+
+    def test_reload(self):
+        """ Prices changed in the file are counted by reload() """
+        import json
+        storage.save()
+        storage.totals(self.state)
+        with open('file.json') as f:
+            objs = json.load(f)
+        objs['Place.' + self.places[0].id]['price_by_night'] = 500
+        with open('file.json', 'w') as f:
+            json.dump(objs, f)
+        storage.reload()
+        self.assertEqual(storage.totals(self.cities[0]),
+                         {'places': 2, 'average_price': 350})
+
+
+if __name__ == "__main__":
+    unittest.main()
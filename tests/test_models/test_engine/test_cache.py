@@ -0,0 +1,142 @@
+#!/usr/bin/python3
+""" Module for testing the read-through storage cache """
+import unittest
+from unittest import mock
+import os
+from models.engine.cache import CachedStorage
+from models.amenity import Amenity
+from models.base_model import BaseModel
+from models.state import State
+from models import storage
+
+
+class test_cachedStorage(unittest.TestCase):
+    """ Class to test CachedStorage in front of FileStorage """
+
+    def setUp(self):
+        """ Puts a cache in front of an empty storage """
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage._FileStorage__indexes.clear()
+        self.cache = CachedStorage(storage, ttl=60, max_entries=8)
+        patcher = mock.patch('models.storage', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.state = State()
+
+    def tearDown(self):
+        """ Removes the storage file """
+        for path in ['file.json', 'file.json.lock']:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def test_hits(self):
+        """ Repeated reads are served from the cache """
+        with mock.patch.object(storage, 'all', wraps=storage.all) as read:
+            first = self.cache.all(State)
+            self.assertEqual(self.cache.all(State), first)
+            self.assertEqual(len(self.cache.all(State, view=True)), 1)
+        self.assertEqual(read.call_count, 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+
+    def test_copies(self):
+        """ Changing a returned dict leaves the cached one alone """
+        self.cache.all(State).clear()
+        self.assertEqual(len(self.cache.all(State)), 1)
+
+    def test_invalidation(self):
+        """ new, touch and delete drop the results they change """
+        self.assertEqual(self.cache.count(State), 1)
+        self.assertEqual(self.cache.count(), 1)
+        self.cache.count(Amenity)
+        other = State()
+        self.assertEqual(self.cache.count(State), 2)
+        self.assertEqual(self.cache.count(), 2)
+        self.assertEqual(self.cache.count(BaseModel), 2)
+        self.assertIs(self.cache.get(State, other.id), other)
+        self.cache.delete(other)
+        self.assertIsNone(self.cache.get(State, other.id))
+        self.assertEqual(self.cache.count(State), 1)
+        self.assertEqual(self.cache.stats()['hits'], 0)
+        self.cache.count(Amenity)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_load_unlocked(self):
+        """ The storage is read outside the lock, and a result read while
+        its class changed is not kept """
+        import threading
+        count = storage.count
+
+        def slow_count(cls=None):
+            """ Counts States while another thread uses the cache and
+            stores a State """
+            if cls is State:
+                other = threading.Thread(target=self.cache.count,
+                                         args=(Amenity,))
+                other.start()
+                other.join(1)
+                self.assertFalse(other.is_alive())
+                result = count(cls)
+                State()
+                return result
+            return count(cls)
+
+        with mock.patch.object(storage, 'count', side_effect=slow_count):
+            self.assertEqual(self.cache.count(State), 1)
+        self.assertEqual(self.cache.count(State), 2)
+        self.assertEqual(self.cache.stats()['hits'], 0)
+
+    def test_ttl(self):
+        """ Results expire after the TTL of their class """
+        cache = CachedStorage(storage, ttl=60, ttls={'State': 10})
+        with mock.patch('time.monotonic', return_value=0):
+            cache.count(State)
+            cache.count(Amenity)
+        with mock.patch('time.monotonic', return_value=30):
+            cache.count(State)
+            cache.count(Amenity)
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['expired']), (1, 1))
+
+    def test_lru(self):
+        """ The least recently used results are evicted first """
+        cache = CachedStorage(storage, max_entries=2)
+        cache.count(State)
+        cache.count(Amenity)
+        cache.count(State)
+        cache.count()
+        self.assertEqual(cache.stats()['evicted'], 1)
+        cache.count(State)
+        self.assertEqual(cache.stats()['hits'], 2)
+        cache.count(Amenity)
+        self.assertEqual(cache.stats()['misses'], 4)
+
+    def test_bytes(self):
+        """ Results are evicted past max_bytes """
+        for i in range(20):
+            State()
+        cache = CachedStorage(storage, max_bytes=1)
+        cache.all(State)
+        cache.count(State)
+        stats = cache.stats()
+        self.assertEqual((stats['entries'], stats['evicted']), (1, 1))
+        self.assertLess(stats['bytes'], 1000)
+
+    def test_env(self):
+        """ Settings are read from the environment """
+        env = {'HBNB_CACHE_TTLS': 'State=5, Amenity=7',
+               'HBNB_CACHE_ENTRIES': '3'}
+        with mock.patch.dict(os.environ, env):
+            cache = CachedStorage(storage)
+        self.assertEqual(cache._CachedStorage__ttls,
+                         {'State': 5.0, 'Amenity': 7.0})
+        self.assertEqual(cache._CachedStorage__max_entries, 3)
+
+    def test_passthrough(self):
+        """ Other calls go to the storage """
+        self.assertEqual(self.cache.page(State), [self.state])
+        self.cache.save()
+        self.assertTrue(os.path.exists('file.json'))
@@ -0,0 +1,298 @@
+#!/usr/bin/python3
+""" Module for testing the database storage against SQLite """
+import unittest
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+import os
+import tempfile
+
+try:
+    from tests.test_models.test_engine.db_models import (
+        City, Place, Review, State, load, mapped)
+    DBStorage = load()
+except ImportError:
+    DBStorage = None
+
+
+@unittest.skipIf(DBStorage is None, "needs SQLAlchemy")
+class test_dbStorage(unittest.TestCase):
+    """ Class to test DBStorage on a SQLite file """
+
+    def setUp(self):
+        """ Opens a storage on an empty SQLite database """
+        self.tmp = tempfile.TemporaryDirectory()
+        url = 'sqlite:///' + os.path.join(self.tmp.name, 'hbnb.db')
+        with mock.patch.dict(os.environ, {'HBNB_DB_URL': url}):
+            self.storage = DBStorage()
+        self.storage.reload()
+        self.storage._DBStorage__indexes.clear()
+        stack = ExitStack()
+        stack.enter_context(mapped())
+        stack.enter_context(mock.patch('models.storage', self.storage))
+        self.addCleanup(stack.close)
+
+    def tearDown(self):
+        """ Closes the storage and removes the database """
+        self.storage.close()
+        self.tmp.cleanup()
+
+    def test_bulk_insert(self):
+        """ bulk_insert stores one row per dict """
+        rows = [{'name': 'State {}'.format(i)} for i in range(25)]
+        rows[0]['id'] = 'known'
+        self.assertEqual(self.storage.bulk_insert(State, rows, 10), 25)
+        self.assertEqual(self.storage.count(State), 25)
+        self.assertEqual(self.storage.get(State, 'known').name, 'State 0')
+
+    def test_bulk_insert_commits_chunks(self):
+        """ Every chunk of batch_size rows is committed on its own """
+        session = self.storage._DBStorage__session
+        rows = ({'name': str(i)} for i in range(25))
+        with mock.patch.object(session, 'commit',
+                               side_effect=session.commit) as commit:
+            self.storage.bulk_insert(State, rows, 10)
+        self.assertEqual(commit.call_count, 3)
+
+    def test_batch_commits_once(self):
+        """ Saves inside a batch are left to a single commit """
+        session = self.storage._DBStorage__session
+        with mock.patch.object(session, 'commit',
+                               side_effect=session.commit) as commit:
+            with self.storage.batch():
+                for i in range(3):
+                    state = State()
+                    state.name = str(i)
+                    self.storage.new(state)
+                    self.storage.save()
+                self.storage.bulk_insert(State, [{'name': 'bulk'}])
+        self.assertEqual(commit.call_count, 1)
+        self.assertEqual(self.storage.count(State), 4)
+
+    def test_batch_rollback(self):
+        """ A batch that raises is rolled back """
+        with self.assertRaises(RuntimeError):
+            with self.storage.batch():
+                self.storage.bulk_insert(State, [{'name': 'gone'}])
+                raise RuntimeError
+        self.assertEqual(self.storage.count(State), 0)
+
+    def test_page_and_iterate(self):
+        """ Pages resume after the last id and iterate() streams all rows """
+        rows = [{'id': 's{}'.format(i), 'name': str(i)} for i in range(5)]
+        self.storage.bulk_insert(State, rows)
+        first = self.storage.page(State, 3)
+        self.assertEqual([row.id for row in first], ['s0', 's1', 's2'])
+        rest = self.storage.page(State, 3, first[-1].id)
+        self.assertEqual([row.id for row in rest], ['s3', 's4'])
+        self.assertEqual(len(list(self.storage.iterate(State, 2))), 5)
+
+    def test_iterate_order(self):
+        """ iterate() yields the rows of every table in id order """
+        self.storage.bulk_insert(State, [{'id': i, 'name': i}
+                                         for i in ['c', 'a', 'e']])
+        self.storage.bulk_insert(Review, [{'id': i, 'text': i}
+                                          for i in ['d', 'f', 'b']])
+        self.assertEqual([row.id for row in self.storage.iterate(
+            batch_size=2)], ['a', 'b', 'c', 'd', 'e', 'f'])
+        self.assertEqual([row.id for row in self.storage.iterate(State)],
+                         ['a', 'c', 'e'])
+
+    def test_session_per_thread(self):
+        """ Every thread has a session, which close() discards """
+        import threading
+        session = self.storage._DBStorage__session
+        own = session()
+        other = []
+        thread = threading.Thread(target=lambda: other.append(session()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], own)
+        self.storage.close()
+        self.assertIsNot(session(), own)
+        self.storage.bulk_insert(State, [{'name': 'kept'}])
+        self.assertEqual(self.storage.count(State), 1)
+
+    def test_pool_settings(self):
+        """ Pool settings are read from the HBNB_MYSQL_ variables """
+        env = {'HBNB_DB_URL': 'sqlite:///' + os.path.join(self.tmp.name,
+                                                          'pool.db'),
+               'HBNB_MYSQL_POOL_SIZE': '2', 'HBNB_MYSQL_MAX_OVERFLOW': '1',
+               'HBNB_MYSQL_POOL_PRE_PING': '0'}
+        with mock.patch.dict(os.environ, env):
+            storage = DBStorage()
+        storage.reload()
+        checkouts = storage.pool_metrics()['checkouts']
+        storage.count()
+        metrics = storage.pool_metrics()
+        self.assertEqual(metrics['size'], 2)
+        self.assertEqual(metrics['checkouts'], checkouts + 1)
+        self.assertFalse(storage._DBStorage__engine.pool._pre_ping)
+        storage.close()
+
+    def test_fetch_workers(self):
+        """ Tables read concurrently are instances of the session """
+        env = {'HBNB_DB_URL': str(self.storage._DBStorage__engine.url),
+               'HBNB_MYSQL_FETCH_WORKERS': '3'}
+        with mock.patch.dict(os.environ, env):
+            storage = DBStorage()
+        storage.reload()
+        storage.bulk_insert(State, [{'id': 's', 'name': 'a'}])
+        storage.bulk_insert(City, [{'id': 'c', 'name': 'b'}])
+        state = storage.get(State, 's')
+        objs = storage.all()
+        self.assertIs(objs['State.s'], state)
+        objs['City.c'].name = 'changed'
+        storage.save()
+        self.assertEqual(self.storage.get(City, 'c').name, 'changed')
+        self.assertEqual(set(storage.timings()),
+                         {'User', 'State', 'City', 'Amenity', 'Place',
+                          'Review'})
+        storage.close()
+
+    @contextmanager
+    def statements(self):
+        """ Collects the SQL statements run inside the block """
+        from sqlalchemy import event
+        engine = self.storage._DBStorage__engine
+        statements = []
+
+        def collect(connection, cursor, statement, *args):
+            """ Keeps the statement """
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', collect)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', collect)
+
+    def test_related_batches(self):
+        """ Loading a State -> City -> Place -> Review graph takes one
+        query per level, not one per parent """
+        states = [{'id': 's{}'.format(i)} for i in range(3)]
+        cities = [{'id': 'c{}{}'.format(i, j), 'state_id': 's{}'.format(i)}
+                  for i in range(3) for j in range(3)]
+        places = [{'id': 'p' + city['id'], 'city_id': city['id']}
+                  for city in cities]
+        reviews = [{'place_id': place['id']} for place in places
+                   for i in range(2)]
+        for cls, rows in [(State, states), (City, cities), (Place, places),
+                          (Review, reviews)]:
+            self.storage.bulk_insert(cls, rows)
+        states = list(self.storage.all(State).values())
+        with self.statements() as statements:
+            cities = self.storage.related(states, City)
+            places = self.storage.related(
+                [city for group in cities.values() for city in group], Place)
+            reviews = self.storage.related(
+                [place for group in places.values() for place in group],
+                Review)
+        self.assertEqual(len(statements), 3)
+        self.assertEqual(len(cities['s1']), 3)
+        self.assertEqual(sum(len(group) for group in reviews.values()), 18)
+        with self.statements() as statements:
+            for state in states:
+                self.storage.related([state], City)
+        self.assertEqual(len(statements), len(states))
+
+    def test_touch_detached(self):
+        """ An object kept past close() is saved once touched """
+        self.storage.bulk_insert(State, [{'id': 's', 'name': 'old'}])
+        state = self.storage.get(State, 's')
+        self.storage.close()
+        state.name = 'new'
+        self.storage.touch(state)
+        self.storage.save()
+        self.storage.close()
+        self.assertEqual(self.storage.get(State, 's').name, 'new')
+
+    def test_cache_detached(self):
+        """ A cache shares objects detached from the session of the thread
+        that read them, and keeps none with unsaved changes """
+        import threading
+        from sqlalchemy import inspect
+        from models.engine.cache import CachedStorage
+        cache = CachedStorage(self.storage)
+        self.storage.bulk_insert(State, [{'id': 's', 'name': 'old'}])
+        with mock.patch('models.storage', cache):
+            state = cache.get(State, 's')
+            self.assertTrue(inspect(state).detached)
+            names = []
+            thread = threading.Thread(
+                target=lambda: names.append(cache.get(State, 's').name))
+            thread.start()
+            thread.join()
+            self.assertEqual(names, ['old'])
+            state.name = 'new'
+            self.assertIs(cache.get(State, 's'), state)
+            self.assertFalse(inspect(state).detached)
+            self.assertEqual(cache.stats()['entries'], 0)
+            cache.save()
+        self.storage.close()
+        self.assertEqual(self.storage.get(State, 's').name, 'new')
+
+    def test_totals(self):
+        """ Counters follow the rows changed through the storage """
+        self.storage.bulk_insert(City, [{'id': 'c1', 'state_id': 's1'}])
+        self.storage.bulk_insert(Place, [
+            {'id': 'p{}'.format(i), 'city_id': 'c1',
+             'price_by_night': price} for i, price in enumerate([100, 200])])
+        self.storage.bulk_insert(Review, [{'place_id': 'p0'}] * 2)
+        city = self.storage.get(City, 'c1')
+        place = self.storage.get(Place, 'p0')
+        self.assertEqual(self.storage.totals(place), {'reviews': 2})
+        self.assertEqual(self.storage.totals(city),
+                         {'places': 2, 'average_price': 150})
+        self.storage.bulk_insert(Place, [{'city_id': 'c1',
+                                          'price_by_night': 600}])
+        self.assertEqual(self.storage.totals(city)['average_price'], 300)
+        with self.statements() as statements:
+            self.storage.rebuild_totals()
+            self.storage.totals(city)
+        self.assertEqual(len(statements), 3)
+        self.assertEqual(self.storage.totals(city)['places'], 3)
+
+    def test_totals_transient(self):
+        """ Changes to an object never added leave the counters alone """
+        self.storage.bulk_insert(City, [{'id': 'c1', 'state_id': 's1'}])
+        city = self.storage.get(City, 'c1')
+        self.storage.totals(city)
+        now = '2017-09-28T21:03:54.052298'
+        place = Place(id='p', created_at=now, updated_at=now,
+                      __class__='Place')
+        place.city_id = 'c1'
+        place.price_by_night = 50
+        self.assertEqual(self.storage.count(Place), 0)
+        self.assertEqual(self.storage.totals(city),
+                         {'places': 0, 'average_price': None})
+        self.storage.new(place)
+        self.assertEqual(self.storage.totals(city),
+                         {'places': 1, 'average_price': 50})
+
+    def test_search(self):
+        """ Places and Reviews are found by their words, best first """
+        self.storage.bulk_insert(Place, [
+            {'name': 'Sunny loft', 'description': 'quiet beach'},
+            {'name': 'Mountain cabin', 'description': 'quiet wood'}])
+        self.storage.bulk_insert(Review, [{'text': 'beach beach bar'}])
+        self.assertEqual([obj.text for obj in self.storage.search('beach')
+                          if type(obj) is Review], ['beach beach bar'])
+        places = self.storage.search('quiet beach', Place)
+        self.assertEqual([place.name for place in places],
+                         ['Sunny loft', 'Mountain cabin'])
+
+    def test_query(self):
+        """ A query runs as a single SELECT """
+        self.storage.bulk_insert(Place, [
+            {'name': str(i), 'city_id': 'c{}'.format(i % 2),
+             'price_by_night': i * 10} for i in range(10)])
+        query = self.storage.query(Place).where(
+            city_id='c1', price_by_night__lt=80).order_by('-price_by_night')
+        with self.statements() as statements:
+            places = query.limit(2).all()
+            names = query.only('name').all()
+        self.assertEqual(len(statements), 2)
+        self.assertEqual([place.name for place in places], ['7', '5'])
+        self.assertEqual(names, [{'name': '7'}, {'name': '5'},
+                                 {'name': '3'}, {'name': '1'}])
+        self.assertEqual(query.where(name__in=['1', '2']).count(), 1)
@@ -3,7 +3,10 @@
 import unittest
 from models.base_model import BaseModel
 from models import storage
+import json
 import os
+from unittest import mock
+from models.engine import serializers
 
 
 class test_fileStorage(unittest.TestCase):
@@ -16,13 +19,25 @@ class test_fileStorage(unittest.TestCase):
             del_list.append(key)
         for key in del_list:
             del storage._FileStorage__objects[key]
+        storage._FileStorage__classes.clear()
+        storage._FileStorage__dirty.clear()
+        storage._FileStorage__fragments.clear()
+        storage._FileStorage__containers.clear()
+        storage._FileStorage__raw.clear()
+        storage._FileStorage__indexes.clear()
 
     def tearDown(self):
         """ Remove storage file at end of tests """
-        try:
-            os.remove('file.json')
-        except:
-            pass
+        storage._FileStorage__journal = False
+        storage._FileStorage__fsync = 'never'
+        storage._FileStorage__lazy = False
+        storage._FileStorage__serializer = serializers.get('json')
+        for path in ['file.json', 'file.json.log', 'file.json.log.1',
+                     'file.json.lock']:
+            try:
+                os.remove(path)
+            except:
+                pass
 
     def test_obj_list_empty(self):
         """ __objects is initially empty """
@@ -102,8 +117,858 @@ class test_fileStorage(unittest.TestCase):
             temp = key
         self.assertEqual(temp, 'BaseModel' + '.' + _id)
 
+    def test_all_cls(self):
+        """ Filtering by class only returns instances of that class """
+        from models.state import State
+        from models.city import City
+        state = State()
+        city = City()
+        self.assertEqual(list(storage.all(State).values()), [state])
+        self.assertEqual(list(storage.all(City).values()), [city])
+        self.assertEqual(len(storage.all(BaseModel)), 2)
+
+    def test_all_not_copied(self):
+        """ Without a class, the stored dictionary itself is returned """
+        new = BaseModel()
+        self.assertIs(storage.all(), storage._FileStorage__objects)
+        self.assertIs(storage.all()['BaseModel.' + new.id], new)
+
+    def test_all_cls_copy(self):
+        """ Filtering by class returns a copy of the class bucket """
+        from models.state import State
+        new = State()
+        temp = storage.all(State)
+        temp.clear()
+        self.assertEqual(len(storage.all(State)), 1)
+
+    def test_all_view(self):
+        """ view=True returns a read-only live mapping """
+        from models.state import State
+        view = storage.all(State, view=True)
+        new = State()
+        self.assertIn('State.' + new.id, view)
+        with self.assertRaises(TypeError):
+            view['State.' + new.id] = None
+
+    def test_count(self):
+        """ count returns the number of stored objects """
+        from models.state import State
+        from models.city import City
+        State()
+        State()
+        City()
+        self.assertEqual(storage.count(), 3)
+        self.assertEqual(storage.count(State), 2)
+        self.assertEqual(storage.count(City), 1)
+
+    def test_delete_updates_class_bucket(self):
+        """ Deleted objects disappear from the class bucket """
+        from models.state import State
+        new = State()
+        storage.delete(new)
+        self.assertEqual(storage.count(State), 0)
+        self.assertEqual(storage.all(State), {})
+
+    def test_reload_fills_class_bucket(self):
+        """ Reloaded objects are put in their class bucket """
+        from models.state import State
+        new = State()
+        storage.save()
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage.reload()
+        self.assertIn('State.' + new.id, storage.all(State))
+        self.assertEqual(storage.count(State), 1)
+
+    def test_journal_save_appends(self):
+        """ Journaled saves append only the changed objects """
+        storage._FileStorage__journal = True
+        new = BaseModel()
+        other = BaseModel()
+        storage.save()
+        with open('file.json.log', 'r') as f:
+            self.assertEqual(len(f.readlines()), 2)
+        other.name = 'changed'
+        other.save()
+        with open('file.json.log', 'r') as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn(other.id, lines[-1])
+        self.assertFalse(os.path.exists('file.json'))
+
+    def test_journal_reload(self):
+        """ Reload replays the journal over the snapshot """
+        storage._FileStorage__journal = True
+        new = BaseModel()
+        gone = BaseModel()
+        storage.save()
+        new.name = 'journaled'
+        new.save()
+        storage.delete(gone)
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage.reload()
+        self.assertEqual(list(storage.all().keys()), ['BaseModel.' + new.id])
+        self.assertEqual(storage.all()['BaseModel.' + new.id].name,
+                         'journaled')
+
+    def test_journal_torn_record(self):
+        """ A partially written last record is ignored on reload """
+        storage._FileStorage__journal = True
+        new = BaseModel()
+        storage.save()
+        with open('file.json.log', 'a') as f:
+            f.write('{"key": "BaseModel.12')
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage.reload()
+        self.assertEqual(list(storage.all().keys()), ['BaseModel.' + new.id])
+
+    def test_journal_compact(self):
+        """ Compaction folds the journal into the snapshot file """
+        storage._FileStorage__journal = True
+        new = BaseModel()
+        gone = BaseModel()
+        storage.save()
+        storage.delete(gone)
+        storage.compact(wait=True)
+        self.assertFalse(os.path.exists('file.json.log'))
+        self.assertFalse(os.path.exists('file.json.log.1'))
+        with open('file.json', 'r') as f:
+            self.assertEqual(list(json.load(f).keys()),
+                             ['BaseModel.' + new.id])
+
+    def test_journal_compact_threshold(self):
+        """ The journal is compacted once it passes its size limit """
+        storage._FileStorage__journal = True
+        storage._FileStorage__journal_max = 1
+        try:
+            new = BaseModel()
+            storage.save()
+            storage.compact(wait=True)
+        finally:
+            storage._FileStorage__journal_max = 1024 * 1024
+        self.assertTrue(os.path.exists('file.json'))
+        self.assertFalse(os.path.exists('file.json.log'))
+
+    def test_snapshot_save_drops_journal(self):
+        """ A full save supersedes any journal left on disk """
+        storage._FileStorage__journal = True
+        new = BaseModel()
+        storage.save()
+        storage._FileStorage__journal = False
+        storage._FileStorage__fsync = 'never'
+        storage._FileStorage__lazy = False
+        storage.save()
+        self.assertFalse(os.path.exists('file.json.log'))
+
+    def test_save_is_atomic(self):
+        """ A failed save leaves the previous file untouched """
+        new = BaseModel()
+        storage.save()
+        with open('file.json', 'r') as f:
+            before = f.read()
+        new.broken = {1, 2}
+        with self.assertRaises(TypeError):
+            storage.save()
+        with open('file.json', 'r') as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual([p for p in os.listdir('.') if p.endswith('.tmp')],
+                         [])
+
+    def test_fsync_always(self):
+        """ The always policy flushes every save """
+        storage._FileStorage__fsync = 'always'
+        new = BaseModel()
+        with mock.patch('os.fsync') as fsync:
+            storage.save()
+            storage.save()
+        self.assertGreaterEqual(fsync.call_count, 2)
+
+    def test_fsync_never(self):
+        """ The never policy leaves flushing to the OS """
+        new = BaseModel()
+        with mock.patch('os.fsync') as fsync:
+            storage.save()
+        self.assertEqual(fsync.call_count, 0)
+
+    def test_fsync_interval(self):
+        """ The interval policy defers flushes inside one interval """
+        storage._FileStorage__fsync = 'interval'
+        storage._FileStorage__fsync_ms = 60000
+        storage._FileStorage__synced_at = 0.0
+        new = BaseModel()
+        try:
+            with mock.patch('os.fsync') as fsync:
+                storage.save()
+                count = fsync.call_count
+                storage.save()
+                self.assertEqual(fsync.call_count, count)
+            timer = storage._FileStorage__sync_timer
+            self.assertIsNotNone(timer)
+        finally:
+            storage._FileStorage__fsync_ms = 1000
+            timer.cancel()
+            storage._FileStorage__sync_timer = None
+            storage._FileStorage__unsynced.clear()
+
+    def test_fsync_policy_invalid(self):
+        """ Unknown fsync policies are rejected """
+        from models.engine.file_storage import FileStorage
+        with mock.patch.dict(os.environ, {'HBNB_FILE_FSYNC': 'sometimes'}):
+            with self.assertRaises(ValueError):
+                FileStorage()
+
+    def test_attribute_write_marks_dirty(self):
+        """ Setting an attribute marks a stored object as changed """
+        new = BaseModel()
+        storage.save()
+        self.assertEqual(storage._FileStorage__dirty, set())
+        new.name = 'dirty'
+        self.assertEqual(storage._FileStorage__dirty,
+                         {'BaseModel.' + new.id})
+
+    def test_save_encodes_dirty_only(self):
+        """ Only objects changed since the last save are serialized """
+        objs = [BaseModel() for i in range(5)]
+        storage.save()
+        objs[2].name = 'changed'
+        with mock.patch.object(BaseModel, 'to_dict', autospec=True,
+                               side_effect=BaseModel.to_dict) as to_dict:
+            storage.save()
+        self.assertEqual(to_dict.call_count, 1)
+        with open('file.json', 'r') as f:
+            saved = json.load(f)
+        self.assertEqual(saved['BaseModel.' + objs[2].id]['name'],
+                         'changed')
+        self.assertEqual(len(saved), 5)
+
+    def test_save_clean_skips_write(self):
+        """ Saving with no changes does not rewrite the file """
+        new = BaseModel()
+        storage.save()
+        with mock.patch('os.replace') as replace:
+            storage.save()
+        self.assertEqual(replace.call_count, 0)
+
+    def test_save_changed_in_place(self):
+        """ Lists changed in place are saved, after a reload too """
+        from models.place import Place
+        place = Place()
+        place.amenity_ids = []
+        storage.save()
+        storage.get(Place, place.id).amenity_ids.append('x')
+        storage.save()
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage.reload()
+        self.assertEqual(storage.get(Place, place.id).amenity_ids, ['x'])
+        storage.get(Place, place.id).amenity_ids.append('y')
+        storage.save()
+        with open('file.json', 'r') as f:
+            self.assertEqual(json.load(f)['Place.' + place.id]
+                             ['amenity_ids'], ['x', 'y'])
+
+    def test_journal_changed_in_place(self):
+        """ Lists changed in place are appended to the journal """
+        from models.place import Place
+        storage._FileStorage__journal = True
+        place = Place()
+        place.amenity_ids = []
+        storage.save()
+        place.amenity_ids.append('x')
+        storage.save()
+        storage.save()
+        with open('file.json.log', 'r') as f:
+            self.assertEqual(len(f.readlines()), 2)
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage.reload()
+        self.assertEqual(storage.get(Place, place.id).amenity_ids, ['x'])
+
+    def test_save_after_delete(self):
+        """ Deleted objects are dropped from the saved file """
+        new = BaseModel()
+        gone = BaseModel()
+        storage.save()
+        storage.delete(gone)
+        with open('file.json', 'r') as f:
+            self.assertEqual(list(json.load(f).keys()),
+                             ['BaseModel.' + new.id])
+
+    def test_save_after_delete_stays_deleted(self):
+        """ save() on a deleted object does not store it again """
+        kept = BaseModel()
+        gone = BaseModel()
+        gone.save()
+        storage.delete(gone)
+        gone.save()
+        self.assertEqual(storage.count(), 1)
+        with open('file.json', 'r') as f:
+            self.assertEqual(list(json.load(f).keys()),
+                             ['BaseModel.' + kept.id])
+
+    def test_get(self):
+        """ get returns the object with the given class and id """
+        from models.state import State
+        new = State()
+        self.assertIs(storage.get(State, new.id), new)
+        self.assertIsNone(storage.get(State, 'missing'))
+        self.assertIsNone(storage.get(BaseModel, new.id))
+
+    def lazy_reload(self):
+        """ Saves two States and a City, then reloads them lazily """
+        from models.state import State
+        from models.city import City
+        objs = [State(), State(), City()]
+        storage.save()
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage._FileStorage__lazy = True
+        storage.reload()
+        return objs
+
+    def test_lazy_reload_builds_nothing(self):
+        """ A lazy reload keeps records without building instances """
+        from models.state import State
+        self.lazy_reload()
+        self.assertEqual(len(storage._FileStorage__objects), 0)
+        self.assertEqual(storage.count(), 3)
+        self.assertEqual(storage.count(State), 2)
+
+    def test_lazy_get(self):
+        """ get builds only the requested instance """
+        from models.state import State
+        objs = self.lazy_reload()
+        obj = storage.get(State, objs[0].id)
+        self.assertIsInstance(obj, State)
+        self.assertEqual(obj.to_dict(), objs[0].to_dict())
+        self.assertEqual(len(storage._FileStorage__objects), 1)
+        self.assertIs(storage.get(State, objs[0].id), obj)
+        self.assertEqual(storage.count(), 3)
+
+    def test_lazy_all_cls(self):
+        """ all(cls) builds the instances of that class only """
+        from models.state import State
+        objs = self.lazy_reload()
+        self.assertEqual(len(storage.all(State)), 2)
+        self.assertEqual(len(storage._FileStorage__objects), 2)
+        self.assertEqual(len(storage.all()), 3)
+
+    def test_lazy_console_all(self):
+        """ all State in the console builds the States only, and so do
+        the indexes it registers """
+        import io
+        from contextlib import redirect_stdout
+        from console import HBNBCommand
+        from models.city import City
+        from models.state import State
+        objs = self.lazy_reload()
+        with redirect_stdout(io.StringIO()) as out:
+            HBNBCommand().onecmd('all State')
+        self.assertIn(objs[0].id, out.getvalue())
+        self.assertEqual(len(storage._FileStorage__objects), 2)
+        self.assertEqual(storage.related(objs[:1], City), {objs[0].id: []})
+        self.assertEqual(len(storage._FileStorage__objects), 3)
+        self.assertEqual(len(storage._FileStorage__indexes), 2)
+        self.assertEqual(len(storage.page(limit=10)), 3)
+        self.assertEqual(len(storage._FileStorage__indexes), 3)
+
+    def test_lazy_save_keeps_records(self):
+        """ Saving writes out records that were never built """
+        from models.state import State
+        objs = self.lazy_reload()
+        obj = storage.get(State, objs[0].id)
+        obj.name = 'lazy'
+        obj.save()
+        with open('file.json', 'r') as f:
+            saved = json.load(f)
+        self.assertEqual(len(saved), 3)
+        self.assertEqual(saved['State.' + obj.id]['name'], 'lazy')
+
+    def test_lazy_delete(self):
+        """ Deleting a built object also forgets its record """
+        from models.state import State
+        objs = self.lazy_reload()
+        storage.delete(storage.get(State, objs[0].id))
+        self.assertEqual(storage.count(State), 1)
+        self.assertIsNone(storage.get(State, objs[0].id))
+
+    def test_save_one_record_per_line(self):
+        """ Saved files hold one record per line and stay valid JSON """
+        objs = [BaseModel() for i in range(3)]
+        storage.save()
+        with open('file.json', 'r') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], '{')
+        self.assertEqual(lines[-1], '}')
+        self.assertEqual(len(lines), 5)
+        with open('file.json', 'r') as f:
+            self.assertEqual(len(json.load(f)), 3)
+
+    def test_save_empty(self):
+        """ An empty storage is saved as an empty JSON object """
+        storage.save()
+        with open('file.json', 'r') as f:
+            self.assertEqual(json.load(f), {})
+        storage.reload()
+        self.assertEqual(len(storage.all()), 0)
+
+    def test_reload_single_document(self):
+        """ Files written as one JSON document are still loaded """
+        new = BaseModel()
+        for indent in [None, 4]:
+            with open('file.json', 'w') as f:
+                json.dump({'BaseModel.' + new.id: new.to_dict()}, f,
+                          indent=indent)
+            storage._FileStorage__objects.clear()
+            storage._FileStorage__classes.clear()
+            storage.reload()
+            self.assertEqual(storage.all()['BaseModel.' + new.id].to_dict(),
+                             new.to_dict())
+
+    def test_save_migrates_single_document(self):
+        """ save() rewrites a single-document file even with no changes """
+        new = BaseModel()
+        with open('file.json', 'w') as f:
+            json.dump({'BaseModel.' + new.id: new.to_dict()}, f)
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage._FileStorage__dirty.clear()
+        storage.reload()
+        storage.save()
+        with open('file.json', 'r') as f:
+            self.assertEqual(f.readline(), '{\n')
+
+    def test_reload_truncated(self):
+        """ A file cut before its closing brace is rejected """
+        new = BaseModel()
+        storage.save()
+        with open('file.json', 'r') as f:
+            text = f.read()
+        with open('file.json', 'w') as f:
+            f.write(text[:-2])
+        with self.assertRaises(ValueError):
+            storage.reload()
+
+    def test_reload_keeps_encoded_records(self):
+        """ Reloaded objects are not serialized again on save """
+        objs = [BaseModel() for i in range(3)]
+        storage.save()
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage._FileStorage__fragments.clear()
+        storage.reload()
+        storage.all()['BaseModel.' + objs[0].id].name = 'changed'
+        with mock.patch.object(BaseModel, 'to_dict', autospec=True,
+                               side_effect=BaseModel.to_dict) as to_dict:
+            storage.save()
+        self.assertEqual(to_dict.call_count, 1)
+
+    def reload_fresh(self):
+        """ Forgets the stored objects and reloads them from file """
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage._FileStorage__fragments.clear()
+        storage._FileStorage__dirty.clear()
+        storage._FileStorage__raw.clear()
+        storage.reload()
+
+    def test_binary_round_trip(self):
+        """ Binary serializers save and reload every object """
+        from models.state import State
+        for name in ['pickle', 'marshal']:
+            storage.convert(name)
+            objs = [BaseModel(), State()]
+            objs[1].name = 'California'
+            storage.save()
+            with open('file.json', 'rb') as f:
+                self.assertEqual(f.readline(), b'HBNB ' + name.encode() +
+                                 b'\n')
+            self.reload_fresh()
+            for obj in objs:
+                key = type(obj).__name__ + '.' + obj.id
+                self.assertEqual(storage.all()[key].to_dict(),
+                                 obj.to_dict())
+
+    def test_binary_keeps_encoded_records(self):
+        """ Reloaded binary records are not serialized again on save """
+        storage._FileStorage__serializer = serializers.get('pickle')
+        objs = [BaseModel() for i in range(3)]
+        storage.save()
+        self.reload_fresh()
+        storage.all()['BaseModel.' + objs[0].id].name = 'changed'
+        with mock.patch.object(BaseModel, 'to_dict', autospec=True,
+                               side_effect=BaseModel.to_dict) as to_dict:
+            storage.save()
+        self.assertEqual(to_dict.call_count, 1)
+        self.reload_fresh()
+        self.assertEqual(storage.all()['BaseModel.' + objs[0].id].name,
+                         'changed')
+
+    def test_reload_detects_format(self):
+        """ A file in another format is loaded, then rewritten on save """
+        storage._FileStorage__serializer = serializers.get('marshal')
+        new = BaseModel()
+        storage.save()
+        storage._FileStorage__serializer = serializers.get('json')
+        self.reload_fresh()
+        self.assertEqual(storage.all()['BaseModel.' + new.id].to_dict(),
+                         new.to_dict())
+        storage.save()
+        with open('file.json', 'r') as f:
+            self.assertIn('BaseModel.' + new.id, json.load(f))
+
+    def test_convert(self):
+        """ convert() rewrites the file and is kept for later saves """
+        new = BaseModel()
+        storage.save()
+        storage.convert('pickle')
+        with open('file.json', 'rb') as f:
+            self.assertTrue(f.read().startswith(b'HBNB pickle\n'))
+        other = BaseModel()
+        other.save()
+        self.reload_fresh()
+        self.assertEqual(storage.count(), 2)
+        storage.convert('json')
+        with open('file.json', 'r') as f:
+            self.assertEqual(len(json.load(f)), 2)
+
+    def test_convert_lazy(self):
+        """ Records never built are converted too """
+        storage._FileStorage__serializer = serializers.get('pickle')
+        objs = [BaseModel() for i in range(3)]
+        storage.save()
+        storage._FileStorage__lazy = True
+        self.reload_fresh()
+        storage.convert('marshal')
+        storage._FileStorage__lazy = False
+        self.reload_fresh()
+        self.assertEqual(storage.count(), 3)
+        for obj in objs:
+            self.assertEqual(storage.get(BaseModel, obj.id).to_dict(),
+                             obj.to_dict())
+
+    def test_convert_unknown(self):
+        """ Unknown serializers are rejected """
+        with self.assertRaises(ValueError):
+            storage.convert('yaml')
+        with mock.patch.dict(os.environ, {'HBNB_FILE_SERIALIZER': 'yaml'}):
+            from models.engine.file_storage import FileStorage
+            with self.assertRaises(ValueError):
+                FileStorage()
+
+    def test_binary_truncated(self):
+        """ A binary file cut in the middle of a record is rejected """
+        storage._FileStorage__serializer = serializers.get('marshal')
+        new = BaseModel()
+        storage.save()
+        with open('file.json', 'rb') as f:
+            data = f.read()
+        with open('file.json', 'wb') as f:
+            f.write(data[:-5])
+        with self.assertRaises(ValueError):
+            storage.reload()
+
+    def test_batch_saves_once(self):
+        """ Saves inside a batch are left to its end """
+        from models.engine.file_storage import FileStorage
+        with mock.patch.object(FileStorage, '_FileStorage__write',
+                               autospec=True) as write:
+            with storage.batch():
+                objs = [BaseModel() for i in range(5)]
+                for obj in objs:
+                    obj.save()
+                storage.delete(objs[0])
+                self.assertEqual(write.call_count, 0)
+            self.assertEqual(write.call_count, 1)
+
+    def test_batch_writes_changes(self):
+        """ The changes of a batch are on file once it exits """
+        with storage.batch():
+            objs = [BaseModel() for i in range(3)]
+            for obj in objs:
+                obj.save()
+            self.assertFalse(os.path.exists('file.json'))
+        with open('file.json', 'r') as f:
+            self.assertEqual(len(json.load(f)), 3)
+
+    def test_batch_rollback(self):
+        """ A batch that raises puts back the objects it changed """
+        from models.state import State
+        kept = State()
+        kept.name = 'Nevada'
+        gone = State()
+        storage.save()
+        with self.assertRaises(RuntimeError):
+            with storage.batch():
+                storage.get(State, kept.id).name = 'Ohio'
+                storage.delete(gone)
+                added = State()
+                added.save()
+                raise RuntimeError
+        self.assertEqual(storage.get(State, kept.id).name, 'Nevada')
+        self.assertIsNotNone(storage.get(State, gone.id))
+        self.assertIsNone(storage.get(State, added.id))
+        self.assertEqual(storage.count(State), 2)
+        with open('file.json', 'r') as f:
+            self.assertNotIn('State.' + added.id, json.load(f))
+
+    def test_batch_rollback_keeps_unsaved(self):
+        """ Changes made before the batch stay pending after a rollback """
+        from models.state import State
+        new = State()
+        new.name = 'Utah'
+        with self.assertRaises(KeyError):
+            with storage.batch():
+                new.name = 'Idaho'
+                raise KeyError
+        self.assertEqual(storage.get(State, new.id).name, 'Utah')
+        storage.save()
+        with open('file.json', 'r') as f:
+            self.assertEqual(json.load(f)['State.' + new.id]['name'], 'Utah')
+
+    def test_batch_nested(self):
+        """ An inner batch that raises only undoes its own changes """
+        from models.state import State
+        with storage.batch():
+            outer = State()
+            try:
+                with storage.batch():
+                    inner = State()
+                    outer.name = 'inner'
+                    raise ValueError
+            except ValueError:
+                pass
+            self.assertIsNone(storage.get(State, inner.id))
+            self.assertEqual(storage.get(State, outer.id).name, '')
+        with open('file.json', 'r') as f:
+            self.assertEqual(list(json.load(f)), ['State.' + outer.id])
+
+    def test_batch_rollback_indexes(self):
+        """ Indexes follow the objects put back by a rollback """
+        from models.engine.geo_index import PlaceGeoIndex
+        from models.place import Place
+        index = PlaceGeoIndex()
+        storage.register(index)
+        with self.assertRaises(RuntimeError):
+            with storage.batch():
+                place = Place()
+                place.latitude = 10.0
+                place.longitude = 10.0
+                raise RuntimeError
+        self.assertEqual(len(index), 0)
+
+    def test_bulk_insert(self):
+        """ bulk_insert stores one object per row and saves once """
+        from models.engine.file_storage import FileStorage
+        from models.state import State
+        rows = [{'name': 'State {}'.format(i)} for i in range(5)]
+        rows.append({'id': 'known', 'name': 'Known'})
+        with mock.patch.object(FileStorage, '_FileStorage__write',
+                               autospec=True) as write:
+            self.assertEqual(storage.bulk_insert(State, rows), 6)
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(storage.count(State), 6)
+        self.assertEqual(storage.get(State, 'known').name, 'Known')
+
+    def test_bulk_insert_chunks(self):
+        """ With a batch size, every chunk is saved on its own """
+        from models.engine.file_storage import FileStorage
+        from models.state import State
+        rows = ({'name': str(i)} for i in range(5))
+        with mock.patch.object(FileStorage, '_FileStorage__write',
+                               autospec=True) as write:
+            self.assertEqual(storage.bulk_insert(State, rows, 2), 5)
+        self.assertEqual(write.call_count, 3)
+
+    def test_bulk_insert_bad_row(self):
+        """ A row of another class rolls back its chunk """
+        from models.state import State
+        rows = [{'name': 'a'}, {'name': 'b'}, {'__class__': 'City'}]
+        with self.assertRaises(ValueError):
+            storage.bulk_insert(State, rows)
+        self.assertEqual(storage.count(State), 0)
+        with self.assertRaises(ValueError):
+            storage.bulk_insert(State, rows, 2)
+        self.assertEqual(storage.count(State), 2)
+
+    def test_bulk_read(self):
+        """ Rows are read from JSON arrays and from JSON Lines """
+        import tempfile
+        from models.engine import bulk
+        rows = [{'name': 'a'}, {'name': 'b'}]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'rows.json')
+            with open(path, 'w') as f:
+                json.dump(rows, f, indent=4)
+            self.assertEqual(list(bulk.read(path)), rows)
+            with open(path, 'w') as f:
+                f.write('\n'.join(json.dumps(row) for row in rows) + '\n\n')
+            self.assertEqual(list(bulk.read(path)), rows)
+
     def test_storage_var_created(self):
         """ FileStorage object storage created """
         from models.engine.file_storage import FileStorage
         print(type(storage))
         self.assertEqual(type(storage), FileStorage)
+
+
+class test_concurrency(unittest.TestCase):
+    """ Class to test FileStorage under concurrent threads and processes """
+
+    workers = """
+import sys
+import threading
+from models import storage
+from models.state import State
+
+
+def work():
+    for i in range({}):
+        State().save()
+
+
+threads = [threading.Thread(target=work) for i in range({})]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+"""
+
+    def setUp(self):
+        """ Empties the storage """
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage._FileStorage__dirty.clear()
+        storage._FileStorage__fragments.clear()
+
+    def tearDown(self):
+        """ Removes the storage files """
+        for path in ['file.json', 'file.json.lock']:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def spawn(self, script, cwd):
+        """ Starts a child process running script in cwd """
+        import subprocess
+        import sys
+        import models
+        root = os.path.dirname(os.path.dirname(models.__file__))
+        env = dict(os.environ, PYTHONPATH=root)
+        return subprocess.Popen([sys.executable, '-c', script], cwd=cwd,
+                                env=env)
+
+    def test_threads(self):
+        """ Threads creating and saving objects lose none of them """
+        import threading
+        from models.state import State
+        errors = []
+
+        def create():
+            for i in range(25):
+                State().save()
+
+        def read():
+            while any(thread.is_alive() for thread in writers):
+                try:
+                    for obj in storage.all(State).values():
+                        str(obj)
+                    storage.count(State)
+                except Exception as e:
+                    errors.append(e)
+                    return
+
+        writers = [threading.Thread(target=create) for i in range(8)]
+        reader = threading.Thread(target=read)
+        for thread in writers:
+            thread.start()
+        reader.start()
+        for thread in writers + [reader]:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(storage.count(State), 200)
+        with open('file.json', 'r') as f:
+            self.assertEqual(len(json.load(f)), 200)
+
+    def test_threads_touch(self):
+        """ Attributes set by a thread while another saves are all saved,
+        in both the snapshot and the journal modes """
+        import threading
+        from models.state import State
+        for journal in [False, True]:
+            storage._FileStorage__journal = journal
+            states = [State() for i in range(300)]
+            storage.save()
+            errors = []
+
+            def change():
+                for i in range(20):
+                    for state in states:
+                        state.name = str(i)
+
+            def save():
+                while changer.is_alive():
+                    try:
+                        storage.save()
+                    except Exception as e:
+                        errors.append(e)
+                        return
+
+            changer = threading.Thread(target=change)
+            saver = threading.Thread(target=save)
+            changer.start()
+            saver.start()
+            changer.join()
+            saver.join()
+            storage.save()
+            self.assertEqual(errors, [])
+            storage._FileStorage__objects.clear()
+            storage._FileStorage__classes.clear()
+            storage.reload()
+            self.assertEqual([state.name for state in storage.all(State)
+                              .values()], ['19'] * 300)
+            storage._FileStorage__journal = False
+            for path in ['file.json', 'file.json.log']:
+                if os.path.exists(path):
+                    os.remove(path)
+            storage._FileStorage__objects.clear()
+            storage._FileStorage__classes.clear()
+            storage._FileStorage__dirty.clear()
+            storage._FileStorage__fragments.clear()
+
+    def test_processes(self):
+        """ Processes saving to one file all keep each other's objects """
+        import tempfile
+        with tempfile.TemporaryDirectory() as cwd:
+            script = self.workers.format(20, 2)
+            children = [self.spawn(script, cwd) for i in range(4)]
+            for child in children:
+                self.assertEqual(child.wait(), 0)
+            with open(os.path.join(cwd, 'file.json'), 'r') as f:
+                self.assertEqual(len(json.load(f)), 160)
+
+    def test_refresh(self):
+        """ refresh() picks up objects saved and deleted elsewhere """
+        import tempfile
+        from models.engine.file_storage import FileStorage
+        from models.state import State
+        with tempfile.TemporaryDirectory() as cwd:
+            path = FileStorage._FileStorage__file_path
+            FileStorage._FileStorage__file_path = os.path.join(cwd,
+                                                               'file.json')
+            try:
+                mine = State()
+                mine.save()
+                child = self.spawn(self.workers.format(3, 1), cwd)
+                self.assertEqual(child.wait(), 0)
+                storage.refresh()
+                self.assertEqual(storage.count(State), 4)
+                with open(os.path.join(cwd, 'file.json'), 'w') as f:
+                    f.write('{\n}\n')
+                storage.refresh()
+                self.assertEqual(storage.count(State), 0)
+            finally:
+                FileStorage._FileStorage__file_path = path
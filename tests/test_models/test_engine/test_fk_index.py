@@ -0,0 +1,146 @@
+#!/usr/bin/python3
+""" Module for testing the foreign key index and the model accessors """
+import unittest
+from unittest import mock
+from models.engine.file_storage import FileStorage
+from models.engine.fk_index import ForeignKeyIndex
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models import storage
+import os
+
+
+class test_fkIndex(unittest.TestCase):
+    """ Class to test ForeignKeyIndex and storage.related() """
+
+    def setUp(self):
+        """ Stores two States with Cities, Places and Reviews """
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage._FileStorage__indexes.clear()
+        self.states = [State(), State()]
+        self.cities = {}
+        for state in self.states:
+            for i in range(2):
+                city = City()
+                city.state_id = state.id
+                place = Place()
+                place.city_id = city.id
+                review = Review()
+                review.place_id = place.id
+                self.cities[city.id] = city
+
+    def tearDown(self):
+        """ Detaches indexes and removes the storage file """
+        storage._FileStorage__indexes.clear()
+        for path in ['file.json', 'file.json.lock']:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def test_accessors(self):
+        """ Every accessor returns the linked objects """
+        state = self.states[0]
+        self.assertEqual(len(state.cities), 2)
+        for city in state.cities:
+            self.assertEqual(city.state_id, state.id)
+            place, = city.places
+            review, = place.reviews
+            self.assertEqual(review.place_id, place.id)
+
+    def test_amenities(self):
+        """ Place.amenities follows amenity_ids """
+        amenity = Amenity()
+        place = Place()
+        self.assertEqual(place.amenities, [])
+        place.amenity_ids = [amenity.id, 'missing']
+        self.assertEqual(place.amenities, [amenity])
+
+    def test_update_and_delete(self):
+        """ Changing or deleting a child updates its parent """
+        first, second = self.states
+        city = first.cities[0]
+        city.state_id = second.id
+        self.assertEqual(len(first.cities), 1)
+        self.assertIn(city, second.cities)
+        storage.delete(city)
+        self.assertEqual(len(second.cities), 2)
+
+    def test_related_without_scan(self):
+        """ related() finds the children of many parents without all() """
+        storage.related(self.states, City)
+        storage.related(self.cities.values(), Place)
+        with mock.patch.object(FileStorage, 'all',
+                               side_effect=AssertionError) as scan:
+            cities = storage.related(self.states, City)
+            places = storage.related(self.cities.values(), Place)
+        self.assertEqual(scan.call_count, 0)
+        self.assertEqual(sum(len(objs) for objs in cities.values()), 4)
+        self.assertEqual(set(places), set(self.cities))
+
+    def test_children(self):
+        """ children() lists the objects pointing at a parent """
+        state = self.states[1]
+        self.assertEqual(storage.children(state, City), state.cities)
+        from models.user import User
+        user = User()
+        place = Place()
+        place.user_id = user.id
+        review = Review()
+        review.user_id = user.id
+        self.assertEqual(storage.children(user, Place), [place])
+        self.assertEqual(storage.children(user, Review), [review])
+
+    def test_console(self):
+        """ Console update and destroy move and drop children """
+        import io
+        from contextlib import redirect_stdout
+        from console import HBNBCommand
+        first, second = self.states
+        city = first.cities[0]
+        with redirect_stdout(io.StringIO()):
+            HBNBCommand().onecmd('update City {} state_id "{}"'.format(
+                city.id, second.id))
+            self.assertEqual(len(storage.children(second, City)), 3)
+            HBNBCommand().onecmd('destroy City {}'.format(city.id))
+        self.assertEqual(len(storage.children(first, City)), 1)
+        self.assertEqual(len(storage.children(second, City)), 2)
+
+    def test_reload(self):
+        """ Children changed in the file are moved by reload() """
+        import json
+        first, second = self.states
+        city = first.cities[0]
+        storage.save()
+        with open('file.json') as f:
+            objs = json.load(f)
+        objs['City.' + city.id]['state_id'] = second.id
+        with open('file.json', 'w') as f:
+            json.dump(objs, f)
+        storage.reload()
+        self.assertEqual(len(storage.children(first, City)), 1)
+        moved, = [obj for obj in storage.children(second, City)
+                  if obj.id == city.id]
+        self.assertIsNot(moved, city)
+
+    def test_not_linked(self):
+        """ Classes without a link raise ValueError """
+        with self.assertRaises(ValueError):
+            storage.related(self.states, Review)
+
+    def test_index(self):
+        """ Objects without foreign keys are left out of the index """
+        index = ForeignKeyIndex()
+        index.add(self.states[0])
+        self.assertEqual(len(index), 0)
+        city = self.states[0].cities[0]
+        index.add(city)
+        index.add(city)
+        self.assertEqual(index.children('City', 'state_id',
+                                        self.states[0].id), [city.id])
+        index.remove(city)
+        self.assertEqual(len(index), 0)
@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+""" Module for testing the Place grid index """
+import unittest
+from models.engine.geo_index import PlaceGeoIndex, distance
+from models.place import Place
+from models import storage
+import os
+
+
+class test_geoIndex(unittest.TestCase):
+    """ Class to test PlaceGeoIndex and the storage queries using it """
+
+    points = {
+              'paris': (48.8566, 2.3522), 'versailles': (48.8049, 2.1204),
+              'london': (51.5074, -0.1278), 'fiji': (-17.7134, 178.0650),
+              'samoa': (-13.7590, -172.1046)
+             }
+
+    def setUp(self):
+        """ Stores one Place per point """
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage._FileStorage__indexes.clear()
+        self.places = {}
+        for name, (lat, lon) in self.points.items():
+            place = Place()
+            place.name = name
+            place.latitude = lat
+            place.longitude = lon
+            self.places[name] = place
+
+    def tearDown(self):
+        """ Detaches indexes and removes the storage file """
+        storage._FileStorage__indexes.clear()
+        for path in ['file.json', 'file.json.lock']:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def names(self, places):
+        """ Returns the names of places """
+        return [place.name for place in places]
+
+    def test_distance(self):
+        """ Great-circle distances are in km """
+        self.assertAlmostEqual(distance(*self.points['paris'],
+                                        *self.points['london']), 343.6,
+                               delta=1)
+
+    def test_nearby(self):
+        """ nearby returns Places in range, nearest first """
+        self.assertEqual(self.names(storage.nearby(48.85, 2.35, 30)),
+                         ['paris', 'versailles'])
+        self.assertEqual(self.names(storage.nearby(48.85, 2.35, 400)),
+                         ['paris', 'versailles', 'london'])
+
+    def test_within(self):
+        """ within returns Places inside the box """
+        self.assertEqual(sorted(self.names(storage.within(45, -1, 52, 3))),
+                         ['london', 'paris', 'versailles'])
+
+    def test_within_antimeridian(self):
+        """ Boxes with west > east cross the antimeridian """
+        self.assertEqual(
+            sorted(self.names(storage.within(-20, 170, -10, -170))),
+            ['fiji', 'samoa'])
+
+    def test_nearby_antimeridian(self):
+        """ Radius queries wrap around the antimeridian """
+        self.assertEqual(self.names(storage.nearby(-15.5, 179.9, 900)),
+                         ['fiji', 'samoa'])
+
+    def test_update_moves_place(self):
+        """ Changing coordinates moves a Place in the index """
+        self.places['london'].latitude = 48.9
+        self.places['london'].longitude = 2.3
+        self.assertIn('london', self.names(storage.nearby(48.85, 2.35, 10)))
+
+    def test_delete_removes_place(self):
+        """ Deleted Places are no longer found """
+        storage.nearby(0, 0, 1)
+        storage.delete(self.places['versailles'])
+        self.assertEqual(self.names(storage.nearby(48.85, 2.35, 30)),
+                         ['paris'])
+
+    def test_invalid_coordinates(self):
+        """ Places without valid coordinates are left out """
+        index = PlaceGeoIndex()
+        storage.register(index)
+        self.places['paris'].latitude = 'north'
+        self.places['london'].latitude = 95.0
+        self.assertEqual(len(index), 3)
+
+    def test_one_index_per_storage(self):
+        """ Queries reuse the same registered index """
+        storage.nearby(0, 0, 1)
+        storage.within(0, 0, 1, 1)
+        self.assertEqual(len(storage._FileStorage__indexes), 1)
+
+    def test_threads(self):
+        """ Queries run safely while another thread moves Places """
+        import sys
+        import threading
+        places = []
+        for i in range(2000):
+            place = Place()
+            place.latitude = 40 + i / 100
+            place.longitude = 2.0
+            places.append(place)
+        errors = []
+        storage.nearby(48.85, 2.35, 30)
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+
+        def move():
+            for i in range(20):
+                for place in places:
+                    place.latitude = -place.latitude
+
+        def query():
+            while mover.is_alive():
+                try:
+                    storage.nearby(48.85, 2.35, 300)
+                    storage.within(-90, 0, 90, 5)
+                except Exception as e:
+                    errors.append(e)
+                    return
+
+        mover = threading.Thread(target=move)
+        reader = threading.Thread(target=query)
+        mover.start()
+        reader.start()
+        mover.join()
+        reader.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(storage.within(-90, 0, 90, 5)), 2002)
@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+""" Module for testing the id index and the paging built on it """
+import unittest
+from models.engine.id_index import IdIndex
+from models.base_model import BaseModel
+from models.city import City
+from models.state import State
+from models import storage
+import os
+
+
+class test_idIndex(unittest.TestCase):
+    """ Class to test IdIndex and storage.page() and iterate() """
+
+    def setUp(self):
+        """ Stores States and Cities with known ids """
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage._FileStorage__indexes.clear()
+        for id in ['s3', 's1', 's5']:
+            self.make(State, id)
+        for id in ['c4', 'c2']:
+            self.make(City, id)
+        storage.save()
+
+    def tearDown(self):
+        """ Detaches indexes and removes the storage file """
+        storage._FileStorage__indexes.clear()
+        for path in ['file.json', 'file.json.lock']:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def make(cls, id):
+        """ Stores an instance of cls with the given id """
+        date = '2017-06-14T22:31:03.285259'
+        storage.new(cls(__class__=cls.__name__, id=id, created_at=date,
+                        updated_at=date))
+
+    @staticmethod
+    def ids(objs):
+        """ Returns the ids of objs """
+        return [obj.id for obj in objs]
+
+    def test_page_keyset(self):
+        """ Pages come in id order and resume after the given id """
+        self.assertEqual(self.ids(storage.page(State, 2)), ['s1', 's3'])
+        self.assertEqual(self.ids(storage.page(State, 2, 's3')), ['s5'])
+        self.assertEqual(self.ids(storage.page(limit=3, after='c2')),
+                         ['c4', 's1', 's3'])
+        self.assertEqual(storage.page(City, 5, 'c4'), [])
+
+    def test_page_follows_changes(self):
+        """ New and deleted objects show in the next page """
+        storage.page(State)
+        storage.delete(storage.get(State, 's3'))
+        self.make(State, 's2')
+        self.assertEqual(self.ids(storage.page(State)), ['s1', 's2', 's5'])
+
+    def test_iterate(self):
+        """ iterate() yields every object once, in id order """
+        self.assertEqual(self.ids(storage.iterate(batch_size=2)),
+                         ['c2', 'c4', 's1', 's3', 's5'])
+        self.assertEqual(self.ids(storage.iterate(State, 3)),
+                         ['s1', 's3', 's5'])
+        self.assertEqual(len(list(storage.iterate(BaseModel))), 5)
+
+    def test_index_readd(self):
+        """ An id removed then added again is listed once """
+        index = IdIndex()
+        state = storage.get(State, 's1')
+        index.add(state)
+        index.page(['State'], 10)
+        index.remove(state)
+        index.add(state)
+        index.add(state)
+        self.assertEqual(index.page(['State'], 10), [('State', 's1')])
+        self.assertEqual(len(index), 1)
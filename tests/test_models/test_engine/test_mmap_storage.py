@@ -0,0 +1,319 @@
+#!/usr/bin/python3
+""" Module for testing the memory-mapped storage engine """
+import unittest
+from unittest import mock
+import os
+import models
+from models.base_model import BaseModel
+from models.engine.mmap_storage import MMapStorage
+from models.place import Place
+from models.state import State
+
+
+class test_mmapStorage(unittest.TestCase):
+    """ Class to test MMapStorage """
+
+    def setUp(self):
+        """ Makes a fresh MMapStorage the storage of the models """
+        self.remove()
+        self.storage = MMapStorage()
+        self.storage._MMapStorage__indexes.clear()
+        self.storage.reload()
+        patcher = mock.patch.object(models, 'storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """ Unmaps and removes the storage file """
+        self.storage.close()
+        self.storage._MMapStorage__indexes.clear()
+        self.remove()
+
+    @staticmethod
+    def remove():
+        """ Removes the storage file """
+        for path in ['file.db', 'file.db.lock']:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def reopen(self):
+        """ Replaces the storage by one reading the file anew """
+        self.storage.close()
+        self.storage = MMapStorage()
+        self.storage.reload()
+        return self.storage
+
+    def test_new_is_held_until_save(self):
+        """ New objects are visible before being written """
+        new = State()
+        self.assertIs(self.storage.get(State, new.id), new)
+        self.assertEqual(self.storage.count(State), 1)
+        self.assertEqual(self.reopen().count(), 0)
+
+    def test_save_and_reload(self):
+        """ Saved objects are read back from the file """
+        objs = [BaseModel(), State()]
+        objs[1].name = 'California'
+        self.storage.save()
+        storage = self.reopen()
+        self.assertEqual(storage.count(), 2)
+        for obj in objs:
+            self.assertEqual(storage.get(type(obj), obj.id).to_dict(),
+                             obj.to_dict())
+        self.assertEqual(set(storage.all(State)), {'State.' + objs[1].id})
+
+    def test_get_reads_one_record(self):
+        """ get builds only the requested record """
+        objs = [State() for i in range(3)]
+        self.storage.save()
+        storage = self.reopen()
+        with mock.patch.object(State, '__init__', autospec=True,
+                               side_effect=State.__init__) as init:
+            obj = storage.get(State, objs[1].id)
+        self.assertEqual(init.call_count, 1)
+        self.assertEqual(obj.id, objs[1].id)
+        self.assertIsNone(storage.get(State, 'missing'))
+
+    def test_update_appends(self):
+        """ Changing an object appends its new version """
+        new = State()
+        new.name = 'old'
+        self.storage.save()
+        size = os.path.getsize('file.db')
+        obj = self.storage.get(State, new.id)
+        obj.name = 'new'
+        self.storage.save()
+        self.assertGreater(os.path.getsize('file.db'), size)
+        self.assertEqual(self.reopen().get(State, new.id).name, 'new')
+        self.assertEqual(self.storage.count(), 1)
+
+    def test_save_after_other_writer(self):
+        """ Frames are placed at the end of the file as it is when saving,
+        not where this storage last saw it """
+        first = State()
+        self.storage.save()
+        now = '2017-09-28T21:03:54.052298'
+        other = State(id='other', created_at=now, updated_at=now,
+                      __class__='State')
+        serializer = self.storage._MMapStorage__serializer
+        with open('file.db', 'ab') as f:
+            f.write(serializer.frame('State.' + other.id, other.to_dict()))
+        mine = State()
+        mine.name = 'mine'
+        first.name = 'changed'
+        self.storage.save()
+        self.assertEqual(self.storage.get(State, mine.id).name, 'mine')
+        self.assertEqual(self.storage.get(State, first.id).name, 'changed')
+        storage = self.reopen()
+        self.assertEqual(storage.count(State), 3)
+        self.assertEqual(storage.get(State, mine.id).name, 'mine')
+
+    def test_delete(self):
+        """ Deletions are written as tombstones """
+        objs = [State() for i in range(2)]
+        self.storage.save()
+        self.storage.delete(self.storage.get(State, objs[0].id))
+        self.assertIsNone(self.storage.get(State, objs[0].id))
+        self.storage.save()
+        storage = self.reopen()
+        self.assertIsNone(storage.get(State, objs[0].id))
+        self.assertEqual(storage.count(), 1)
+
+    def test_compact(self):
+        """ Compacting keeps only the latest version of each object """
+        new = State()
+        for i in range(5):
+            new.name = str(i)
+            self.storage.save()
+        other = State()
+        self.storage.save()
+        self.storage.delete(other)
+        size = os.path.getsize('file.db')
+        self.storage.compact()
+        self.assertLess(os.path.getsize('file.db'), size)
+        storage = self.reopen()
+        self.assertEqual(storage.count(), 1)
+        self.assertEqual(storage.get(State, new.id).name, '4')
+
+    def test_torn_frame(self):
+        """ A frame cut by a crash is dropped from the end of the file """
+        new = State()
+        self.storage.save()
+        size = os.path.getsize('file.db')
+        with open('file.db', 'ab') as f:
+            f.write(b'\x10\x00\x00\x00\x40')
+        storage = self.reopen()
+        self.assertEqual(os.path.getsize('file.db'), size)
+        self.assertEqual(storage.count(), 1)
+        other = State()
+        storage.save()
+        self.assertEqual(self.reopen().count(), 2)
+
+    def test_convert(self):
+        """ convert rewrites the records with another serializer """
+        new = State()
+        new.name = 'Texas'
+        self.storage.save()
+        self.storage.convert('marshal')
+        with open('file.db', 'rb') as f:
+            self.assertEqual(f.readline(), b'HBNB marshal\n')
+        self.assertEqual(self.reopen().get(State, new.id).name, 'Texas')
+
+    def test_not_a_record_file(self):
+        """ Files without the header are rejected """
+        self.storage.close()
+        with open('file.db', 'w') as f:
+            f.write('{}')
+        with self.assertRaises(ValueError):
+            MMapStorage().reload()
+
+    def test_nearby(self):
+        """ Geo queries work on the mapped records """
+        place = Place()
+        place.latitude = 48.8566
+        place.longitude = 2.3522
+        self.storage.save()
+        storage = self.reopen()
+        found = storage.nearby(48.85, 2.35, 5)
+        self.assertEqual([obj.id for obj in found], [place.id])
+
+    def test_batch_saves_once(self):
+        """ Saves inside a batch are left to its end """
+        remap = MMapStorage._MMapStorage__remap
+        with mock.patch.object(MMapStorage, '_MMapStorage__remap',
+                               autospec=True, side_effect=remap) as writes:
+            with self.storage.batch():
+                for i in range(3):
+                    State().save()
+                self.assertEqual(writes.call_count, 0)
+        self.assertEqual(writes.call_count, 1)
+        self.assertEqual(self.reopen().count(State), 3)
+
+    def test_batch_rollback(self):
+        """ A batch that raises puts back what it changed """
+        kept = State()
+        kept.name = 'Nevada'
+        gone = State()
+        pending = State()
+        self.storage.save()
+        pending.name = 'unsaved'
+        with self.assertRaises(RuntimeError):
+            with self.storage.batch():
+                self.storage.get(State, kept.id).name = 'Ohio'
+                pending.name = 'changed'
+                self.storage.delete(self.storage.get(State, gone.id))
+                added = State()
+                raise RuntimeError
+        self.assertEqual(self.storage.get(State, kept.id).name, 'Nevada')
+        self.assertEqual(self.storage.get(State, pending.id).name,
+                         'unsaved')
+        self.assertIsNotNone(self.storage.get(State, gone.id))
+        self.assertIsNone(self.storage.get(State, added.id))
+        self.storage.save()
+        storage = self.reopen()
+        self.assertEqual(storage.count(), 3)
+        self.assertEqual(storage.get(State, pending.id).name, 'unsaved')
+
+    def test_page_and_iterate(self):
+        """ Saved and pending objects are paged in id order """
+        ids = sorted(State().id for i in range(4))
+        self.storage.save()
+        last = State(__class__='State', id='~last',
+                     created_at='2017-06-14T22:31:03.285259',
+                     updated_at='2017-06-14T22:31:03.285259')
+        self.storage.new(last)
+        ids.append(last.id)
+        pages = [self.storage.page(State, 3)]
+        pages.append(self.storage.page(State, 3, pages[0][-1].id))
+        self.assertEqual([obj.id for page in pages for obj in page], ids)
+        self.assertEqual([obj.id for obj in self.storage.iterate(State, 2)],
+                         ids)
+
+    def test_page_reads_its_class(self):
+        """ Paging and related() only decode the records of their class,
+        once to feed their index and once for the result """
+        from models.city import City
+        state = State()
+        City().state_id = state.id
+        for i in range(5):
+            BaseModel()
+        self.storage.save()
+        storage = self.reopen()
+        record = storage._MMapStorage__record
+        with mock.patch.object(storage, '_MMapStorage__record',
+                               side_effect=record) as read:
+            storage.page(State)
+            storage.related([state], City)
+        self.assertEqual(read.call_count, 4)
+
+    def test_children(self):
+        """ Children are found again after the file is reopened """
+        from models.city import City
+        state = State()
+        city = City()
+        city.state_id = state.id
+        self.storage.save()
+        self.assertEqual([obj.id for obj in
+                          self.storage.children(state, City)], [city.id])
+        storage = self.reopen()
+        found, = storage.children(state, City)
+        self.assertEqual(found.id, city.id)
+        storage.delete(found)
+        self.assertEqual(storage.children(state, City), [])
+
+    def test_query(self):
+        """ Queries match held objects and saved records alike """
+        for name in ['Ohio', 'Iowa', 'Utah']:
+            State().name = name
+        self.storage.save()
+        State().name = 'Idaho'
+        query = self.storage.query(State).where(name__lt='P')
+        self.assertEqual(query.order_by('name').only('name').all(),
+                         [{'name': 'Idaho'}, {'name': 'Iowa'},
+                          {'name': 'Ohio'}])
+        self.assertEqual(query.order_by('-name').first().name, 'Ohio')
+
+    def test_search(self):
+        """ Saved Places are found by the words of their description """
+        place = Place()
+        place.description = 'Quiet loft near the beach'
+        Place().description = 'Mountain cabin'
+        self.storage.save()
+        storage = self.reopen()
+        found, = storage.search('beach')
+        self.assertEqual(found.id, place.id)
+        storage.delete(found)
+        self.assertEqual(storage.search('beach'), [])
+
+    def test_totals(self):
+        """ Saved Places are counted after the file is reopened """
+        from models.city import City
+        city = City()
+        for price in [100, 300]:
+            place = Place()
+            place.city_id = city.id
+            place.price_by_night = price
+        self.storage.save()
+        storage = self.reopen()
+        self.assertEqual(storage.totals(city),
+                         {'places': 2, 'average_price': 200})
+        storage.delete(storage.get(Place, place.id))
+        self.assertEqual(storage.totals(city),
+                         {'places': 1, 'average_price': 100})
+
+    def test_storage_type(self):
+        """ HBNB_TYPE_STORAGE=mmap selects MMapStorage """
+        import subprocess
+        import sys
+        import tempfile
+        root = os.path.dirname(os.path.dirname(models.__file__))
+        env = dict(os.environ, HBNB_TYPE_STORAGE='mmap', PYTHONPATH=root)
+        with tempfile.TemporaryDirectory() as cwd:
+            out = subprocess.run(
+                [sys.executable, '-c',
+                 'import models; print(type(models.storage).__name__)'],
+                env=env, cwd=cwd, capture_output=True, text=True,
+                check=True).stdout
+        self.assertEqual(out.strip(), 'MMapStorage')
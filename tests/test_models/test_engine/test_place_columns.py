@@ -0,0 +1,113 @@
+#!/usr/bin/python3
+""" Module for testing the columnar Place store """
+import unittest
+from models.engine.place_columns import PlaceColumns
+from models.place import Place
+from models import storage
+import os
+
+
+class test_placeColumns(unittest.TestCase):
+    """ Class to test PlaceColumns kept in sync by storage """
+
+    def setUp(self):
+        """ Registers an empty store with three Places """
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage._FileStorage__indexes.clear()
+        self.columns = PlaceColumns()
+        storage.register(self.columns)
+        self.places = []
+        for price, guests, lat in [(80, 2, 10.0), (120, 4, 20.0),
+                                   (60, 6, 30.0)]:
+            place = Place()
+            place.price_by_night = price
+            place.max_guest = guests
+            place.latitude = lat
+            self.places.append(place)
+
+    def tearDown(self):
+        """ Detaches the store and removes the storage file """
+        storage._FileStorage__indexes.clear()
+        for path in ['file.json', 'file.json.lock']:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def ids(self, *rows):
+        """ Returns the ids of the Places at rows """
+        return [self.places[row].id for row in rows]
+
+    def test_register_feeds_existing(self):
+        """ Places stored before registration are added """
+        columns = PlaceColumns()
+        storage.register(columns)
+        self.assertEqual(sorted(columns.ids), sorted(self.ids(0, 1, 2)))
+
+    def test_filter_range(self):
+        """ Ranges are inclusive and may be open on one side """
+        self.assertEqual(self.columns.filter(price_by_night=(None, 80)),
+                         self.ids(0, 2))
+        self.assertEqual(self.columns.filter(price_by_night=(70, 120),
+                                             max_guest=(3, None)),
+                         self.ids(1))
+
+    def test_filter_equal(self):
+        """ Plain values must be equal """
+        self.assertEqual(self.columns.filter(max_guest=6), self.ids(2))
+
+    def test_filter_unknown_field(self):
+        """ Only numeric Place fields can be filtered """
+        with self.assertRaises(KeyError):
+            self.columns.filter(name='x')
+
+    def test_sort(self):
+        """ sort orders ids by a column """
+        self.assertEqual(self.columns.sort('price_by_night'),
+                         self.ids(2, 0, 1))
+        self.assertEqual(self.columns.sort('price_by_night',
+                                           ids=self.ids(0, 1),
+                                           reverse=True),
+                         self.ids(1, 0))
+
+    def test_aggregate(self):
+        """ Aggregates run over every Place or over given ids """
+        self.assertEqual(self.columns.aggregate('price_by_night', 'sum'),
+                         260)
+        self.assertEqual(self.columns.aggregate('latitude', 'mean'), 20.0)
+        self.assertEqual(self.columns.aggregate('max_guest', 'max',
+                                                ids=self.ids(0, 2)), 6)
+        self.assertEqual(self.columns.aggregate('max_guest', 'count'), 3)
+        self.assertIsNone(self.columns.aggregate('max_guest', 'min',
+                                                 ids=[]))
+        with self.assertRaises(ValueError):
+            self.columns.aggregate('max_guest', 'median')
+
+    def test_update_follows_storage(self):
+        """ Attribute writes are reflected in the columns """
+        self.places[2].price_by_night = 500
+        self.assertEqual(self.columns.filter(price_by_night=(400, None)),
+                         self.ids(2))
+
+    def test_delete_follows_storage(self):
+        """ Deleted Places leave the columns """
+        storage.delete(self.places[0])
+        self.assertEqual(len(self.columns), 2)
+        self.assertEqual(sorted(self.columns.filter(max_guest=(None, None))),
+                         sorted(self.ids(1, 2)))
+
+    def test_reload_follows_storage(self):
+        """ Reloading keeps one row per Place """
+        storage.save()
+        storage.reload()
+        self.assertEqual(len(self.columns), 3)
+        self.assertEqual(self.columns.filter(max_guest=4), self.ids(1))
+
+    def test_bad_values(self):
+        """ Values that are not numbers are stored as 0 or NaN """
+        self.places[0].max_guest = 'many'
+        self.places[0].latitude = None
+        self.assertEqual(self.columns.filter(max_guest=0), self.ids(0))
+        self.assertEqual(self.columns.filter(latitude=(-90, 90)),
+                         self.ids(1, 2))
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+""" Module for testing the connection pool metrics """
+import unittest
+import os
+import tempfile
+import threading
+
+try:
+    from sqlalchemy import create_engine, text
+    from models.engine.pool_metrics import PoolMetrics
+except ImportError:
+    PoolMetrics = None
+
+
+@unittest.skipIf(PoolMetrics is None, "needs SQLAlchemy")
+class test_poolMetrics(unittest.TestCase):
+    """ Class to test PoolMetrics on a SQLite file """
+
+    def setUp(self):
+        """ Opens an engine with a pool of one connection and no overflow """
+        self.tmp = tempfile.TemporaryDirectory()
+        url = 'sqlite:///' + os.path.join(self.tmp.name, 'hbnb.db')
+        self.engine = create_engine(url, pool_size=1, max_overflow=0)
+        self.metrics = PoolMetrics(self.engine, 0)
+
+    def tearDown(self):
+        """ Closes the engine and removes the database """
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_counts(self):
+        """ Checkouts, checkins and new connections are counted """
+        for i in range(3):
+            with self.engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+        metrics = self.metrics.snapshot()
+        self.assertEqual(metrics['connects'], 1)
+        self.assertEqual(metrics['checkouts'], 3)
+        self.assertEqual(metrics['checkins'], 3)
+        self.assertEqual(metrics['peak_checked_out'], 1)
+        self.assertEqual(metrics['checkedout'], 0)
+        self.assertEqual(metrics['waits'], 0)
+
+    def test_waits(self):
+        """ A checkout finding every connection in use is a wait """
+        held = self.engine.connect()
+        waiter = threading.Thread(target=lambda: self.engine.connect().close())
+        waiter.start()
+        waiter.join(0.2)
+        held.close()
+        waiter.join()
+        metrics = self.metrics.snapshot()
+        self.assertEqual(metrics['waits'], 1)
+        self.assertGreater(metrics['checkout_seconds'], 0.1)
+
+    def test_dispose(self):
+        """ The pool that replaces a disposed one is followed too """
+        self.engine.connect().close()
+        self.engine.dispose()
+        held = self.engine.connect()
+        waiter = threading.Thread(target=lambda: self.engine.connect().close())
+        waiter.start()
+        waiter.join(0.2)
+        held.close()
+        waiter.join()
+        metrics = self.metrics.snapshot()
+        self.assertEqual(metrics['connects'], 2)
+        self.assertEqual(metrics['checkouts'], 3)
+        self.assertEqual(metrics['checkedin'], 1)
+        self.assertEqual(metrics['waits'], 1)
+        self.assertGreater(metrics['checkout_seconds'], 0.1)
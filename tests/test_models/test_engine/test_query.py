@@ -0,0 +1,139 @@
+#!/usr/bin/python3
+""" Module for testing storage.query() on FileStorage """
+import unittest
+from unittest import mock
+from models.engine.file_storage import FileStorage
+from models.engine.fk_index import ForeignKeyIndex
+from models.engine.place_columns import PlaceColumns
+from models.place import Place
+from models.state import State
+from models import storage
+import os
+
+
+class test_query(unittest.TestCase):
+    """ Class to test Query and its run on FileStorage """
+
+    def setUp(self):
+        """ Stores ten Places in two Cities """
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage._FileStorage__raw.clear()
+        storage._FileStorage__indexes.clear()
+        for i in range(10):
+            place = Place()
+            place.name = 'Place {}'.format(i)
+            place.city_id = 'c{}'.format(i % 2)
+            place.price_by_night = i * 10
+        State()
+
+    def tearDown(self):
+        """ Detaches indexes and removes the storage file """
+        storage._FileStorage__lazy = False
+        storage._FileStorage__indexes.clear()
+        for path in ['file.json', 'file.json.lock']:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def names(self, query):
+        """ Returns the names of the results of query """
+        return [place.name for place in query]
+
+    def test_where(self):
+        """ Conditions combine and support every operator """
+        query = storage.query(Place)
+        self.assertEqual(query.count(), 10)
+        self.assertEqual(query.where(city_id='c1',
+                                     price_by_night__ge=50).count(), 3)
+        self.assertEqual(query.where(price_by_night__lt=20).count(), 2)
+        self.assertEqual(query.where(price_by_night__le=20).count(), 3)
+        self.assertEqual(query.where(price_by_night__gt=80).count(), 1)
+        self.assertEqual(query.where(city_id__ne='c0').count(), 5)
+        self.assertEqual(query.where(name__in=['Place 1', 'x']).count(), 1)
+        self.assertEqual(query.where(name__lt=3).count(), 0)
+        with self.assertRaises(ValueError):
+            query.where(name__like='Place')
+
+    def test_order_limit_only(self):
+        """ Results are sorted, limited and projected """
+        query = storage.query(Place).where(city_id='c0')
+        self.assertEqual(self.names(query.order_by('-price_by_night')
+                                    .limit(2)),
+                         ['Place 8', 'Place 6'])
+        self.assertEqual(query.order_by('price_by_night').first().name,
+                         'Place 0')
+        self.assertEqual(query.where(price_by_night__gt=40)
+                         .order_by('name').only('name', 'city_id').all(),
+                         [{'name': 'Place 6', 'city_id': 'c0'},
+                          {'name': 'Place 8', 'city_id': 'c0'}])
+        self.assertIsNone(query.where(name='none').first())
+
+    def test_limit_chunks(self):
+        """ A limit without an order reads on past empty chunks """
+        for i in range(2500):
+            State().name = str(i)
+        query = storage.query(State)
+        self.assertEqual(query.where(name='2400').limit(5).count(), 1)
+        self.assertEqual(query.where(name__ge='1').limit(3).count(), 3)
+        self.assertEqual(query.limit(2600).count(), 2501)
+
+    def test_builder_copies(self):
+        """ Builder methods leave the query they are called on alone """
+        query = storage.query(Place)
+        query.where(city_id='c0').limit(1)
+        self.assertEqual(query.count(), 10)
+
+    def test_indexes(self):
+        """ Registered indexes narrow the query without a scan """
+        storage.register(ForeignKeyIndex())
+        storage.register(PlaceColumns())
+        with mock.patch.object(FileStorage, '_FileStorage__sources',
+                               side_effect=AssertionError):
+            self.assertEqual(self.names(storage.query(Place).where(
+                city_id='c1', price_by_night__gt=50,
+                price_by_night__lt=90).order_by('name')),
+                ['Place 7'])
+            self.assertEqual(storage.query(Place).where(
+                price_by_night=30).first().name, 'Place 3')
+        self.assertEqual(storage.query(State).where(name='x').count(), 0)
+
+    def test_indexes_other_keys(self):
+        """ *_id fields the class does not declare are not narrowed by the
+        foreign key index, which does not know them """
+        place = storage.query(Place).first()
+        place.host_id = 'h1'
+        storage.register(ForeignKeyIndex())
+        self.assertEqual(storage.query(Place).where(host_id='h1').all(),
+                         [place])
+
+    def test_indexes_fractions(self):
+        """ Int columns keep int(value); bounds are widened to find the
+        Places whose fraction was dropped """
+        places = storage.query(Place).order_by('name').all()
+        places[0].price_by_night = 99.7
+        places[1].number_rooms = -1.5
+        storage.register(PlaceColumns())
+        self.assertEqual(storage.query(Place).where(
+            price_by_night__gt=99.5).all(), [places[0]])
+        self.assertEqual(storage.query(Place).where(
+            price_by_night=99.7).all(), [places[0]])
+        self.assertEqual(storage.query(Place).where(
+            number_rooms__lt=-1.2).all(), [places[1]])
+        self.assertEqual(storage.query(Place).where(
+            price_by_night__gt=float('nan')).all(), [])
+
+    def test_lazy_projection(self):
+        """ Projections of loaded records build no objects """
+        storage.save()
+        storage._FileStorage__lazy = True
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage.reload()
+        query = storage.query(Place).where(city_id='c0') \
+            .order_by('created_at')
+        self.assertEqual(len(query.only('id', 'created_at').all()), 5)
+        self.assertEqual(len(storage._FileStorage__objects), 0)
+        self.assertEqual(len(query.limit(2).all()), 2)
+        self.assertEqual(len(storage._FileStorage__objects), 2)
@@ -0,0 +1,159 @@
+#!/usr/bin/python3
+""" Module for testing the full-text index and storage.search() """
+import unittest
+from unittest import mock
+from models.engine.text_index import TextIndex, tokens
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models import storage
+import os
+
+
+class test_textIndex(unittest.TestCase):
+    """ Class to test TextIndex and storage.search() """
+
+    def setUp(self):
+        """ Stores Places and Reviews with some text """
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__classes.clear()
+        storage._FileStorage__indexes.clear()
+        self.remove()
+        self.loft = Place()
+        self.loft.name = 'Sunny loft'
+        self.loft.description = 'A quiet loft near the beach'
+        self.cabin = Place()
+        self.cabin.name = 'Mountain cabin'
+        self.cabin.description = 'Wood cabin, quiet and cold'
+        self.review = Review()
+        self.review.text = 'The beach was great, the beach bar too'
+        State().name = 'Beach'
+
+    def tearDown(self):
+        """ Detaches indexes and removes the storage files """
+        storage._FileStorage__indexes.clear()
+        self.remove()
+
+    @staticmethod
+    def remove():
+        """ Removes the storage file and the saved index """
+        for path in ['file.json', 'file.json.lock', 'file.json.search',
+                     'file.json.search.stamp', 'file.json.log',
+                     'file.json.log.1']:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def test_tokens(self):
+        """ Words are lowercased and stopwords dropped """
+        self.assertEqual(tokens('The Beach, and a BAR!'), ['beach', 'bar'])
+
+    def test_ranking(self):
+        """ The best matches come first, of the searched classes only """
+        self.assertEqual(storage.search('beach'),
+                         [self.review, self.loft])
+        self.assertEqual(storage.search('quiet beach', Place),
+                         [self.loft, self.cabin])
+        self.assertEqual(storage.search('beach', Review), [self.review])
+        self.assertEqual(storage.search('beach', limit=1), [self.review])
+        self.assertEqual(storage.search('snow'), [])
+
+    def test_incremental(self):
+        """ New, changed and deleted objects are followed """
+        storage.search('beach')
+        place = Place()
+        place.name = 'Beach house'
+        self.assertIn(place, storage.search('house'))
+        self.cabin.description = 'Cabin by the beach'
+        self.assertIn(self.cabin, storage.search('beach'))
+        self.assertEqual(storage.search('wood'), [])
+        storage.delete(self.review)
+        self.assertEqual(storage.search('bar'), [])
+
+    def test_persisted(self):
+        """ reload() reads the saved index instead of building it """
+        storage.search('beach')
+        storage.save()
+        self.assertTrue(os.path.exists('file.json.search'))
+        storage._FileStorage__indexes.clear()
+        with mock.patch.object(TextIndex, 'add') as add:
+            storage.reload()
+            found = storage.search('cabin')
+        add.assert_not_called()
+        self.assertEqual([obj.id for obj in found], [self.cabin.id])
+
+    def test_stale(self):
+        """ An index saved for another storage file is built again """
+        storage.search('beach')
+        storage.save()
+        storage._FileStorage__indexes.clear()
+        place = Place()
+        place.name = 'Lake house'
+        storage.save()
+        storage._FileStorage__indexes.clear()
+        storage.reload()
+        self.assertEqual([obj.id for obj in storage.search('lake')],
+                         [place.id])
+
+    def test_saves_restamp(self):
+        """ Saves after the first one only move the stamp of the written
+        index, even from a storage that never read it """
+        storage.search('beach')
+        storage.save()
+        state = State()
+        with mock.patch.object(TextIndex, 'dump') as dump:
+            storage.save()
+            storage._FileStorage__indexes.clear()
+            state.name = 'Ohio'
+            storage.save()
+        dump.assert_not_called()
+        with mock.patch.object(TextIndex, 'add') as add:
+            storage.reload()
+            found = storage.search('cabin')
+        add.assert_not_called()
+        self.assertEqual([obj.id for obj in found], [self.cabin.id])
+
+    def test_text_change_stale(self):
+        """ A save changing indexed text leaves the written index stale """
+        storage.search('beach')
+        storage.save()
+        self.review.text = 'Lake view'
+        storage.save()
+        storage._FileStorage__indexes.clear()
+        storage.reload()
+        self.assertEqual([obj.id for obj in storage.search('lake')],
+                         [self.review.id])
+
+    def test_compact_restamps(self):
+        """ Folding the journal keeps the written index valid """
+        storage._FileStorage__journal = True
+        try:
+            storage.search('beach')
+            storage.save()
+            State().save()
+            storage.compact(wait=True)
+            storage._FileStorage__indexes.clear()
+            with mock.patch.object(TextIndex, 'add') as add:
+                storage.reload()
+                storage.search('cabin')
+            add.assert_not_called()
+        finally:
+            storage._FileStorage__journal = False
+
+    def test_console(self):
+        """ The search command prints the matches """
+        import io
+        from contextlib import redirect_stdout
+        from console import HBNBCommand
+        with redirect_stdout(io.StringIO()) as out:
+            HBNBCommand().onecmd('search Place quiet')
+            HBNBCommand().onecmd('search')
+        lines = out.getvalue().splitlines()
+        self.assertIn(self.loft.id, lines[0])
+        self.assertNotIn(self.review.id, lines[0])
+        self.assertEqual(lines[1], '** search text missing **')
+
+
+if __name__ == "__main__":
+    unittest.main()
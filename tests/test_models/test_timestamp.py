@@ -0,0 +1,39 @@
+#!/usr/bin/python3
+""" Module for testing the timestamp codec """
+import unittest
+from datetime import datetime
+from models import timestamp
+
+
+class test_timestamp(unittest.TestCase):
+    """ Class to test timestamp parsing and formatting """
+
+    def test_parse(self):
+        """ Stored timestamps are parsed to datetimes """
+        self.assertEqual(timestamp.parse('2020-02-18T14:21:12.096959'),
+                         datetime(2020, 2, 18, 14, 21, 12, 96959))
+
+    def test_parse_no_microseconds(self):
+        """ Timestamps without microseconds are accepted """
+        self.assertEqual(timestamp.parse('2020-02-18T14:21:12'),
+                         datetime(2020, 2, 18, 14, 21, 12))
+
+    def test_parse_datetime(self):
+        """ datetimes are returned unchanged """
+        now = datetime.now()
+        self.assertIs(timestamp.parse(now), now)
+
+    def test_parse_invalid(self):
+        """ Malformed timestamps raise ValueError """
+        with self.assertRaises(ValueError):
+            timestamp.parse('yesterday')
+
+    def test_format_fixed_layout(self):
+        """ Microseconds are always written """
+        self.assertEqual(timestamp.format(datetime(2020, 2, 18, 14, 21, 12)),
+                         '2020-02-18T14:21:12.000000')
+
+    def test_round_trip(self):
+        """ parse reverses format """
+        now = datetime.now()
+        self.assertEqual(timestamp.parse(timestamp.format(now)), now)